@@ -1,8 +1,12 @@
-from flask import Flask, render_template, url_for, request, redirect, send_from_directory, session, flash, jsonify, make_response
+from flask import Flask, render_template, url_for, request, redirect, send_from_directory, session, flash, jsonify, make_response, current_app, g
+from werkzeug.security import safe_join
 import os
 import urllib.parse
 import json
 import datetime
+import hashlib
+import threading
+import click
 from backend.controladores.home_controller import HomeController
 from backend.controladores.servicios_controller import ServiciosController
 from backend.controladores.carro_controller import CarroController
@@ -12,153 +16,296 @@ from backend.controladores.dashboardHome_controller import DashboardHomeControll
 from backend.controladores.productos_controller import ProductosController
 from backend.controladores.categorias_controller import CategoriasController
 from backend.controladores.configuracion_controller import ConfiguracionController
-
-app = Flask(__name__,
-            template_folder='visible/html',
-            static_folder='visible')
-
-# Configuración básica
-app.secret_key = 'tu_clave_secreta_aqui'  
+from backend.DB.db_manager import get_pool_stats, init_db_session, ensure_database_ready
+from backend.DB.contadores import get_vistas_stats
+from backend.DB.cache import paginas_publicas_cache
+from backend.DB.imagenes import srcset, url_variante
+from backend.DB.trabajos import iniciar_trabajadores, get_trabajos_stats
+from backend.DB.limpieza import limpiar_datos_ejemplo, LimpiezaConfig
+from backend.DB.ventas import consultar_ventas
+from backend.DB.migraciones import aplicar_migraciones, estado_migraciones
+from backend.DB.revision_indices import revisar_consultas, RevisionIndicesConfig
+from backend.DB.estadisticas import reconciliar_estadisticas, actualizar_estadisticas
+from backend.DB.relacionados import reconstruir_relacionados
+from backend.DB.busqueda import comprobar_raices
 
 # Definir la carpeta de uploads
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
+PUBLIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'publico')
+
+class ArchivosConfig:
+    """Configuración de la entrega de /publico y /uploads"""
+    # Un año: las URLs cambian cuando cambia el contenido
+    MAX_AGE_INMUTABLE = 31536000
+    # '' (Flask envía el archivo), 'x-sendfile' (Apache/lighttpd) o
+    # 'x-accel' (nginx, requiere una location internal con ARCHIVOS_X_ACCEL_PREFIJO)
+    OFFLOAD = os.environ.get('ARCHIVOS_OFFLOAD', '').lower()
+    X_ACCEL_PREFIJO = os.environ.get('ARCHIVOS_X_ACCEL_PREFIJO', '/_archivos/')
+
+def preparar_carpetas_uploads(upload_folder):
+    """Crea la carpeta de uploads y sus subcarpetas (una vez al iniciar)"""
+    for subcarpeta in ('products', 'categories', 'config'):
+        os.makedirs(os.path.join(upload_folder, subcarpeta), exist_ok=True)
+
+def create_app():
+    """Crea la aplicación y sus dependencias una sola vez por proceso/worker
+    
+    Los controladores no guardan estado por petición, así que se construyen
+    aquí una vez y las rutas los reutilizan mediante get_controller().
+    """
+    app = Flask(__name__,
+                template_folder='visible/html',
+                static_folder='visible')
+    
+    # Configuración básica
+    app.secret_key = 'tu_clave_secreta_aqui'  
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    # El servidor web entrega el cuerpo de los archivos (ver enviar_archivo)
+    app.config['USE_X_SENDFILE'] = ArchivosConfig.OFFLOAD in ('x-sendfile', 'x-accel')
+    
+    # Una sola conexión del pool por petición, liberada al terminar
+    init_db_session(app)
+    
+    # Hilos de la cola de trabajos (correos, imágenes): arrancan con la primera
+    # petición de cada worker y retoman lo que quedó pendiente en la tabla
+    app.before_request(iniciar_trabajadores)
+    
+    # Filtros para las variantes de imágenes (plantilla fijos/imagenes.html)
+    app.jinja_env.filters['srcset'] = srcset
+    app.jinja_env.filters['variante'] = url_variante
+    
+    # Verificar/crear la base de datos una sola vez al iniciar el proceso
+    # (con gunicorn ya se hizo en on_starting y aquí no vuelve a consultar)
+    ensure_database_ready()
+    
+    # Carpetas de uploads: se crean aquí y se inyectan a los controladores
+    preparar_carpetas_uploads(UPLOAD_FOLDER)
+    
+    app.extensions['controladores'] = {
+        'home': HomeController(),
+        'servicios': ServiciosController(),
+        'carro': CarroController(),
+        'login': LoginController(),
+        'registro': RegistroController(),
+        'dashboard_home': DashboardHomeController(),
+        'productos': ProductosController(upload_folder=UPLOAD_FOLDER),
+        'categorias': CategoriasController(upload_folder=UPLOAD_FOLDER),
+        'configuracion': ConfiguracionController(upload_folder=UPLOAD_FOLDER)
+    }
+    
+    return app
+
+def get_controller(nombre):
+    """Obtiene el controlador compartido de la aplicación actual"""
+    return current_app.extensions['controladores'][nombre]
+
+app = create_app()
+
+# ----- COMANDOS DE MANTENIMIENTO -----
+
+# Limpieza de datos de ejemplo y huérfanos (ya no se ejecuta al iniciar):
+#   flask --app app limpiar-datos-ejemplo --dry-run
+#   flask --app app limpiar-datos-ejemplo --lote 5000 --pausa 0.2
+@app.cli.command('limpiar-datos-ejemplo')
+@click.option('--dry-run', is_flag=True, help='Solo cuenta las filas que se eliminarían')
+@click.option('--lote', type=int, default=LimpiezaConfig.LOTE, show_default=True,
+              help='Valores de id por rango de borrado')
+@click.option('--pausa', type=float, default=LimpiezaConfig.PAUSA, show_default=True,
+              help='Segundos de espera entre rangos con borrados')
+def limpiar_datos_ejemplo_command(dry_run, lote, pausa):
+    """Elimina los datos de ejemplo y los registros huérfanos"""
+    def mostrar_progreso(avance):
+        click.echo(f"  {avance['tabla']}: id <= {avance['hasta_id']} de {avance['max_id']} "
+                   f"({avance['porcentaje']}%), {avance['eliminadas']} filas eliminadas")
+    
+    click.echo("=== LIMPIANDO DATOS DE EJEMPLO" + (" (DRY-RUN) ===" if dry_run else " ==="))
+    resultado = limpiar_datos_ejemplo(dry_run=dry_run, lote=lote, pausa=pausa, progreso=mostrar_progreso)
+    
+    for paso in resultado['pasos']:
+        filas = 'ERROR' if paso['filas'] is None else paso['filas']
+        accion = 'a eliminar' if dry_run else 'eliminadas'
+        click.echo(f"{paso['descripcion']}: {filas} filas {accion} ({paso['ms']:.0f} ms)")
+    
+    click.echo(f"=== LIMPIEZA {'COMPLETADA' if resultado['success'] else 'CON ERRORES'} "
+               f"en {resultado['total_ms']:.0f} ms ===")
+    if not resultado['success']:
+        raise SystemExit(1)
+
+# Migraciones de esquema (también se aplican al arrancar):
+#   flask --app app migrar
+#   flask --app app migrar --estado
+@app.cli.command('migrar')
+@click.option('--estado', is_flag=True, help='Solo muestra las migraciones aplicadas y pendientes')
+def migrar_command(estado):
+    """Aplica las migraciones de esquema pendientes"""
+    if estado:
+        migraciones = estado_migraciones()
+        if migraciones is None:
+            raise SystemExit(1)
+        for migracion in migraciones:
+            detalle = (f" {migracion['aplicada_en']} ({migracion['duracion_ms']} ms)"
+                       if migracion['aplicada_en'] else '')
+            click.echo(f"{migracion['version']:>4}  {migracion['nombre']}: {migracion['estado'].upper()}{detalle}")
+        return
+    
+    def mostrar_progreso(avance):
+        tiempo = 'omitida (ya existe)' if avance['omitida'] else f"{avance['ms']:.0f} ms"
+        click.echo(f"  [{avance['version']}] {avance['sentencia']}: {tiempo}")
+    
+    resultado = aplicar_migraciones(progreso=mostrar_progreso)
+    for migracion in resultado['aplicadas']:
+        click.echo(f"Migración {migracion['version']} ({migracion['nombre']}) aplicada en {migracion['ms']:.0f} ms")
+    if not resultado['success']:
+        click.echo(f"ERROR: {resultado['error']}")
+        raise SystemExit(1)
+    click.echo(f"Esquema en la versión {resultado['version']}")
+
+# Planes de las consultas frecuentes (EXPLAIN):
+#   flask --app app revisar-indices
+@app.cli.command('revisar-indices')
+@click.option('--min-filas', type=int, default=RevisionIndicesConfig.MIN_FILAS, show_default=True,
+              help='Omitir las tablas con menos filas (0 para revisar todas)')
+def revisar_indices_command(min_filas):
+    """Verifica con EXPLAIN que las consultas frecuentes usen su índice"""
+    resultado = revisar_consultas(min_filas=min_filas)
+    for consulta in resultado['consultas']:
+        click.echo(f"[{consulta['estado'].upper()}] {consulta['descripcion']}: "
+                   f"{consulta['tabla']} índice={consulta['indice']} tipo={consulta['tipo']} filas={consulta['filas']}")
+    if not resultado['success']:
+        raise SystemExit(1)
+
+# Recuento completo de los contadores del panel (también una vez al día en
+# segundo plano, ESTADISTICAS_RECONCILIAR):
+#   flask --app app reconciliar-estadisticas
+@app.cli.command('reconciliar-estadisticas')
+def reconciliar_estadisticas_command():
+    """Recuenta los contadores del panel y recalcula sus listas"""
+    if not (reconciliar_estadisticas() and actualizar_estadisticas()):
+        click.echo("ERROR: no se pudieron guardar las estadísticas")
+        raise SystemExit(1)
+    click.echo("Estadísticas del panel recalculadas")
+
+# Reconstrucción completa de los productos relacionados (también una vez por
+# noche en segundo plano, RELACIONADOS_INTERVALO):
+#   flask --app app reconstruir-relacionados
+@app.cli.command('reconstruir-relacionados')
+def reconstruir_relacionados_command():
+    """Recalcula las listas de productos relacionados de todo el catálogo"""
+    if not reconstruir_relacionados():
+        click.echo("ERROR: no se pudieron guardar los productos relacionados")
+        raise SystemExit(1)
 
-# SOLUCIÓN 4: Función para limpiar datos de ejemplo al iniciar
-def limpiar_datos_ejemplo_al_iniciar():
-    """Limpia datos de ejemplo al iniciar la aplicación"""
+# Singular y plural en la búsqueda (después de cambiar tokenizar/_raiz):
+#   flask --app app revisar-busqueda
+@app.cli.command('revisar-busqueda')
+def revisar_busqueda_command():
+    """Verifica que cada singular encuentre su plural en el índice y al revés"""
+    fallos = comprobar_raices()
+    for consulta, nombre in fallos:
+        click.echo(f"[ERROR] «{consulta}» no encuentra «{nombre}»")
+    if fallos:
+        raise SystemExit(1)
+    click.echo("Singular y plural se encuentran en todos los pares")
+
+# ----- ARCHIVOS PÚBLICOS Y SUBIDOS -----
+
+# Carpeta y prefijo de X-Accel-Redirect de cada endpoint de archivos
+_CARPETAS_ARCHIVOS = {
+    'public_files': (PUBLIC_FOLDER, 'publico'),
+    'uploaded_files': (UPLOAD_FOLDER, 'uploads')
+}
+
+_hashes_archivos = {}
+_hashes_lock = threading.Lock()
+
+def hash_archivo(carpeta, filename):
+    """Hash del contenido de un archivo, recalculado sólo si cambió en disco
+    
+    Returns:
+        str: sha1 del contenido, o None si el archivo no existe
+    """
+    ruta = safe_join(carpeta, filename)
+    if ruta is None:
+        return None
     try:
-        from backend.DB.db_manager import execute_query
-        
-        print("=== LIMPIANDO DATOS DE EJEMPLO AL INICIAR ===")
-        
-        # 1. Limpiar usuarios de ejemplo
-        result = execute_query("""
-            DELETE FROM usuarios 
-            WHERE correo IN (
-                'admin@talabarteriarodriguez.com',
-                'ventas@talabarteriarodriguez.com',
-                'cliente@ejemplo.com'
-            )
-        """, commit=True)
-        print("Usuarios de ejemplo eliminados")
-        
-        # 2. Limpiar administradores relacionados
-        execute_query("""
-            DELETE FROM administradores 
-            WHERE usuario_id NOT IN (SELECT id FROM usuarios)
-        """, commit=True)
-        print("Administradores huérfanos eliminados")
-        
-        # 3. Limpiar productos de ejemplo
-        execute_query("""
-            DELETE FROM productos 
-            WHERE sku IN (
-                'MONT-001', 'MONT-002', 'CINCH-001', 'CINCH-002',
-                'BOOT-001', 'HAT-001', 'SPUR-001', 'ACC-001', 'ACC-002'
-            )
-            OR nombre IN (
-                'Montura Charra Clásica',
-                'Montura de Gala Premium',
-                'Cincho Piteado Fino',
-                'Cincho Liso Clásico',
-                'Bota Charra de Piel',
-                'Sombrero Charro de Gala',
-                'Espuelas de Acero Inoxidable',
-                'Riendas Trenzadas',
-                'Chicote de Jineteo'
-            )
-        """, commit=True)
-        print("Productos de ejemplo eliminados")
-        
-        # 4. Limpiar categorías de ejemplo si están vacías
-        execute_query("""
-            DELETE FROM categorias 
-            WHERE nombre IN (
-                'Monturas', 'Cinchos y Cinturones', 'Botas y Calzado',
-                'Sombreros', 'Espuelas', 'Accesorios',
-                'Monturas de Faena', 'Monturas de Gala',
-                'Cinchos de Montura', 'Cinturones Charros'
-            )
-            AND id NOT IN (
-                SELECT DISTINCT categoria_id FROM productos WHERE categoria_id IS NOT NULL
-            )
-            AND id NOT IN (
-                SELECT DISTINCT categoria_padre_id FROM categorias WHERE categoria_padre_id IS NOT NULL
-            )
-        """, commit=True)
-        print("Categorías de ejemplo vacías eliminadas")
-        
-        # 5. Limpiar pedidos de ejemplo
-        execute_query("""
-            DELETE FROM pedidos 
-            WHERE usuario_id IS NULL 
-            OR usuario_id NOT IN (SELECT id FROM usuarios)
-            OR direccion_envio_id NOT IN (SELECT id FROM direcciones_envio)
-        """, commit=True)
-        print("Pedidos huérfanos eliminados")
-        
-        # 6. Limpiar información de tienda de ejemplo
-        execute_query("""
-            DELETE FROM informacion_tienda 
-            WHERE email = 'contacto@talabarteriarodriguez.com'
-            AND facebook = 'https://facebook.com/talabarteriarodriguez'
-            AND instagram = 'https://instagram.com/talabarteriarodriguez'
-        """, commit=True)
-        print("Información de tienda de ejemplo eliminada")
-        
-        # 7. Limpiar imágenes con URLs de ejemplo
-        execute_query("""
-            DELETE FROM imagenes_productos 
-            WHERE url_imagen LIKE '%ejemplo.com%'
-        """, commit=True)
-        print("Imágenes de ejemplo eliminadas")
-        
-        # 8. Limpiar reseñas de usuarios que ya no existen
-        execute_query("""
-            DELETE FROM resenas 
-            WHERE usuario_id NOT IN (SELECT id FROM usuarios)
-            OR producto_id NOT IN (SELECT id FROM productos)
-        """, commit=True)
-        print("Reseñas huérfanas eliminadas")
-        
-        # 9. Limpiar direcciones de envío huérfanas
-        execute_query("""
-            DELETE FROM direcciones_envio 
-            WHERE usuario_id IS NOT NULL 
-            AND usuario_id NOT IN (SELECT id FROM usuarios)
-        """, commit=True)
-        print("Direcciones de envío huérfanas eliminadas")
-        
-        # 10. Limpiar datos de carrito huérfanos
-        execute_query("""
-            DELETE FROM items_carrito 
-            WHERE usuario_id NOT IN (SELECT id FROM usuarios)
-            OR producto_id NOT IN (SELECT id FROM productos)
-        """, commit=True)
-        print("Items de carrito huérfanos eliminados")
-        
-        print("=== LIMPIEZA COMPLETADA ===\n")
-        
-    except Exception as e:
-        print(f"Error durante la limpieza de datos de ejemplo: {e}")
-        # No interrumpir el inicio de la aplicación
-        pass
+        stat = os.stat(ruta)
+    except OSError:
+        return None
+    
+    firma = (stat.st_mtime_ns, stat.st_size)
+    guardado = _hashes_archivos.get(ruta)
+    if guardado and guardado[0] == firma:
+        return guardado[1]
+    
+    sha1 = hashlib.sha1()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(65536), b''):
+            sha1.update(bloque)
+    with _hashes_lock:
+        _hashes_archivos[ruta] = (firma, sha1.hexdigest())
+    return sha1.hexdigest()
+
+@app.url_defaults
+def version_archivos(endpoint, values):
+    """Agrega ?v=<hash del contenido> a url_for('public_files' / 'uploaded_files')"""
+    if endpoint in _CARPETAS_ARCHIVOS and 'filename' in values and 'v' not in values:
+        version = hash_archivo(_CARPETAS_ARCHIVOS[endpoint][0], values['filename'])
+        if version:
+            values['v'] = version[:12]
+
+def enviar_archivo(endpoint, filename, inmutable):
+    """Envía un archivo con ETag fuerte y respuestas 304
+    
+    Args:
+        endpoint (str): 'public_files' o 'uploaded_files'
+        filename (str): Ruta relativa dentro de la carpeta
+        inmutable (bool): La URL identifica un contenido que no cambia
+            (hash en ?v= o nombre con fecha), así que el navegador la
+            guarda un año sin revalidar
+    """
+    carpeta, prefijo = _CARPETAS_ARCHIVOS[endpoint]
+    version = hash_archivo(carpeta, filename)
+    if version is None:
+        return make_response('Archivo no encontrado', 404)
+    
+    response = send_from_directory(
+        carpeta, filename,
+        etag=version,
+        max_age=ArchivosConfig.MAX_AGE_INMUTABLE if inmutable else None
+    )
+    if inmutable:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+    
+    if ArchivosConfig.OFFLOAD == 'x-accel' and 'X-Sendfile' in response.headers:
+        del response.headers['X-Sendfile']
+        response.headers['X-Accel-Redirect'] = f"{ArchivosConfig.X_ACCEL_PREFIJO.rstrip('/')}/{prefijo}/{filename}"
+    
+    return response
 
 # Configurar ruta para los recursos públicos
 @app.route('/publico/<path:filename>')
 def public_files(filename):
-    return send_from_directory('publico', filename)
+    # Inmutable sólo si la URL trae el hash del contenido actual
+    version = request.args.get('v')
+    inmutable = bool(version) and (hash_archivo(PUBLIC_FOLDER, filename) or '').startswith(version)
+    return enviar_archivo('public_files', filename, inmutable)
 
 # Configurar ruta para archivos subidos
 @app.route('/uploads/<path:filename>')
 def uploaded_files(filename):
-    return send_from_directory(UPLOAD_FOLDER, filename)
+    # Los controladores guardan cada archivo subido con la fecha en el nombre
+    # y nunca lo sobrescriben, así que la URL ya es única por contenido
+    return enviar_archivo('uploaded_files', filename, inmutable=True)
 
 # Configuración para evitar cache en páginas dinámicas
 @app.after_request
 def after_request(response):
-    # Prevenir cache para páginas HTML
-    if 'text/html' in response.headers.get('Content-Type', ''):
+    # Prevenir cache para páginas HTML (las páginas públicas cacheadas se
+    # revalidan con ETag / Last-Modified, ver render_pagina_publica)
+    if 'text/html' in response.headers.get('Content-Type', '') and not g.get('pagina_publica'):
         response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
         response.headers['Pragma'] = 'no-cache'
         response.headers['Expires'] = '0'
@@ -192,11 +339,41 @@ def admin_required(f):
     return decorated_function
 
 # Ruta principal - página de inicio
+def es_visitante_anonimo():
+    """Indica si la página no depende de la sesión (sin usuario ni carrito)"""
+    return not (session.get('user_id') or session.get('usuario') or session.get('cart'))
+
+def render_pagina_publica(plantilla, cargar_datos):
+    """Renderiza una página pública usando la caché de HTML para visitantes anónimos
+    
+    El HTML se guarda por plantilla y versión de datos (productos,
+    categorías e información de la tienda). El navegador lo revalida con
+    If-None-Match / If-Modified-Since y recibe 304 si no cambió. Los
+    usuarios con sesión siempre reciben la página renderizada al momento.
+    
+    Args:
+        plantilla (str): Plantilla a renderizar
+        cargar_datos (callable): Devuelve el diccionario `data` de la plantilla
+    """
+    if not es_visitante_anonimo():
+        return render_template(plantilla, data=cargar_datos())
+    
+    pagina = paginas_publicas_cache.get(plantilla)
+    if pagina is None:
+        pagina = paginas_publicas_cache.set(plantilla, render_template(plantilla, data=cargar_datos()))
+    
+    g.pagina_publica = True
+    response = make_response(pagina['html'])
+    response.set_etag(pagina['etag'])
+    response.last_modified = pagina['last_modified']
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
+
 @app.route('/')
 def home():
-    controller = HomeController()
-    data = controller.get_home_data()
-    return render_template('home/index.html', data=data)
+    controller = get_controller('home')
+    return render_pagina_publica('home/index.html', controller.get_home_data)
 
 # ----- RUTAS DEL DASHBOARD -----
 
@@ -205,12 +382,12 @@ def home():
 @login_required
 def dashboard():
     if session.get('is_admin'):
-        controller = DashboardHomeController()
+        controller = get_controller('dashboard_home')
         user_id = session.get('user_id')
         data = controller.get_dashboard_data(user_id)
         return render_template('dashboard/dashboardHome.html', data=data)
     else:
-        controller = DashboardHomeController()
+        controller = get_controller('dashboard_home')
         user_id = session.get('user_id')
         data = controller.get_dashboard_data(user_id)
         return render_template('dashboard/dashboardHome.html', data=data)
@@ -219,7 +396,7 @@ def dashboard():
 @app.route('/dashboard/productos', methods=['GET', 'POST', 'PUT', 'DELETE'])
 @admin_required
 def dashboard_productos():
-    controller = ProductosController()
+    controller = get_controller('productos')
     
     # GET - Mostrar lista de productos
     if request.method == 'GET':
@@ -250,11 +427,56 @@ def dashboard_productos():
         result = controller.crear_producto(data, files)
         return jsonify(result)
 
+# Listado de productos en JSON con paginación por cursor
+@app.route('/api/dashboard/productos')
+@admin_required
+def api_dashboard_productos():
+    controller = get_controller('productos')
+    
+    # type=int devuelve el valor por defecto si per_page no es un entero
+    per_page = max(1, min(request.args.get('per_page', 10, type=int), 100))
+    cursor = request.args.get('cursor', '')
+    
+    try:
+        data = controller.get_productos_data(per_page=per_page, cursor=cursor)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'productos': data['productos'],
+        'siguiente_cursor': data['siguiente_cursor'],
+        'hay_mas': data['hay_mas']
+    })
+
+# Serie de ventas para las gráficas del panel (lee sólo el resumen diario)
+#   /api/dashboard/ventas?rango=7d|30d|90d|12m
+#   /api/dashboard/ventas?desde=2024-01-01&hasta=2024-03-31&agrupar=dia|mes
+@app.route('/api/dashboard/ventas')
+@admin_required
+def api_dashboard_ventas():
+    try:
+        desde = request.args.get('desde')
+        hasta = request.args.get('hasta')
+        data = consultar_ventas(
+            rango=request.args.get('rango', '7d'),
+            desde=datetime.date.fromisoformat(desde) if desde else None,
+            hasta=datetime.date.fromisoformat(hasta) if hasta else None,
+            agrupar=request.args.get('agrupar')
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    if data is None:
+        return jsonify({'success': False, 'message': 'Error al consultar las ventas'}), 500
+    
+    return jsonify({'success': True, **data})
+
 # CRUD de productos mediante AJAX
 @app.route('/dashboard/productos/<int:producto_id>', methods=['GET', 'POST', 'PUT', 'DELETE'])
 @admin_required
 def dashboard_producto_crud(producto_id):
-    controller = ProductosController()
+    controller = get_controller('productos')
     
     # GET - Obtener producto específico
     if request.method == 'GET':
@@ -299,7 +521,7 @@ def dashboard_producto_status(producto_id):
     data = request.get_json()
     activo = data.get('activo', False)
     
-    controller = ProductosController()
+    controller = get_controller('productos')
     result = controller.actualizar_estado_producto(producto_id, activo)
     return jsonify(result)
 
@@ -307,7 +529,7 @@ def dashboard_producto_status(producto_id):
 @app.route('/dashboard/productos/imagen/<int:imagen_id>', methods=['DELETE'])
 @admin_required
 def dashboard_producto_imagen(imagen_id):
-    controller = ProductosController()
+    controller = get_controller('productos')
     result = controller.eliminar_imagen_producto(imagen_id)
     return jsonify(result)
 
@@ -317,7 +539,7 @@ def dashboard_producto_imagen(imagen_id):
 @app.route('/dashboard/categorias', methods=['GET', 'POST'])
 @admin_required
 def dashboard_categorias():
-    controller = CategoriasController()
+    controller = get_controller('categorias')
     
     # GET -Mostrar lista de categorías
     if request.method == 'GET':
@@ -342,7 +564,7 @@ def dashboard_categorias():
 @app.route('/dashboard/categorias/<int:categoria_id>', methods=['GET', 'POST', 'PUT', 'DELETE'])
 @admin_required
 def dashboard_categoria_crud(categoria_id):
-    controller = CategoriasController()
+    controller = get_controller('categorias')
     
     # GET - Obtener categoría específica
     if request.method == 'GET':
@@ -378,7 +600,7 @@ def dashboard_categoria_status(categoria_id):
     data = request.get_json()
     activo = data.get('activo', False)
     
-    controller = CategoriasController()
+    controller = get_controller('categorias')
     result = controller.actualizar_estado_categoria(categoria_id, activo)
     return jsonify(result)
 
@@ -388,7 +610,7 @@ def dashboard_categoria_status(categoria_id):
 @app.route('/dashboard/configuracion', methods=['GET', 'POST'])
 @admin_required
 def dashboard_configuracion():
-    controller = ConfiguracionController()
+    controller = get_controller('configuracion')
     
     # GET - Mostrar página de configuración
     if request.method == 'GET':
@@ -423,14 +645,13 @@ def dashboard_configuracion():
 # Rutas para la sección de servicios/productos
 @app.route('/servicios')
 def servicios():
-    controller = ServiciosController()
-    data = controller.get_servicios_data()
-    return render_template('servicios/servicios.html', data=data)
+    controller = get_controller('servicios')
+    return render_pagina_publica('servicios/servicios.html', controller.get_servicios_data)
 
 # Ruta para ver detalles de un servicio/producto específico
 @app.route('/servicios/<int:servicio_id>')
 def detalle_servicio(servicio_id):
-    controller = ServiciosController()
+    controller = get_controller('servicios')
     data = controller.get_servicios_data()  # Datos generales
     detalle = controller.get_detalle_servicio(servicio_id)
     
@@ -443,10 +664,31 @@ def detalle_servicio(servicio_id):
     
     return render_template('servicios/detalle_servicio.html', data=data)
 
+# Reseñas de un producto por páginas (botón "Ver más reseñas")
+@app.route('/api/servicios/<int:servicio_id>/resenas')
+def resenas_servicio(servicio_id):
+    controller = get_controller('servicios')
+    
+    # type=int devuelve el valor por defecto si per_page no es un entero
+    per_page = max(1, min(request.args.get('per_page', 10, type=int), 50))
+    cursor = request.args.get('cursor', '')
+    
+    try:
+        data = controller.get_resenas_producto(servicio_id, limit=per_page, cursor=cursor)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'resenas': data['resenas'],
+        'siguiente_cursor': data['siguiente_cursor'],
+        'hay_mas': data['hay_mas']
+    })
+
 # API para búsqueda de productos
 @app.route('/api/servicios/buscar', methods=['GET', 'POST'])
 def buscar_servicios():
-    controller = ServiciosController()
+    controller = get_controller('servicios')
     
     if request.method == 'POST':
         # Obtener datos del formulario JSON
@@ -459,20 +701,26 @@ def buscar_servicios():
         material = data.get('material')
         pagina = int(data.get('pagina', 1))
         items_por_pagina = int(data.get('items_por_pagina', 12))
+        # Paginación por cursor (opcional): "" para la primera página
+        cursor = data.get('cursor')
         
         # Calcular offset para paginación
         offset = (pagina - 1) * items_por_pagina
         
         # Realizar búsqueda
-        result = controller.buscar_productos(
-            termino=termino,
-            categoria_id=categoria_id,
-            precio_max=precio_max,
-            filtros=filtros,
-            material=material,
-            offset=offset,
-            limit=items_por_pagina
-        )
+        try:
+            result = controller.buscar_productos(
+                termino=termino,
+                categoria_id=categoria_id,
+                precio_max=precio_max,
+                filtros=filtros,
+                material=material,
+                offset=offset,
+                limit=items_por_pagina,
+                cursor=cursor
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
         
         return jsonify(result)
     else:
@@ -484,7 +732,7 @@ def buscar_servicios():
 # Ruta para la página de carrito de compras
 @app.route('/carrito')
 def carrito():
-    controller = CarroController()
+    controller = get_controller('carro')
     # Obtener ID de usuario si está autenticado
     usuario_id = session.get('user_id')
     data = controller.get_carro_data(usuario_id)
@@ -499,7 +747,7 @@ def add_to_cart():
     
     if session.get('user_id'):
         # Usuario autenticado - guardar en base de datos
-        controller = CarroController()
+        controller = get_controller('carro')
         result = controller.guardar_item_carrito(session['user_id'], producto_id, cantidad)
         return jsonify(result)
     else:
@@ -514,7 +762,7 @@ def update_cart_item():
     
     if session.get('user_id'):
         # Usuario autenticado - actualizar en base de datos
-        controller = CarroController()
+        controller = get_controller('carro')
         result = controller.actualizar_item_carrito(session['user_id'], producto_id, cantidad)
         return jsonify(result)
     else:
@@ -528,7 +776,7 @@ def remove_cart_item():
     
     if session.get('user_id'):
         # Usuario autenticado - eliminar de base de datos
-        controller = CarroController()
+        controller = get_controller('carro')
         result = controller.eliminar_item_carrito(session['user_id'], producto_id)
         return jsonify(result)
     else:
@@ -539,7 +787,7 @@ def remove_cart_item():
 def clear_cart():
     if session.get('user_id'):
         # Usuario autenticado - vaciar en base de datos
-        controller = CarroController()
+        controller = get_controller('carro')
         result = controller.vaciar_carrito(session['user_id'])
         return jsonify(result)
     else:
@@ -554,7 +802,7 @@ def crear_pedido():
     # Permitir pedidos sin autenticación
     data['usuario_id'] = session.get('user_id')  # Puede ser None para invitados
     
-    controller = CarroController()
+    controller = get_controller('carro')
     result = controller.procesar_pedido(data)
     
     return jsonify(result)
@@ -568,7 +816,7 @@ def verificar_cupon():
     if not codigo:
         return jsonify({'success': False, 'message': 'Código no proporcionado'})
     
-    controller = CarroController()
+    controller = get_controller('carro')
     result = controller.verificar_cupon(codigo)
     
     return jsonify(result)
@@ -581,7 +829,7 @@ def guardar_direccion():
     
     data = request.json
     
-    controller = CarroController()
+    controller = get_controller('carro')
     result = controller.guardar_direccion(session['user_id'], data)
     
     return jsonify(result)
@@ -596,24 +844,12 @@ def sincronizar_carrito():
     data = request.json
     items_carrito = data.get('items', [])
     
-    controller = CarroController()
-    
-    # Sincronizar cada item con la base de datos
-    for item in items_carrito:
-        producto_id = item.get('id')
-        cantidad = item.get('cantidad', 1)
-        
-        # Actualizar o añadir item en la base de datos
-        controller.guardar_item_carrito(session['user_id'], producto_id, cantidad)
+    controller = get_controller('carro')
     
-    # Obtener el carrito actualizado de la base de datos
-    carrito_actualizado = controller.get_items_carrito(session['user_id'])
+    # Validar, guardar y leer el carrito en tres consultas
+    result = controller.sincronizar_carrito(session['user_id'], items_carrito)
     
-    return jsonify({
-        'success': True, 
-        'message': 'Carrito sincronizado correctamente',
-        'carrito': carrito_actualizado
-    })
+    return jsonify(result)
 
 # ----- RUTAS DE AUTENTICACIÓN -----
 
@@ -624,7 +860,7 @@ def login():
     if 'user_id' in session:
         return redirect(url_for('dashboard'))
     
-    controller = LoginController()
+    controller = get_controller('login')
     data = controller.get_login_data()
     
     # Verificar si hay mensajes en los parámetros de URL
@@ -641,7 +877,7 @@ def login_post():
     password = request.form.get('password', '')
     remember = request.form.get('remember') == 'on'
     
-    controller = LoginController()
+    controller = get_controller('login')
     result = controller.login_user(email, password, remember)
     
     if result['success']:
@@ -684,7 +920,7 @@ def registro():
     if 'user_id' in session:
         return redirect(url_for('dashboard'))
     
-    controller = RegistroController()
+    controller = get_controller('registro')
     data = controller.get_registro_data()
     
     # Verificar si hay mensajes o parámetros en la URL
@@ -723,7 +959,7 @@ def registro_create_temp_user():
             'message': 'Las contraseñas no coinciden'
         })
     
-    controller = RegistroController()
+    controller = get_controller('registro')
     result = controller.create_temporary_user(nombre, apellidos, email, password, telefono)
     
     return jsonify(result)
@@ -742,7 +978,7 @@ def registro_verify_code():
     temp_user_id = data.get('temp_user_id')
     verification_code = data.get('verification_code')
     
-    controller = RegistroController()
+    controller = get_controller('registro')
     result = controller.verify_code(temp_user_id, verification_code)
     
     return jsonify(result)
@@ -758,7 +994,7 @@ def registro_resend_code():
             'message': 'Datos inválidos'
        })
     temp_user_id = data.get('temp_user_id')
-    controller = RegistroController()
+    controller = get_controller('registro')
     result = controller.resend_verification_code(temp_user_id)
     return jsonify(result)
 
@@ -768,7 +1004,7 @@ def registro_resend_code():
 def forgot_password_post():
    email = request.form.get('email', '')
    
-   controller = LoginController()
+   controller = get_controller('login')
    result = controller.forgot_password(email)
    
    # Redirigir a login con mensaje
@@ -785,7 +1021,7 @@ def reset_password():
    if not token:
        return redirect(url_for('login'))
    
-   controller = LoginController()
+   controller = get_controller('login')
    data = controller.get_login_data()
    data['token'] = token
    
@@ -808,7 +1044,7 @@ def reset_password_post():
        message = urllib.parse.quote('Las contraseñas no coinciden')
        return redirect(url_for('reset_password', token=token, message=message, type='error'))
    
-   controller = LoginController()
+   controller = get_controller('login')
    result = controller.reset_password(token, password)
    
    if result['success']:
@@ -820,35 +1056,43 @@ def reset_password_post():
        message = urllib.parse.quote(result['message'])
        return redirect(url_for('reset_password', token=token, message=message, type='error'))
 
+# ----- RUTAS DE MONITOREO -----
+
+# Readiness: con la base lista responde con la bandera cacheada, sin
+# consultar information_schema; si no lo está (caída al arrancar o migración
+# fallida) reintenta la verificación como máximo cada retry_interval segundos
+@app.route('/healthz')
+def healthz():
+    if ensure_database_ready():
+        return jsonify({'status': 'ok', 'database': True})
+    return jsonify({'status': 'unavailable', 'database': False}), 503
+
+# Estadísticas del pool de conexiones del worker actual
+@app.route('/api/monitor/db')
+@admin_required
+def monitor_db():
+    return jsonify({
+        'success': True,
+        'pool': get_pool_stats(),
+        'vistas': get_vistas_stats(),
+        'trabajos': get_trabajos_stats()
+    })
+
 # Página de 404 personalizada
 @app.errorhandler(404)
 def page_not_found(e):
-   controller = HomeController()
+   controller = get_controller('home')
    data = controller.get_home_data()
    return render_template('fijos/404.html', data=data), 404
 
 # Punto de entrada de la aplicación
 if __name__ == '__main__':
-   # Ejecutar limpieza de datos de ejemplo ANTES de iniciar la app
-   limpiar_datos_ejemplo_al_iniciar()
-   
-   # Crear carpeta de uploads si no existe
-   if not os.path.exists(UPLOAD_FOLDER):
-       os.makedirs(UPLOAD_FOLDER)
-   
-   # Crear subcarpeta de productos si no existe
-   products_folder = os.path.join(UPLOAD_FOLDER, 'products')
-   if not os.path.exists(products_folder):
-       os.makedirs(products_folder)
-   
-   # Crear subcarpeta de categorías si no existe
-   categories_folder = os.path.join(UPLOAD_FOLDER, 'categories')
-   if not os.path.exists(categories_folder):
-       os.makedirs(categories_folder)
-   
-   # Crear subcarpeta de configuración si no existe
-   config_folder = os.path.join(UPLOAD_FOLDER, 'config')
-   if not os.path.exists(config_folder):
-       os.makedirs(config_folder)
+   # La limpieza de datos de ejemplo es opcional al iniciar (LIMPIAR_DATOS_EJEMPLO=1);
+   # normalmente se ejecuta aparte con: flask --app app limpiar-datos-ejemplo
+   if os.environ.get('LIMPIAR_DATOS_EJEMPLO') == '1':
+      resultado = limpiar_datos_ejemplo()
+      print(f"Limpieza de datos de ejemplo: {sum(p['filas'] or 0 for p in resultado['pasos'])} filas "
+            f"eliminadas en {resultado['total_ms']:.0f} ms")
    
+   # Las carpetas de uploads ya se crearon en create_app()
    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,198 @@
+# benchmark_listados.py
+# Compara la latencia de los listados de productos con la subconsulta
+# correlacionada de imagen principal contra la columna productos.imagen_principal_url.
+#
+# Uso (desde la carpeta paginaweb):
+#   python -m backend.DB.benchmark_listados
+#   python -m backend.DB.benchmark_listados --tamanos 10000 100000 --repeticiones 30
+#
+# Trabaja en una base de datos aparte (<DATABASE>_bench) que se elimina al terminar.
+import argparse
+import statistics
+import time
+import mysql.connector
+from backend.DB.db_manager import DatabaseConfig
+
+BENCH_DATABASE = DatabaseConfig.DATABASE + '_bench'
+
+TABLAS = [
+    """
+    CREATE TABLE categorias (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        nombre VARCHAR(50) NOT NULL
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE productos (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        categoria_id INT,
+        nombre VARCHAR(100) NOT NULL,
+        descripcion TEXT,
+        precio DECIMAL(10,2) NOT NULL,
+        precio_descuento DECIMAL(10,2) NULL,
+        cantidad_stock INT DEFAULT 0,
+        destacado BOOLEAN DEFAULT 0,
+        nuevo BOOLEAN DEFAULT 0,
+        activo BOOLEAN DEFAULT 1,
+        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        contador_ventas INT DEFAULT 0,
+        imagen_principal_url VARCHAR(255) NULL,
+        FOREIGN KEY (categoria_id) REFERENCES categorias(id) ON DELETE SET NULL
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE imagenes_productos (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        producto_id INT NOT NULL,
+        url_imagen VARCHAR(255) NOT NULL,
+        es_principal BOOLEAN DEFAULT 0,
+        orden_visualizacion INT DEFAULT 0,
+        FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE
+    ) ENGINE=InnoDB
+    """,
+    "CREATE INDEX idx_productos_activo ON productos(activo)",
+    "CREATE INDEX idx_imagenes_productos ON imagenes_productos(producto_id)",
+    "CREATE INDEX idx_imagenes_principal ON imagenes_productos(producto_id, es_principal)"
+]
+
+# Misma forma que los listados de servicios/productos (página de 12) y el listado
+# completo del administrador
+CONSULTAS = {
+    'pagina_subconsulta': """
+        SELECT p.*, c.nombre as categoria_nombre,
+               (SELECT url_imagen FROM imagenes_productos
+                WHERE producto_id = p.id AND es_principal = 1
+                LIMIT 1) as imagen_principal
+        FROM productos p
+        LEFT JOIN categorias c ON p.categoria_id = c.id
+        WHERE p.activo = 1
+        ORDER BY p.destacado DESC, p.fecha_creacion DESC
+        LIMIT 12 OFFSET %s
+    """,
+    'pagina_columna': """
+        SELECT p.*, c.nombre as categoria_nombre,
+               p.imagen_principal_url as imagen_principal
+        FROM productos p
+        LEFT JOIN categorias c ON p.categoria_id = c.id
+        WHERE p.activo = 1
+        ORDER BY p.destacado DESC, p.fecha_creacion DESC
+        LIMIT 12 OFFSET %s
+    """,
+    'completo_subconsulta': """
+        SELECT p.id, p.nombre, p.precio, c.nombre as categoria_nombre,
+               (SELECT url_imagen FROM imagenes_productos
+                WHERE producto_id = p.id AND es_principal = 1
+                LIMIT 1) as imagen_principal
+        FROM productos p
+        LEFT JOIN categorias c ON p.categoria_id = c.id
+        WHERE %s >= 0
+    """,
+    'completo_columna': """
+        SELECT p.id, p.nombre, p.precio, c.nombre as categoria_nombre,
+               p.imagen_principal_url as imagen_principal
+        FROM productos p
+        LEFT JOIN categorias c ON p.categoria_id = c.id
+        WHERE %s >= 0
+    """
+}
+
+def conectar(database=None):
+    params = {
+        'host': DatabaseConfig.HOST,
+        'port': DatabaseConfig.PORT,
+        'user': DatabaseConfig.USER,
+        'password': DatabaseConfig.PASSWORD
+    }
+    if database:
+        params['database'] = database
+    return mysql.connector.connect(**params)
+
+def preparar_base(total_productos, imagenes_por_producto=3, lote=2000):
+    """Crea la base de pruebas con `total_productos` productos y sus imágenes"""
+    connection = conectar()
+    cursor = connection.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS {BENCH_DATABASE}")
+    cursor.execute(f"CREATE DATABASE {BENCH_DATABASE}")
+    cursor.execute(f"USE {BENCH_DATABASE}")
+    for sentencia in TABLAS:
+        cursor.execute(sentencia)
+    
+    cursor.executemany(
+        "INSERT INTO categorias (nombre) VALUES (%s)",
+        [(f"Categoría {i}",) for i in range(1, 11)]
+    )
+    
+    for inicio in range(1, total_productos + 1, lote):
+        ids = range(inicio, min(inicio + lote, total_productos + 1))
+        cursor.executemany(
+            """
+            INSERT INTO productos (id, categoria_id, nombre, descripcion, precio,
+                                   cantidad_stock, destacado, activo, imagen_principal_url)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            [(i, i % 10 + 1, f"Producto {i}", 'Descripción de prueba', 100 + i % 900,
+              i % 50, 1 if i % 20 == 0 else 0, 1 if i % 10 else 0,
+              f"/uploads/products/{i}/imagen_0.jpg") for i in ids]
+        )
+        cursor.executemany(
+            """
+            INSERT INTO imagenes_productos (producto_id, url_imagen, es_principal, orden_visualizacion)
+            VALUES (%s, %s, %s, %s)
+            """,
+            [(i, f"/uploads/products/{i}/imagen_{n}.jpg", 1 if n == 0 else 0, n)
+             for i in ids for n in range(imagenes_por_producto)]
+        )
+        connection.commit()
+    
+    cursor.execute("ANALYZE TABLE productos, imagenes_productos")
+    cursor.fetchall()
+    cursor.close()
+    connection.close()
+
+def medir(cursor, consulta, parametro, repeticiones):
+    """Ejecuta la consulta `repeticiones` veces y devuelve los tiempos en ms"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cursor.execute(consulta, (parametro,))
+        cursor.fetchall()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+def ejecutar(tamanos, repeticiones, conservar=False):
+    for total in tamanos:
+        print(f"\n=== {total} productos ===")
+        inicio = time.perf_counter()
+        preparar_base(total)
+        print(f"Datos generados en {time.perf_counter() - inicio:.1f} s")
+        
+        connection = conectar(BENCH_DATABASE)
+        cursor = connection.cursor()
+        # Página intermedia para que el OFFSET no favorezca a ninguna variante
+        offset = (total // 2) // 12 * 12
+        for nombre, consulta in CONSULTAS.items():
+            parametro = offset if nombre.startswith('pagina') else 0
+            medir(cursor, consulta, parametro, 2)  # calentar buffer pool
+            tiempos = medir(cursor, consulta, parametro, repeticiones)
+            p95 = sorted(tiempos)[max(0, int(len(tiempos) * 0.95) - 1)]
+            print(f"{nombre:<22} mediana {statistics.median(tiempos):8.2f} ms   p95 {p95:8.2f} ms")
+        cursor.close()
+        connection.close()
+    
+    if not conservar:
+        connection = conectar()
+        cursor = connection.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS {BENCH_DATABASE}")
+        cursor.close()
+        connection.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark de listados de productos (imagen principal)')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[10000, 100000],
+                        help='Cantidades de productos a probar')
+    parser.add_argument('--repeticiones', type=int, default=20,
+                        help='Ejecuciones medidas por consulta')
+    parser.add_argument('--conservar', action='store_true',
+                        help=f'No eliminar la base {BENCH_DATABASE} al terminar')
+    args = parser.parse_args()
+    ejecutar(args.tamanos, args.repeticiones, args.conservar)
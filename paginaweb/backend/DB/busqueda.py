@@ -0,0 +1,444 @@
+import os
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from backend.DB.db_manager import execute_query
+from backend.DB.cache import CacheConfig, get_version, bump_version
+
+class BusquedaConfig:
+    """Configuración del índice de búsqueda de productos"""
+    # Peso de cada campo en la relevancia: nombre > etiquetas > descripción
+    PESO_NOMBRE = 10
+    PESO_ETIQUETAS = 5
+    PESO_DESCRIPCION = 1
+    # Factor aplicado cuando el término sólo coincide como prefijo
+    FACTOR_PREFIJO = 0.7
+    # Máximo de términos del vocabulario que puede abarcar un prefijo
+    MAX_EXPANSION_PREFIJO = 200
+    # Segundos máximos antes de reconstruir el índice en segundo plano
+    # (recoge cambios de contador_ventas, que no avisan al índice)
+    EDAD_MAXIMA = int(os.environ.get('BUSQUEDA_EDAD_MAXIMA', 600))
+
+CLAVE_VERSION = 'busqueda_productos'
+
+PALABRAS_VACIAS = {
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'la', 'las', 'lo', 'los',
+    'o', 'para', 'por', 'su', 'sus', 'un', 'una', 'unos', 'unas', 'y'
+}
+
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+def normalizar(texto):
+    """Pasa el texto a minúsculas y sin acentos (la ñ queda como n)"""
+    if not texto:
+        return ''
+    # NFKD separa las tildes de la letra y el paso a ASCII las descarta
+    texto = unicodedata.normalize('NFKD', str(texto).lower()).encode('ascii', 'ignore').decode('ascii')
+    return _NO_ALFANUMERICO.sub(' ', texto)
+
+def _raiz(token):
+    """Quita el plural simple del español (monturas -> montura, cinturones -> cinturon)
+    
+    Se quita la 's' final y después la 'e' final, para que el singular y el
+    plural den la misma raíz tanto en "-es" como en "-e" + "s" (estuches y
+    estuche -> estuch, broches y broche -> broch).
+    """
+    if len(token) > 3 and token.endswith('s'):
+        token = token[:-1]
+    if len(token) > 3 and token.endswith('e'):
+        token = token[:-1]
+    return token
+
+def tokenizar(texto):
+    """Divide un texto en términos normalizados para el índice
+    
+    Args:
+        texto (str): Texto libre (nombre, descripción, etiqueta o consulta)
+    
+    Returns:
+        list: Términos sin acentos, sin palabras vacías y sin plural
+    """
+    return [_raiz(t) for t in normalizar(texto).split() if t not in PALABRAS_VACIAS]
+
+# (singular, plural) que deben encontrarse entre sí (comprobar_raices)
+PARES_SINGULAR_PLURAL = [
+    ('estuche', 'estuches'), ('broche', 'broches'), ('cinturon', 'cinturones'),
+    ('montura', 'monturas'), ('piel', 'pieles'), ('llavero', 'llaveros'),
+    ('bolsa', 'bolsas'), ('funda', 'fundas'), ('hebilla', 'hebillas'),
+    ('correa', 'correas'), ('billetera', 'billeteras'),
+    ('cartera', 'carteras'), ('llave', 'llaves'), ('sombrero', 'sombreros')
+]
+
+def comprobar_raices(pares=PARES_SINGULAR_PLURAL):
+    """Verifica que cada singular encuentre su plural en el índice y al revés
+    
+    Args:
+        pares (list): (singular, plural) a comprobar
+    
+    Returns:
+        list: (consulta, nombre del producto) de las búsquedas que no lo encontraron
+    """
+    fallos = []
+    for singular, plural in pares:
+        for consulta, nombre in ((singular, plural), (plural, singular)):
+            indice = IndiceProductos()
+            indice.agregar({'id': 1, 'nombre': f"{nombre.capitalize()} de piel"})
+            if indice.buscar(consulta)['ids'] != [1]:
+                fallos.append((consulta, nombre))
+    return fallos
+
+class IndiceProductos:
+    """Índice invertido en memoria de los productos activos
+    
+    Guarda para cada término los productos que lo contienen con su peso y, por
+    producto, los atributos de filtro y orden. Así una búsqueda filtra, ordena
+    y pagina en memoria y la base de datos sólo lee las filas de la página.
+    """
+    
+    def __init__(self):
+        self._postings = {}         # término -> {producto_id: peso}
+        self._terminos = []         # vocabulario ordenado (búsqueda por prefijo)
+        self._docs = {}             # producto_id -> atributos de filtro/orden
+        self._terminos_doc = {}     # producto_id -> términos indexados
+        self._orden = {}            # categoria_id (None = todas) -> IDs en orden de listado
+        self._lock = threading.RLock()
+    
+    def __len__(self):
+        return len(self._docs)
+    
+    def agregar(self, producto, etiquetas=None, ordenar=True):
+        """Agrega o reemplaza un producto en el índice
+        
+        Args:
+            producto (dict): Fila de productos (id, nombre, descripcion y filtros)
+            etiquetas (list, optional): Nombres de las etiquetas del producto
+            ordenar (bool): Mantener ordenado el vocabulario. En cargas masivas se
+                pasa False y se llama a ordenar_vocabulario() al final.
+        """
+        producto_id = producto['id']
+        pesos = {}
+        campos = (
+            (producto.get('nombre'), BusquedaConfig.PESO_NOMBRE),
+            (' '.join(etiquetas or []), BusquedaConfig.PESO_ETIQUETAS),
+            (producto.get('descripcion'), BusquedaConfig.PESO_DESCRIPCION)
+        )
+        for texto, peso in campos:
+            for termino in set(tokenizar(texto)):
+                pesos[termino] = pesos.get(termino, 0) + peso
+        
+        precio_descuento = producto.get('precio_descuento')
+        doc = {
+            'categoria_id': producto.get('categoria_id'),
+            'precio': float(precio_descuento if precio_descuento else producto.get('precio') or 0),
+            'descuento': precio_descuento is not None,
+            'nuevo': bool(producto.get('nuevo')),
+            'destacado': bool(producto.get('destacado')),
+            'material': (producto.get('material') or '').casefold(),
+            'ventas': producto.get('contador_ventas') or 0
+        }
+        
+        with self._lock:
+            self.eliminar(producto_id)
+            for termino, peso in pesos.items():
+                postings = self._postings.get(termino)
+                if postings is None:
+                    postings = self._postings[termino] = {}
+                    if ordenar:
+                        bisect.insort(self._terminos, termino)
+                    else:
+                        self._terminos.append(termino)
+                postings[producto_id] = peso
+            self._docs[producto_id] = doc
+            self._terminos_doc[producto_id] = list(pesos)
+    
+    def ordenar_vocabulario(self):
+        """Ordena el vocabulario después de una carga masiva"""
+        with self._lock:
+            self._terminos.sort()
+    
+    def eliminar(self, producto_id):
+        """Quita un producto del índice (no falla si no estaba)"""
+        with self._lock:
+            self._orden = {}
+            self._docs.pop(producto_id, None)
+            for termino in self._terminos_doc.pop(producto_id, ()):
+                postings = self._postings.get(termino)
+                if postings:
+                    postings.pop(producto_id, None)
+    
+    def _ordenados(self, categoria_id):
+        """IDs en el orden del listado de servicios (destacado, ventas), por categoría"""
+        ids = self._orden.get(categoria_id)
+        if ids is None:
+            if None not in self._orden:
+                self._orden[None] = sorted(self._docs, key=self._clave_orden)
+            ids = self._orden[None]
+            if categoria_id is not None:
+                ids = self._orden[categoria_id] = [pid for pid in ids if self._docs[pid]['categoria_id'] == categoria_id]
+        return ids
+    
+    def _coincidencias(self, termino):
+        """Devuelve {producto_id: puntaje} para un término de la consulta (exacto o prefijo)"""
+        inicio = bisect.bisect_left(self._terminos, termino)
+        fin = min(len(self._terminos), inicio + BusquedaConfig.MAX_EXPANSION_PREFIJO)
+        candidatos = []
+        for i in range(inicio, fin):
+            if not self._terminos[i].startswith(termino):
+                break
+            candidatos.append(self._terminos[i])
+        
+        if len(candidatos) == 1 and candidatos[0] == termino:
+            # Sólo coincidencia exacta: los postings ya son los puntajes
+            return self._postings[termino]
+        
+        resultado = {}
+        for candidato in candidatos:
+            factor = 1 if candidato == termino else BusquedaConfig.FACTOR_PREFIJO
+            for producto_id, peso in self._postings[candidato].items():
+                puntaje = peso * factor
+                if puntaje > resultado.get(producto_id, 0):
+                    resultado[producto_id] = puntaje
+        return resultado
+    
+    def _clave_orden(self, producto_id, puntaje=0):
+        """Clave de orden de un resultado: relevancia, destacado, ventas e id"""
+        doc = self._docs[producto_id]
+        return (-puntaje, 0 if doc['destacado'] else 1, -doc['ventas'], producto_id)
+    
+    def buscar(self, termino='', categoria_id=None, precio_max=None, filtros=None, material=None, offset=0, limit=12, despues_de=None):
+        """Filtra, ordena por relevancia y pagina en memoria
+        
+        Args:
+            despues_de (tuple, optional): Clave de orden del último resultado
+                visto (paginación por cursor); si se indica se ignora `offset`
+        
+        Returns:
+            dict: {'ids': IDs de la página, 'total': total de resultados,
+                'ultima_clave': clave de orden del último ID de la página,
+                'hay_mas': si quedan resultados después de la página}
+        
+        Raises:
+            ValueError: Si `despues_de` no es una clave de orden (cuatro números)
+        """
+        filtros = filtros or {}
+        material = material.casefold() if material else None
+        if despues_de is not None:
+            despues_de = tuple(despues_de)
+            # El cursor viene del cliente: compararlo con las claves exige números
+            if len(despues_de) != 4 or not all(
+                isinstance(valor, (int, float)) and math.isfinite(valor) for valor in despues_de
+            ):
+                raise ValueError('Cursor inválido')
+            offset = 0
+        
+        def cumple(doc):
+            return not (
+                (categoria_id is not None and doc['categoria_id'] != categoria_id) or
+                (precio_max is not None and doc['precio'] > precio_max) or
+                (filtros.get('descuento') and not doc['descuento']) or
+                (filtros.get('nuevo') and not doc['nuevo']) or
+                (filtros.get('destacado') and not doc['destacado']) or
+                (material and doc['material'] != material)
+            )
+        
+        with self._lock:
+            terminos = tokenizar(termino)
+            if not terminos:
+                ordenados = self._ordenados(categoria_id)
+                sin_filtros = precio_max is None and not material and not any(filtros.values())
+                if sin_filtros and despues_de is None:
+                    pagina = ordenados[offset:offset + limit]
+                    total = restantes = len(ordenados)
+                else:
+                    # Sin texto: recorrer el orden precalculado y cortar la página al vuelo
+                    pagina, total, restantes = [], 0, 0
+                    for producto_id in ordenados:
+                        if cumple(self._docs[producto_id]):
+                            total += 1
+                            if despues_de is not None and self._clave_orden(producto_id) <= despues_de:
+                                continue
+                            if offset <= restantes < offset + limit:
+                                pagina.append(producto_id)
+                            restantes += 1
+                return {
+                    'ids': pagina,
+                    'total': total,
+                    'ultima_clave': list(self._clave_orden(pagina[-1])) if pagina else None,
+                    'hay_mas': restantes > offset + limit
+                }
+            
+            # Todos los términos deben coincidir; empezar por el más selectivo
+            puntajes = None
+            for coincidencias in sorted((self._coincidencias(t) for t in terminos), key=len):
+                if puntajes is None:
+                    puntajes = coincidencias
+                else:
+                    puntajes = {pid: p + coincidencias[pid] for pid, p in puntajes.items() if pid in coincidencias}
+                if not puntajes:
+                    return {'ids': [], 'total': 0, 'ultima_clave': None, 'hay_mas': False}
+            
+            candidatos = []
+            for producto_id, puntaje in puntajes.items():
+                doc = self._docs.get(producto_id)
+                if doc is not None and cumple(doc):
+                    # Relevancia y, a igualdad, el mismo orden que el listado de servicios
+                    candidatos.append(self._clave_orden(producto_id, puntaje))
+        
+        total = len(candidatos)
+        if despues_de is not None:
+            candidatos = [c for c in candidatos if c > despues_de]
+        pagina = heapq.nsmallest(offset + limit, candidatos)[offset:] if limit > 0 else []
+        return {
+            'ids': [c[3] for c in pagina],
+            'total': total,
+            'ultima_clave': list(pagina[-1]) if pagina else None,
+            'hay_mas': len(candidatos) > offset + limit
+        }
+
+_PRODUCTOS_SQL = """
+    SELECT p.id, p.nombre, p.descripcion, p.categoria_id, p.precio, p.precio_descuento,
+           p.nuevo, p.destacado, p.material, p.contador_ventas
+    FROM productos p
+    WHERE p.activo = 1
+"""
+
+def _cargar_etiquetas(producto_id=None):
+    query = """
+        SELECT pe.producto_id, e.nombre
+        FROM productos_etiquetas pe
+        JOIN etiquetas e ON pe.etiqueta_id = e.id
+    """
+    params = None
+    if producto_id is not None:
+        query += " WHERE pe.producto_id = %s"
+        params = (producto_id,)
+    etiquetas = {}
+    for row in execute_query(query, params) or []:
+        etiquetas.setdefault(row['producto_id'], []).append(row['nombre'])
+    return etiquetas
+
+def construir_indice():
+    """Construye un índice nuevo con todos los productos activos
+    
+    Returns:
+        IndiceProductos: Índice cargado, o None si falló la consulta
+    """
+    productos = execute_query(_PRODUCTOS_SQL)
+    if productos is None:
+        return None
+    etiquetas = _cargar_etiquetas()
+    indice = IndiceProductos()
+    for producto in productos:
+        indice.agregar(producto, etiquetas.get(producto['id']), ordenar=False)
+    indice.ordenar_vocabulario()
+    indice.buscar()  # precalcular el orden del listado
+    return indice
+
+_indice = None
+_indice_version = None
+_indice_creado = 0.0
+_comprobado_en = 0.0
+_reconstruyendo = False
+_estado_lock = threading.Lock()
+# Serializa la primera construcción (síncrona) del índice
+_construccion_lock = threading.Lock()
+
+def _reconstruir(version):
+    """Reconstruye el índice y lo sustituye cuando está completo"""
+    global _indice, _indice_version, _indice_creado, _reconstruyendo
+    try:
+        inicio = time.monotonic()
+        indice = construir_indice()
+        if indice is not None:
+            with _estado_lock:
+                _indice = indice
+                _indice_version = version
+                _indice_creado = time.monotonic()
+            print(f"Índice de búsqueda: {len(indice)} productos en {(time.monotonic() - inicio) * 1000:.0f} ms")
+    finally:
+        _reconstruyendo = False
+
+def get_indice():
+    """Obtiene el índice del proceso
+    
+    La primera vez se construye de forma síncrona. Después, si otro worker
+    cambió productos (sello de versión en cache_versiones) o el índice es
+    demasiado antiguo, se reconstruye en un hilo mientras se sigue
+    respondiendo con el índice actual.
+    
+    Returns:
+        IndiceProductos: Índice listo para buscar, o None si no hay base de datos
+    """
+    global _comprobado_en, _reconstruyendo
+    ahora = time.monotonic()
+    if _indice is not None and ahora - _comprobado_en < CacheConfig.VERSION_CHECK_INTERVAL:
+        return _indice
+    
+    with _estado_lock:
+        if _indice is not None and time.monotonic() - _comprobado_en < CacheConfig.VERSION_CHECK_INTERVAL:
+            return _indice
+        _comprobado_en = time.monotonic()
+        version = get_version(CLAVE_VERSION)
+        if _indice is not None:
+            vencido = time.monotonic() - _indice_creado > BusquedaConfig.EDAD_MAXIMA
+            if (version != _indice_version or vencido) and not _reconstruyendo:
+                _reconstruyendo = True
+                threading.Thread(target=_reconstruir, args=(version,), daemon=True).start()
+            return _indice
+    
+    # Las peticiones que llegan durante la construcción esperan a que
+    # termine en lugar de construir cada una su propio índice
+    with _construccion_lock:
+        if _indice is None:
+            _reconstruyendo = True
+            _reconstruir(version)
+    return _indice
+
+def sincronizar_producto(producto_id):
+    """Actualiza un producto en el índice tras crearlo, editarlo o eliminarlo
+    
+    El cambio se aplica de inmediato en este proceso y se avisa al resto de
+    workers para que reconstruyan su índice. Este proceso guarda la versión
+    nueva como propia y no reconstruye, salvo que otro worker haya cambiado
+    productos entre medio.
+    
+    Args:
+        producto_id (int): ID del producto modificado
+    """
+    global _indice_version
+    try:
+        producto_id = int(producto_id)
+        indice, anterior = _indice, _indice_version
+        if indice is not None:
+            producto = execute_query(_PRODUCTOS_SQL + " AND p.id = %s", (producto_id,), fetchone=True)
+            if producto:
+                indice.agregar(producto, _cargar_etiquetas(producto_id).get(producto_id))
+            else:
+                # Eliminado o desactivado
+                indice.eliminar(producto_id)
+        bump_version(CLAVE_VERSION)
+        if indice is not None:
+            version = get_version(CLAVE_VERSION)
+            with _estado_lock:
+                # Sólo si la versión subió exactamente por este cambio y el
+                # índice no se sustituyó mientras tanto
+                if _indice is indice and _indice_version == anterior and version == (anterior or 0) + 1:
+                    _indice_version = version
+    except Exception as e:
+        print(f"Error sincronizando índice de búsqueda: {str(e)}")
+
+def buscar_ids(termino='', categoria_id=None, precio_max=None, filtros=None, material=None, offset=0, limit=12, despues_de=None):
+    """Busca productos activos en el índice
+    
+    Returns:
+        dict: Resultado de IndiceProductos.buscar (IDs en orden de relevancia),
+            o None si el índice no está disponible
+    """
+    indice = get_indice()
+    if indice is None:
+        return None
+    return indice.buscar(termino, categoria_id, precio_max, filtros, material, offset, limit, despues_de)
@@ -0,0 +1,234 @@
+import os
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from backend.DB.db_manager import execute_query
+
+class CacheConfig:
+    """Configuración de las cachés en memoria"""
+    # Cada cuántos segundos un worker revisa si otro worker invalidó una caché
+    VERSION_CHECK_INTERVAL = float(os.environ.get('CACHE_VERSION_CHECK', 5))
+    # Vida máxima del HTML cacheado de las páginas públicas (los contadores
+    # de la página cambian sin pasar por el panel de administración)
+    PAGINAS_TTL = float(os.environ.get('PAGINAS_CACHE_TTL', 300))
+    # Vida del resumen de pedidos de cada usuario en el dashboard del cliente
+    # (los cambios hechos en otro worker se ven como máximo tras este tiempo)
+    RESUMEN_USUARIO_TTL = float(os.environ.get('RESUMEN_USUARIO_TTL', 30))
+
+def get_version(clave):
+    """Obtiene la versión actual de una caché compartida entre workers"""
+    row = execute_query(
+        "SELECT version FROM cache_versiones WHERE clave = %s",
+        (clave,),
+        fetchone=True
+    )
+    return row['version'] if row else 0
+
+def bump_version(clave):
+    """Incrementa la versión de una caché para que todos los workers la recarguen"""
+    return execute_query("""
+        INSERT INTO cache_versiones (clave, version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """, (clave,), commit=True)
+
+class VersionedCache:
+    """Valor cacheado en memoria del proceso, invalidado por un sello de versión
+    
+    El worker que modifica los datos llama a `invalidate()`: descarta su copia
+    y sube la versión en `cache_versiones`. Los demás workers comparan la
+    versión como máximo cada `CacheConfig.VERSION_CHECK_INTERVAL` segundos y
+    recargan el valor cuando cambió.
+    """
+    
+    _MISSING = object()
+    
+    def __init__(self, clave, loader):
+        self.clave = clave
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._value = self._MISSING
+        self._version = None
+        self._checked_at = 0.0
+    
+    def get(self):
+        """Devuelve el valor cacheado, recargándolo si cambió la versión"""
+        now = time.monotonic()
+        value = self._value
+        if value is not self._MISSING and now - self._checked_at < CacheConfig.VERSION_CHECK_INTERVAL:
+            return value
+        
+        with self._lock:
+            if self._value is not self._MISSING and time.monotonic() - self._checked_at < CacheConfig.VERSION_CHECK_INTERVAL:
+                return self._value
+            
+            version = get_version(self.clave)
+            if self._value is not self._MISSING and version == self._version:
+                self._checked_at = time.monotonic()
+                return self._value
+            
+            value = self.loader()
+            # No cachear resultados vacíos (tabla vacía o error de conexión)
+            if value is not None:
+                self._value = value
+                self._version = version
+                self._checked_at = time.monotonic()
+            return value
+    
+    def invalidate(self):
+        """Descarta el valor local y avisa al resto de workers"""
+        with self._lock:
+            self._value = self._MISSING
+            self._version = None
+        bump_version(self.clave)
+
+class TTLCache:
+    """Caché en memoria del proceso con expiración por tiempo y tamaño máximo
+    
+    Para datos que pueden estar unos segundos desactualizados (conteos,
+    agregados) y no necesitan invalidación entre workers.
+    """
+    
+    def __init__(self, ttl, max_items=512):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._items = {}
+    
+    def get(self, clave):
+        """Devuelve el valor si no ha expirado, o None"""
+        item = self._items.get(clave)
+        if item is None:
+            return None
+        expira, valor = item
+        if time.monotonic() >= expira:
+            with self._lock:
+                self._items.pop(clave, None)
+            return None
+        return valor
+    
+    def set(self, clave, valor):
+        """Guarda un valor; si se llena, descarta primero los más antiguos"""
+        with self._lock:
+            if len(self._items) >= self.max_items and clave not in self._items:
+                # Los diccionarios conservan el orden de inserción
+                for vieja in list(self._items)[:max(1, self.max_items // 10)]:
+                    self._items.pop(vieja, None)
+            self._items.pop(clave, None)
+            self._items[clave] = (time.monotonic() + self.ttl, valor)
+    
+    def invalidate(self, clave=None):
+        """Elimina una clave, o todo si no se indica"""
+        with self._lock:
+            if clave is None:
+                self._items.clear()
+            else:
+                self._items.pop(clave, None)
+
+class CachePaginas:
+    """HTML renderizado de páginas públicas, por plantilla y versión de datos
+    
+    La clave es la plantilla más las versiones de `claves_version` en
+    `cache_versiones`: cuando el panel de administración cambia productos,
+    categorías o la información de la tienda sube alguna de esas versiones
+    y la siguiente visita vuelve a renderizar. Cada entrada guarda también su
+    ETag y fecha para responder 304 a los navegadores.
+    """
+    
+    def __init__(self, claves_version, ttl, max_items=32):
+        self.claves_version = claves_version
+        self._html = TTLCache(ttl, max_items)
+        self._lock = threading.Lock()
+        self._versiones = None
+        self._checked_at = 0.0
+    
+    def _get_versiones(self):
+        """Versiones actuales de los datos, revisadas cada VERSION_CHECK_INTERVAL"""
+        if self._versiones is not None and time.monotonic() - self._checked_at < CacheConfig.VERSION_CHECK_INTERVAL:
+            return self._versiones
+        with self._lock:
+            if self._versiones is None or time.monotonic() - self._checked_at >= CacheConfig.VERSION_CHECK_INTERVAL:
+                self._versiones = tuple(get_version(clave) for clave in self.claves_version)
+                self._checked_at = time.monotonic()
+            return self._versiones
+    
+    def get(self, plantilla):
+        """Devuelve la página cacheada de la plantilla, o None
+        
+        Returns:
+            dict: {'html', 'etag', 'last_modified'} o None
+        """
+        return self._html.get((plantilla, self._get_versiones()))
+    
+    def set(self, plantilla, html):
+        """Guarda el HTML renderizado de la plantilla con la versión actual
+        
+        Returns:
+            dict: Entrada guardada ({'html', 'etag', 'last_modified'})
+        """
+        pagina = {
+            'html': html,
+            'etag': hashlib.sha1(html.encode('utf-8')).hexdigest(),
+            'last_modified': datetime.now(timezone.utc).replace(microsecond=0)
+        }
+        self._html.set((plantilla, self._get_versiones()), pagina)
+        return pagina
+    
+    def descartar_local(self):
+        """Descarta las páginas de este worker y relee las versiones"""
+        self._html.invalidate()
+        with self._lock:
+            self._versiones = None
+    
+    def invalidate(self):
+        """Descarta las páginas de este worker y avisa al resto"""
+        self.descartar_local()
+        bump_version(self.claves_version[0])
+
+paginas_publicas_cache = CachePaginas(
+    ('paginas_publicas', 'informacion_tienda'),
+    CacheConfig.PAGINAS_TTL
+)
+
+def invalidar_paginas_publicas():
+    """Invalida el HTML cacheado de inicio y catálogo en todos los workers
+    
+    Llamar después de cambiar productos o categorías.
+    """
+    paginas_publicas_cache.invalidate()
+
+def _cargar_informacion_tienda():
+    return execute_query(
+        "SELECT * FROM informacion_tienda LIMIT 1",
+        fetchone=True
+    )
+
+informacion_tienda_cache = VersionedCache('informacion_tienda', _cargar_informacion_tienda)
+
+def get_informacion_tienda():
+    """Obtiene la fila de informacion_tienda desde la caché del proceso
+    
+    Returns:
+        dict: Copia de la información de la tienda, o None si no existe
+    """
+    info = informacion_tienda_cache.get()
+    return dict(info) if info else None
+
+def invalidar_informacion_tienda():
+    """Invalida la caché de informacion_tienda en todos los workers"""
+    informacion_tienda_cache.invalidate()
+    # La versión de informacion_tienda también forma parte de la clave de las
+    # páginas públicas; este worker la vuelve a leer de inmediato
+    paginas_publicas_cache.descartar_local()
+
+# Resumen de pedidos por usuario del dashboard del cliente (ver
+# DashboardHomeController._get_resumen_pedidos)
+resumen_usuarios_cache = TTLCache(CacheConfig.RESUMEN_USUARIO_TTL, max_items=2048)
+
+def invalidar_resumen_usuario(usuario_id):
+    """Descarta el resumen de pedidos cacheado de un usuario en este worker
+    
+    Llamar después de crear o modificar un pedido del usuario.
+    """
+    if usuario_id:
+        resumen_usuarios_cache.invalidate(usuario_id)
@@ -0,0 +1,128 @@
+import os
+import atexit
+import threading
+import time
+from backend.DB.db_manager import execute_query
+from backend.DB.tareas import TareaPeriodica
+
+class ContadoresConfig:
+    """Configuración del contador de vistas en memoria"""
+    # Segundos entre escrituras a la base de datos (ventana máxima de pérdida
+    # si el worker muere sin apagarse de forma ordenada)
+    INTERVALO_VISTAS = float(os.environ.get('VISTAS_FLUSH_INTERVALO', 10))
+    # Productos distintos pendientes que adelantan la escritura
+    MAX_PENDIENTES = int(os.environ.get('VISTAS_MAX_PENDIENTES', 1000))
+    # Productos por sentencia UPDATE
+    LOTE = 500
+
+class BufferVistas:
+    """Acumula en memoria las vistas de productos y las escribe en lote
+    
+    En lugar de un UPDATE por cada visita (bloqueo de fila en productos
+    populares), cada worker suma las vistas por producto y cada
+    `INTERVALO_VISTAS` segundos las aplica con un UPDATE ... CASE por lote.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pendientes = {}
+        self._tarea = TareaPeriodica('flush-vistas', ContadoresConfig.INTERVALO_VISTAS, self.flush)
+        self._flush_lock = threading.Lock()
+        # Métricas
+        self._flushes = 0
+        self._errores = 0
+        self._vistas_escritas = 0
+        self._ultimo_ms = 0.0
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+    
+    def registrar(self, producto_id, cantidad=1):
+        """Suma vistas a un producto (no toca la base de datos)"""
+        self._tarea.iniciar()
+        with self._lock:
+            self._pendientes[producto_id] = self._pendientes.get(producto_id, 0) + cantidad
+            lleno = len(self._pendientes) >= ContadoresConfig.MAX_PENDIENTES
+        if lleno:
+            self._tarea.despertar()
+    
+    def flush(self):
+        """Escribe las vistas acumuladas; si falla, las devuelve al buffer"""
+        with self._flush_lock:
+            with self._lock:
+                pendientes, self._pendientes = self._pendientes, {}
+            if not pendientes:
+                return
+            
+            inicio = time.monotonic()
+            ids = sorted(pendientes)  # mismo orden de bloqueo en todos los workers
+            fallidos = {}
+            for i in range(0, len(ids), ContadoresConfig.LOTE):
+                lote = ids[i:i + ContadoresConfig.LOTE]
+                casos = ' '.join(['WHEN %s THEN %s'] * len(lote))
+                placeholders = ', '.join(['%s'] * len(lote))
+                params = [valor for producto_id in lote for valor in (producto_id, pendientes[producto_id])]
+                resultado = execute_query(
+                    f"""
+                    UPDATE productos
+                    SET contador_vistas = contador_vistas + (CASE id {casos} END)
+                    WHERE id IN ({placeholders})
+                    """,
+                    params + lote,
+                    commit=True
+                )
+                if resultado and resultado.get('success'):
+                    self._vistas_escritas += sum(pendientes[producto_id] for producto_id in lote)
+                else:
+                    fallidos.update((producto_id, pendientes[producto_id]) for producto_id in lote)
+            
+            duracion = (time.monotonic() - inicio) * 1000
+            self._flushes += 1
+            self._ultimo_ms = duracion
+            self._total_ms += duracion
+            self._max_ms = max(self._max_ms, duracion)
+            
+            if fallidos:
+                self._errores += 1
+                with self._lock:
+                    # Reintentar en el siguiente ciclo sin crecer sin límite
+                    for producto_id, cantidad in fallidos.items():
+                        if len(self._pendientes) >= ContadoresConfig.MAX_PENDIENTES * 10:
+                            break
+                        self._pendientes[producto_id] = self._pendientes.get(producto_id, 0) + cantidad
+    
+    def detener(self):
+        """Escribe lo pendiente al apagar el worker"""
+        self._tarea.detener(ejecutar_final=True)
+    
+    def stats(self):
+        """Métricas del buffer para monitoreo"""
+        with self._lock:
+            pendientes = len(self._pendientes)
+            vistas_pendientes = sum(self._pendientes.values())
+        return {
+            'pid': os.getpid(),
+            'intervalo_s': ContadoresConfig.INTERVALO_VISTAS,
+            'productos_pendientes': pendientes,
+            'vistas_pendientes': vistas_pendientes,
+            'vistas_escritas': self._vistas_escritas,
+            'flushes': self._flushes,
+            'errores': self._errores,
+            'flush_ultimo_ms': round(self._ultimo_ms, 2),
+            'flush_promedio_ms': round(self._total_ms / self._flushes, 2) if self._flushes else 0,
+            'flush_max_ms': round(self._max_ms, 2)
+        }
+
+buffer_vistas = BufferVistas()
+atexit.register(buffer_vistas.detener)
+
+def registrar_vista(producto_id):
+    """Registra una vista de producto para escribirla en el siguiente lote"""
+    buffer_vistas.registrar(producto_id)
+
+def flush_vistas():
+    """Escribe de inmediato las vistas pendientes (apagado del worker)"""
+    buffer_vistas.detener()
+
+def get_vistas_stats():
+    """Métricas del contador de vistas de este worker"""
+    return buffer_vistas.stats()
@@ -0,0 +1,183 @@
+# correo.py
+# Envío de correos a través de la cola de trabajos.
+#
+# Backends (variable CORREO_BACKEND):
+#   consola  - imprime el correo (por defecto, igual que antes)
+#   smtp     - envía por SMTP a CORREO_SMTP_HOST:CORREO_SMTP_PUERTO
+#   memoria  - guarda los correos en `bandeja_memoria` (pruebas)
+#
+# Servidor SMTP local para pruebas (desde la carpeta paginaweb):
+#   python -m backend.DB.correo --puerto 1025
+#   CORREO_BACKEND=smtp CORREO_SMTP_PUERTO=1025 python app.py
+import os
+import smtplib
+import socketserver
+import threading
+from email.message import EmailMessage
+from email.parser import BytesParser
+from email import policy
+from backend.DB.trabajos import registrar_tarea, encolar
+
+class CorreoConfig:
+    """Configuración del envío de correos"""
+    BACKEND = os.environ.get('CORREO_BACKEND', 'consola')
+    REMITENTE = os.environ.get('CORREO_REMITENTE', 'Talabartería Rodríguez <no-responder@talabarteria.local>')
+    SMTP_HOST = os.environ.get('CORREO_SMTP_HOST', 'localhost')
+    SMTP_PUERTO = int(os.environ.get('CORREO_SMTP_PUERTO', 25))
+    SMTP_USUARIO = os.environ.get('CORREO_SMTP_USUARIO', '')
+    SMTP_CONTRASENA = os.environ.get('CORREO_SMTP_CONTRASENA', '')
+    SMTP_TLS = os.environ.get('CORREO_SMTP_TLS', '0') == '1'
+    SMTP_TIMEOUT = 15
+    # Dirección pública usada en los enlaces de los correos
+    URL_SITIO = os.environ.get('CORREO_URL_SITIO', 'http://localhost:5000').rstrip('/')
+    # Reintentos antes de dejar el correo como fallido (~1 hora con el backoff)
+    MAX_INTENTOS = 8
+
+# Correos enviados con el backend 'memoria'
+bandeja_memoria = []
+
+def _crear_mensaje(destinatario, asunto, cuerpo):
+    mensaje = EmailMessage()
+    mensaje['From'] = CorreoConfig.REMITENTE
+    mensaje['To'] = destinatario
+    mensaje['Subject'] = asunto
+    mensaje.set_content(cuerpo)
+    return mensaje
+
+def enviar_correo(destinatario, asunto, cuerpo):
+    """Envía un correo en el hilo actual con el backend configurado
+    
+    Args:
+        destinatario (str): Correo electrónico del destinatario
+        asunto (str): Asunto
+        cuerpo (str): Texto del mensaje
+    
+    Raises:
+        Exception: Si el servidor SMTP rechaza o no responde (la cola
+        reintenta el trabajo)
+    """
+    mensaje = _crear_mensaje(destinatario, asunto, cuerpo)
+    
+    if CorreoConfig.BACKEND == 'smtp':
+        with smtplib.SMTP(CorreoConfig.SMTP_HOST, CorreoConfig.SMTP_PUERTO,
+                          timeout=CorreoConfig.SMTP_TIMEOUT) as smtp:
+            if CorreoConfig.SMTP_TLS:
+                smtp.starttls()
+            if CorreoConfig.SMTP_USUARIO:
+                smtp.login(CorreoConfig.SMTP_USUARIO, CorreoConfig.SMTP_CONTRASENA)
+            smtp.send_message(mensaje)
+    elif CorreoConfig.BACKEND == 'memoria':
+        bandeja_memoria.append(mensaje)
+    else:
+        print(f"[SIMULACIÓN DE ENVÍO DE CORREO]\nPara: {destinatario}\nAsunto: {asunto}\nCuerpo: {cuerpo}")
+
+@registrar_tarea('correo.enviar')
+def _tarea_enviar_correo(datos):
+    enviar_correo(datos['destinatario'], datos['asunto'], datos['cuerpo'])
+
+def encolar_correo(destinatario, asunto, cuerpo):
+    """Programa el envío de un correo sin esperar al servidor SMTP
+    
+    Args:
+        destinatario (str): Correo electrónico del destinatario
+        asunto (str): Asunto
+        cuerpo (str): Texto del mensaje
+    
+    Returns:
+        int: ID del trabajo en la cola
+    """
+    return encolar('correo.enviar', {
+        'destinatario': destinatario,
+        'asunto': asunto,
+        'cuerpo': cuerpo
+    }, max_intentos=CorreoConfig.MAX_INTENTOS)
+
+class _ManejadorSMTP(socketserver.StreamRequestHandler):
+    """Implementa lo mínimo del protocolo SMTP para recibir correos"""
+    
+    def _responder(self, linea):
+        self.wfile.write(f"{linea}\r\n".encode('ascii'))
+    
+    def handle(self):
+        self._responder('220 localhost SMTP de pruebas')
+        remitente, destinatarios = None, []
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            comando = linea.decode('utf-8', 'replace').strip()
+            verbo = comando[:4].upper()
+            
+            if verbo in ('HELO', 'EHLO'):
+                self._responder('250 localhost')
+            elif verbo == 'MAIL':
+                remitente, destinatarios = comando.split(':', 1)[1].strip(), []
+                self._responder('250 OK')
+            elif verbo == 'RCPT':
+                destinatarios.append(comando.split(':', 1)[1].strip())
+                self._responder('250 OK')
+            elif verbo == 'DATA':
+                self._responder('354 Fin con <CRLF>.<CRLF>')
+                lineas = []
+                while True:
+                    linea = self.rfile.readline()
+                    if not linea or linea in (b'.\r\n', b'.\n'):
+                        break
+                    lineas.append(linea[1:] if linea.startswith(b'..') else linea)
+                mensaje = BytesParser(policy=policy.default).parsebytes(b''.join(lineas))
+                self.server.recibir(remitente, destinatarios, mensaje)
+                self._responder('250 OK')
+            elif verbo in ('RSET', 'NOOP'):
+                self._responder('250 OK')
+            elif verbo == 'QUIT':
+                self._responder('221 Hasta luego')
+                return
+            else:
+                self._responder('502 Comando no implementado')
+
+class ServidorSMTPPrueba(socketserver.ThreadingTCPServer):
+    """Servidor SMTP local que guarda los correos recibidos en memoria
+    
+    Uso en pruebas:
+        with ServidorSMTPPrueba() as servidor:
+            CorreoConfig.BACKEND = 'smtp'
+            CorreoConfig.SMTP_PUERTO = servidor.puerto
+            ...
+            assert servidor.mensajes[0]['To'] == 'cliente@ejemplo.com'
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self, host='127.0.0.1', puerto=0, mostrar=False):
+        super().__init__((host, puerto), _ManejadorSMTP)
+        self.puerto = self.server_address[1]
+        self.mostrar = mostrar
+        self.mensajes = []
+        self._hilo = None
+    
+    def recibir(self, remitente, destinatarios, mensaje):
+        self.mensajes.append(mensaje)
+        if self.mostrar:
+            print(f"[SMTP] De: {remitente} Para: {', '.join(destinatarios)}\n"
+                  f"Asunto: {mensaje['Subject']}\n{mensaje.get_content()}")
+    
+    def __enter__(self):
+        self._hilo = threading.Thread(target=self.serve_forever, name='smtp-prueba', daemon=True)
+        self._hilo.start()
+        return self
+    
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Servidor SMTP local que muestra los correos recibidos')
+    parser.add_argument('--puerto', type=int, default=1025, help='Puerto de escucha')
+    args = parser.parse_args()
+    servidor = ServidorSMTPPrueba(puerto=args.puerto, mostrar=True)
+    print(f"Servidor SMTP de pruebas escuchando en 127.0.0.1:{servidor.puerto}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.server_close()
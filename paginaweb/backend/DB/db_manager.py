@@ -1,5 +1,12 @@
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 import mysql.connector
 from mysql.connector import Error
+from flask import g, has_app_context
 
 class DatabaseConfig:
     """Configuración de la base de datos MySQL"""
@@ -8,9 +15,214 @@ class DatabaseConfig:
     USER = 'root'
     PASSWORD = '123456'
     DATABASE = 'talabarteria_rodriguez'
+    
+    # Pool de conexiones (por proceso/worker de gunicorn)
+    POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))       # segundos esperando una conexión libre
+    POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))       # segundos de vida máxima de una conexión
+    POOL_PING_INTERVAL = int(os.environ.get('DB_POOL_PING', 30))      # segundos inactiva antes de verificarla
+    
+    # Borrados de mantenimiento por rangos de clave primaria (eliminar_por_rangos)
+    DELETE_LOTE = int(os.environ.get('DB_DELETE_LOTE', 1000))        # IDs por rango
+    DELETE_PAUSA = float(os.environ.get('DB_DELETE_PAUSA', 0.05))     # segundos entre rangos con borrados
+
+class PoolTimeoutError(Error):
+    """No se obtuvo una conexión libre del pool dentro del tiempo de espera"""
+    pass
+
+class ConnectionPool:
+    """Pool de conexiones MySQL con verificación de salud, reciclaje y tiempo de espera
+    
+    Cada proceso (worker) mantiene su propio pool; si el proceso se bifurca
+    (fork de gunicorn) el pool se reinicia en el proceso hijo.
+    """
+    
+    def __init__(self, size, timeout, recycle, ping_interval):
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self._cond = threading.Condition()
+        self._reset()
+    
+    def _reset(self):
+        """Reinicia el estado interno (al crear el pool o tras un fork)"""
+        self._pid = os.getpid()
+        self._idle = deque()      # (conexion, creada_en, usada_en)
+        self._created_at = {}     # id(conexion) -> momento de creación
+        self._total = 0           # conexiones abiertas (libres + prestadas)
+        self._in_use = 0
+        self._waiters = 0
+        self._stats = {
+            'prestamos': 0,
+            'conexiones_creadas': 0,
+            'conexiones_descartadas': 0,
+            'timeouts': 0,
+            'espera_total_ms': 0.0,
+            'espera_max_ms': 0.0
+        }
+    
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            # Las conexiones heredadas del proceso padre no se pueden compartir
+            with self._cond:
+                if self._pid != os.getpid():
+                    self._reset()
+    
+    def _connect(self):
+        connection = mysql.connector.connect(
+            host=DatabaseConfig.HOST,
+            port=DatabaseConfig.PORT,
+            user=DatabaseConfig.USER,
+            password=DatabaseConfig.PASSWORD,
+            database=DatabaseConfig.DATABASE
+        )
+        with self._cond:
+            self._created_at[id(connection)] = time.monotonic()
+            self._stats['conexiones_creadas'] += 1
+        return connection
+    
+    def _discard(self, connection):
+        """Cierra una conexión sin devolverla al pool"""
+        with self._cond:
+            self._created_at.pop(id(connection), None)
+            self._stats['conexiones_descartadas'] += 1
+        try:
+            connection.close()
+        except Error:
+            pass
+    
+    def _is_healthy(self, connection, created_at, last_used):
+        """Indica si una conexión libre puede reutilizarse"""
+        now = time.monotonic()
+        if self.recycle and now - created_at > self.recycle:
+            return False
+        if now - last_used > self.ping_interval:
+            try:
+                connection.ping(reconnect=False)
+            except Error:
+                return False
+        return True
+    
+    def acquire(self):
+        """Obtiene una conexión del pool, esperando como máximo `timeout` segundos"""
+        self._check_pid()
+        start = time.monotonic()
+        deadline = start + self.timeout
+        
+        while True:
+            entry = None
+            with self._cond:
+                while not self._idle and self._total >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(msg=f"Tiempo de espera agotado ({self.timeout}s) para obtener una conexión del pool")
+                    self._waiters += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiters -= 1
+                
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    self._total += 1
+                self._in_use += 1
+            
+            try:
+                if entry:
+                    connection, created_at, last_used = entry
+                    if not self._is_healthy(connection, created_at, last_used):
+                        self._discard(connection)
+                        connection = self._connect()
+                else:
+                    connection = self._connect()
+            except Error:
+                # No se pudo abrir la conexión: liberar el lugar reservado
+                with self._cond:
+                    self._total -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+            
+            waited_ms = (time.monotonic() - start) * 1000
+            with self._cond:
+                self._stats['prestamos'] += 1
+                self._stats['espera_total_ms'] += waited_ms
+                self._stats['espera_max_ms'] = max(self._stats['espera_max_ms'], waited_ms)
+            return connection
+    
+    def release(self, connection, broken=False):
+        """Devuelve una conexión al pool (o la descarta si quedó inutilizable)"""
+        if self._pid != os.getpid():
+            return
+        
+        if not broken:
+            try:
+                # No dejar resultados pendientes, transacciones abiertas ni
+                # snapshots viejos para el siguiente uso
+                if connection.unread_result:
+                    connection.consume_results()
+                if connection.in_transaction:
+                    connection.rollback()
+            except Error:
+                broken = True
+        
+        with self._cond:
+            self._in_use -= 1
+            if broken:
+                self._total -= 1
+            else:
+                created_at = self._created_at.get(id(connection), time.monotonic())
+                self._idle.append((connection, created_at, time.monotonic()))
+            self._cond.notify()
+        
+        if broken:
+            self._discard(connection)
+    
+    def stats(self):
+        """Devuelve estadísticas del pool para monitoreo"""
+        with self._cond:
+            prestamos = self._stats['prestamos']
+            return {
+                'pid': self._pid,
+                'tamano': self.size,
+                'abiertas': self._total,
+                'en_uso': self._in_use,
+                'libres': len(self._idle),
+                'en_espera': self._waiters,
+                'prestamos': prestamos,
+                'conexiones_creadas': self._stats['conexiones_creadas'],
+                'conexiones_descartadas': self._stats['conexiones_descartadas'],
+                'timeouts': self._stats['timeouts'],
+                'espera_promedio_ms': round(self._stats['espera_total_ms'] / prestamos, 3) if prestamos else 0.0,
+                'espera_max_ms': round(self._stats['espera_max_ms'], 3)
+            }
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Obtiene el pool de conexiones del proceso actual (se crea la primera vez)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    size=DatabaseConfig.POOL_SIZE,
+                    timeout=DatabaseConfig.POOL_TIMEOUT,
+                    recycle=DatabaseConfig.POOL_RECYCLE,
+                    ping_interval=DatabaseConfig.POOL_PING_INTERVAL
+                )
+    return _pool
+
+def get_pool_stats():
+    """Estadísticas del pool de conexiones (en uso, en espera, tiempos de espera)"""
+    return get_pool().stats()
 
 def get_db_connection():
-    """Crea una conexión a la base de datos MySQL"""
+    """Crea una conexión a la base de datos MySQL fuera del pool"""
     try:
         connection = mysql.connector.connect(
             host=DatabaseConfig.HOST,
@@ -24,90 +236,408 @@ def get_db_connection():
         print(f"Error al conectar a MySQL: {e}")
         return None
 
+def _acquire_connection():
+    """Toma una conexión del pool; devuelve None si no fue posible"""
+    try:
+        return get_pool().acquire()
+    except Error as e:
+        print(f"Error al obtener conexión del pool: {e}")
+        return None
+
+def _release_connection(connection, error=None):
+    """Devuelve la conexión al pool, descartándola si el error la dejó inutilizable"""
+    broken = False
+    if error is not None:
+        try:
+            broken = not connection.is_connected()
+        except Error:
+            broken = True
+    get_pool().release(connection, broken=broken)
+
+class DBSession:
+    """Conexión compartida por todas las consultas de una misma petición
+    
+    La conexión se toma del pool en la primera consulta y se devuelve al
+    terminar la petición. Dentro de `transaction()` los commit de cada
+    consulta se difieren hasta el final del bloque, que confirma o revierte
+    todo junto.
+    """
+    
+    def __init__(self):
+        self.connection = None
+        self.transaction_depth = 0
+        self.failed = False
+        self.committed = False
+    
+    @property
+    def in_transaction(self):
+        return self.transaction_depth > 0
+    
+    def get_connection(self):
+        """Devuelve la conexión de la sesión, tomándola del pool si aún no tiene"""
+        if self.connection is None:
+            self.connection = _acquire_connection()
+        return self.connection
+    
+    def mark_error(self, error):
+        """Registra un error de consulta: invalida la transacción y descarta la conexión si se perdió
+        
+        Args:
+            error (Exception): Error de MySQL, o None si no se pudo obtener conexión
+        """
+        if self.in_transaction:
+            self.failed = True
+        if self.connection is not None:
+            try:
+                connected = self.connection.is_connected()
+            except Error:
+                connected = False
+            if not connected:
+                get_pool().release(self.connection, broken=True)
+                self.connection = None
+    
+    def close(self):
+        """Devuelve la conexión al pool (lo no confirmado se revierte)"""
+        if self.connection is not None:
+            get_pool().release(self.connection)
+            self.connection = None
+        self.transaction_depth = 0
+        self.failed = False
+
+_local = threading.local()
+
+def _current_session():
+    """Sesión activa: la de la petición de Flask o la de una transacción fuera de Flask"""
+    session = getattr(_local, 'session', None)
+    if session is not None:
+        return session
+    if has_app_context():
+        if '_db_session' not in g:
+            g._db_session = DBSession()
+        return g._db_session
+    return None
+
+def close_db_session(exception=None):
+    """Libera la conexión de la petición actual (registrado en teardown_appcontext)"""
+    session = g.pop('_db_session', None)
+    if session is not None:
+        session.close()
+
+def init_db_session(app):
+    """Registra la liberación de la conexión al terminar cada petición"""
+    app.teardown_appcontext(close_db_session)
+
+@contextmanager
+def transaction():
+    """Agrupa varias consultas en una transacción atómica
+    
+    Uso:
+        with transaction() as tx:
+            execute_query("UPDATE ...", params, commit=True)
+            execute_query("INSERT ...", params, commit=True)
+        if not tx.committed:
+            ...
+    
+    Si alguna consulta falla o se lanza una excepción dentro del bloque,
+    se revierte todo. Los bloques anidados se integran en la transacción
+    externa.
+    """
+    session = _current_session()
+    owns_session = session is None
+    if owns_session:
+        # Fuera de una petición (scripts, hilos de fondo): sesión temporal
+        session = DBSession()
+        _local.session = session
+    
+    if not session.in_transaction:
+        session.failed = False
+        session.committed = False
+    session.transaction_depth += 1
+    
+    try:
+        yield session
+    except Exception:
+        session.failed = True
+        raise
+    finally:
+        session.transaction_depth -= 1
+        if session.transaction_depth == 0:
+            connection = session.connection
+            if connection is not None:
+                try:
+                    if session.failed:
+                        connection.rollback()
+                    else:
+                        connection.commit()
+                        session.committed = True
+                except Error as e:
+                    print(f"Error al finalizar transacción: {e}")
+                    session.failed = True
+                    session.mark_error(e)
+            # Sin conexión no se confirmó nada: committed queda en False
+        
+        if owns_session and session.transaction_depth == 0:
+            session.close()
+            _local.session = None
+
 def execute_query(query, params=(), fetchone=False, commit=False, return_last_id=False):
     """Ejecuta una consulta SQL y devuelve los resultados"""
-    connection = get_db_connection()
+    session = _current_session()
+    connection = session.get_connection() if session else _acquire_connection()
     if not connection:
+        if session:
+            # Dentro de una transacción invalida el bloque completo
+            session.mark_error(None)
         if commit:
             return {"success": False, "error": "No se pudo conectar a la base de datos"}
         return None
     
-    cursor = connection.cursor(dictionary=True)
+    cursor = connection.cursor(dictionary=True, buffered=True)
     result = None
+    error = None
     
     try:
         cursor.execute(query, params)
         
         if commit:
-            connection.commit()
+            if not (session and session.in_transaction):
+                connection.commit()
             if return_last_id:
                 return cursor.lastrowid
-            return {"success": True, "lastrowid": cursor.lastrowid}
+            return {"success": True, "lastrowid": cursor.lastrowid, "rowcount": cursor.rowcount}
         
         if fetchone:
             result = cursor.fetchone()
         else:
             result = cursor.fetchall()
     except Error as e:
+        error = e
         print(f"Error al ejecutar consulta: {e}")
         if commit:
             return {"success": False, "error": str(e)}
         result = None
     finally:
         cursor.close()
-        connection.close()
+        if session:
+            if error is not None:
+                session.mark_error(error)
+        else:
+            _release_connection(connection, error)
     
     return result
 
 def execute_many(query, params_list, commit=True):
     """Ejecuta una consulta SQL múltiples veces con diferentes parámetros"""
-    connection = get_db_connection()
+    session = _current_session()
+    connection = session.get_connection() if session else _acquire_connection()
     if not connection:
+        if session:
+            session.mark_error(None)
         return {"success": False, "error": "No se pudo conectar a la base de datos"}
     
     cursor = connection.cursor()
+    error = None
     
     try:
         cursor.executemany(query, params_list)
         
         if commit:
-            connection.commit()
+            if not (session and session.in_transaction):
+                connection.commit()
             return {"success": True, "rowcount": cursor.rowcount}
         
     except Error as e:
+        error = e
         print(f"Error al ejecutar consulta múltiple: {e}")
         return {"success": False, "error": str(e)}
     finally:
         cursor.close()
-        connection.close()
+        if session:
+            if error is not None:
+                session.mark_error(error)
+        else:
+            _release_connection(connection, error)
     
     return {"success": True}
 
+def eliminar_por_rangos(tabla, condicion, params=(), lote=None, pausa=None, progreso=None):
+    """Elimina filas recorriendo la clave primaria por rangos
+    
+    Para borrados de mantenimiento en una base en producción: en lugar de un
+    DELETE sobre toda la tabla (bloqueos largos y una transacción enorme que
+    retrasa a las réplicas), recorre `id` en rangos de `lote` valores. En
+    cada rango lee los IDs que cumplen la condición y los borra por clave
+    primaria con su propio commit, y hace una pausa antes del siguiente.
+    
+    Args:
+        tabla (str): Tabla con clave primaria `id` (alias `t` en la condición)
+        condicion (str): Condición SQL sobre `t`; puede consultar la misma
+            tabla (el borrado es por IDs, sin subconsultas)
+        params (tuple): Parámetros de la condición
+        lote (int, optional): Valores de `id` por rango
+        pausa (float, optional): Segundos de espera tras un rango con borrados
+        progreso (callable, optional): Recibe un dict con 'tabla', 'hasta_id',
+            'max_id', 'eliminadas' y 'porcentaje' después de cada rango con borrados
+    
+    Returns:
+        dict: Resultado con los siguientes campos:
+            - success (bool): Si se recorrió toda la tabla sin errores
+            - eliminadas (int): Filas eliminadas
+            - rangos (int): Rangos recorridos
+            - ms (float): Duración total
+    """
+    lote = lote or DatabaseConfig.DELETE_LOTE
+    pausa = DatabaseConfig.DELETE_PAUSA if pausa is None else pausa
+    inicio = time.monotonic()
+    resultado = {'success': True, 'eliminadas': 0, 'rangos': 0, 'ms': 0.0}
+    
+    limites = execute_query(f"SELECT MIN(id) as min_id, MAX(id) as max_id FROM {tabla}", fetchone=True)
+    if limites is None:
+        resultado['success'] = False
+    elif limites['min_id'] is not None:
+        min_id, max_id = limites['min_id'], limites['max_id']
+        for desde in range(min_id, max_id + 1, lote):
+            hasta = min(desde + lote - 1, max_id)
+            resultado['rangos'] += 1
+            filas = execute_query(
+                f"SELECT t.id FROM {tabla} t WHERE t.id BETWEEN %s AND %s AND ({condicion})",
+                (desde, hasta) + tuple(params)
+            )
+            if filas is None:
+                resultado['success'] = False
+                break
+            if not filas:
+                continue
+            
+            ids = [fila['id'] for fila in filas]
+            placeholders = ', '.join(['%s'] * len(ids))
+            borrado = execute_query(f"DELETE FROM {tabla} WHERE id IN ({placeholders})", ids, commit=True)
+            if not borrado or not borrado.get('success'):
+                resultado['success'] = False
+                break
+            resultado['eliminadas'] += borrado.get('rowcount', len(ids))
+            
+            if progreso:
+                progreso({
+                    'tabla': tabla,
+                    'hasta_id': hasta,
+                    'max_id': max_id,
+                    'eliminadas': resultado['eliminadas'],
+                    'porcentaje': round((hasta - min_id + 1) * 100 / (max_id - min_id + 1), 1)
+                })
+            if pausa:
+                time.sleep(pausa)
+    
+    resultado['ms'] = round((time.monotonic() - inicio) * 1000, 2)
+    return resultado
+
+def dividir_sentencias(script):
+    """Divide un script SQL en sentencias
+    
+    A diferencia de script.split(';'), respeta los ';' dentro de cadenas,
+    identificadores entre comillas invertidas y comentarios, y entiende
+    DELIMITER (triggers o procedimientos con BEGIN ... END).
+    
+    Args:
+        script (str): Contenido de un archivo .sql
+    
+    Returns:
+        list: Sentencias sin el delimitador ni los comentarios
+    """
+    sentencias = []
+    actual = []
+    delimitador = ';'
+    inicio_linea = True
+    i, n = 0, len(script)
+    
+    while i < n:
+        if inicio_linea:
+            inicio_linea = False
+            fin = script.find('\n', i)
+            fin = n if fin == -1 else fin
+            linea = script[i:fin].strip()
+            # DELIMITER es una directiva del cliente mysql, no del servidor
+            if linea.upper().startswith('DELIMITER ') and not ''.join(actual).strip():
+                delimitador = linea.split(None, 1)[1]
+                i = fin + 1
+                inicio_linea = True
+                continue
+        
+        c = script[i]
+        if script.startswith(delimitador, i):
+            sentencia = ''.join(actual).strip()
+            if sentencia:
+                sentencias.append(sentencia)
+            actual = []
+            i += len(delimitador)
+        elif c in ("'", '"', '`'):
+            # Cadena o identificador completo (con \' o comillas duplicadas)
+            j = i + 1
+            while j < n:
+                if script[j] == '\\' and c != '`':
+                    j += 2
+                elif script[j] == c and script[j + 1:j + 2] == c:
+                    j += 2
+                elif script[j] == c:
+                    break
+                else:
+                    j += 1
+            actual.append(script[i:j + 1])
+            i = j + 1
+        elif c == '#' or (script.startswith('--', i) and script[i + 2:i + 3] in ('', ' ', '\t', '\r', '\n')):
+            # Comentario hasta el final de la línea
+            fin = script.find('\n', i)
+            i = n if fin == -1 else fin
+        elif script.startswith('/*', i) and not script.startswith('/*!', i):
+            fin = script.find('*/', i + 2)
+            i = n if fin == -1 else fin + 2
+            actual.append(' ')
+        else:
+            actual.append(c)
+            inicio_linea = c == '\n'
+            i += 1
+    
+    sentencia = ''.join(actual).strip()
+    if sentencia:
+        sentencias.append(sentencia)
+    return sentencias
+
 def execute_script(script_content):
-    """Ejecuta un script SQL completo"""
-    connection = get_db_connection()
+    """Ejecuta un script SQL completo
+    
+    Se detiene en la primera sentencia que falla.
+    """
+    session = _current_session()
+    connection = session.get_connection() if session else _acquire_connection()
     if not connection:
         return False
     
     cursor = connection.cursor()
+    error = None
+    command = None
     
     try:
-        # Dividir el script en comandos individuales
-        commands = script_content.split(';')
-        
-        for command in commands:
-            command = command.strip()
-            if command:
-                cursor.execute(command)
+        for command in dividir_sentencias(script_content):
+            cursor.execute(command)
+            if cursor.with_rows:
+                cursor.fetchall()
         
-        connection.commit()
+        if not (session and session.in_transaction):
+            connection.commit()
         return True
     except Error as e:
+        error = e
         print(f"Error al ejecutar script: {e}")
+        if command:
+            print(f"Sentencia: {command[:200]}")
         return False
     finally:
         cursor.close()
-        connection.close()
+        if session:
+            if error is not None:
+                session.mark_error(error)
+        else:
+            _release_connection(connection, error)
 
 def check_database_exists():
     """Verifica si la base de datos existe y tiene las tablas necesarias"""
@@ -151,6 +681,105 @@ def check_database_exists():
             cursor.close()
             connection.close()
 
+_db_ready = False
+_db_ready_checked_at = 0.0
+_db_ready_lock = threading.Lock()
+
+def ensure_database_ready(retry_interval=30):
+    """Verifica (y crea si hace falta) la base de datos una sola vez por proceso
+    
+    Se llama en el arranque (gunicorn on_starting / inicio de la app). El
+    resultado queda en caché; si la base de datos no estaba disponible se
+    reintenta como máximo cada `retry_interval` segundos.
+    
+    Returns:
+        bool: True si la base de datos está lista
+    """
+    global _db_ready, _db_ready_checked_at
+    if _db_ready:
+        return True
+    
+    with _db_ready_lock:
+        if _db_ready:
+            return True
+        if _db_ready_checked_at and time.monotonic() - _db_ready_checked_at < retry_interval:
+            return False
+        _db_ready_checked_at = time.monotonic()
+        
+        # Importado aquí: migraciones depende de este módulo
+        from backend.DB.migraciones import aplicar_migraciones, registrar_linea_base
+        
+        # Lista sólo cuando el esquema quedó al día: si una migración falla
+        # se reintenta como las demás fallas (pasado retry_interval)
+        if check_database_exists():
+            _db_ready = aplicar_migraciones()['success']
+        else:
+            print("La base de datos no existe o está incompleta. Creando...")
+            if create_database():
+                print("Base de datos creada exitosamente")
+                # tablas.sql ya incluye el resultado de todas las migraciones
+                _db_ready = check_database_exists() and registrar_linea_base()
+            else:
+                print("Error al crear la base de datos")
+        
+        return _db_ready
+
+def recalcular_calificaciones(producto_id=None):
+    """Recalcula productos.rating_* desde la tabla de reseñas
+    
+    Los triggers mantienen los valores al día; esto sólo hace falta después
+    de borrados en cascada (p. ej. al eliminar un usuario), que en MySQL no
+    disparan triggers.
+    
+    Args:
+        producto_id (int, optional): Recalcular sólo este producto
+    """
+    filtro = "WHERE p.id = %s" if producto_id is not None else ""
+    return execute_query(f"""
+        UPDATE productos p
+        LEFT JOIN (
+            SELECT producto_id, COUNT(*) as total, SUM(calificacion) as suma
+            FROM resenas
+            WHERE aprobada = 1
+            GROUP BY producto_id
+        ) r ON r.producto_id = p.id
+        SET p.rating_count = COALESCE(r.total, 0),
+            p.rating_suma = COALESCE(r.suma, 0),
+            p.rating_avg = IF(r.total > 0, r.suma / r.total, 0),
+            p.fecha_actualizacion = p.fecha_actualizacion
+        {filtro}
+    """, (producto_id,) if producto_id is not None else (), commit=True)
+
+def reconstruir_ventas_diarias():
+    """Recalcula el resumen ventas_diarias desde pedidos e items_pedido
+    
+    El checkout y los cambios de estado lo mantienen al día; esto sólo hace
+    falta después de borrados masivos de pedidos (limpieza de datos de
+    ejemplo, cascadas al eliminar usuarios).
+    
+    Returns:
+        bool: True si se guardó el resumen nuevo
+    """
+    with transaction() as tx:
+        execute_query("DELETE FROM ventas_diarias", commit=True)
+        execute_query("""
+            INSERT INTO ventas_diarias (fecha, estado, pedidos, ingresos, unidades)
+            SELECT DATE(p.fecha_pedido), p.estado, COUNT(*), SUM(p.monto_total),
+                   COALESCE(SUM(i.unidades), 0)
+            FROM pedidos p
+            LEFT JOIN (
+                SELECT pedido_id, SUM(cantidad) as unidades
+                FROM items_pedido
+                GROUP BY pedido_id
+            ) i ON i.pedido_id = p.id
+            GROUP BY DATE(p.fecha_pedido), p.estado
+        """, commit=True)
+    return tx.committed
+
+def is_database_ready():
+    """Indica si la verificación de arranque de la base de datos fue exitosa"""
+    return _db_ready
+
 def create_database():
     """Crea SOLO la estructura de la base de datos sin datos de ejemplo"""
     try:
@@ -178,35 +807,34 @@ def create_database():
         # Si no hay tablas, crear SOLO el esquema
         if tables_count == 0:
             print("Creando estructura de base de datos...")
-            import os
             script_dir = os.path.dirname(os.path.abspath(__file__))
             
             # Ejecutar SOLO el esquema
-            esquema_file = os.path.join(script_dir, 'esquema.sql')
-            if os.path.exists(esquema_file):
-                print(f"Ejecutando script: esquema.sql")
-                with open(esquema_file, 'r', encoding='utf-8') as f:
-                    script_content = f.read()
-                
-                # Eliminar líneas específicas que no son compatibles
-                script_content = script_content.replace('USE talabarteria_rodriguez;', '')
-                
-                # Dividir el script en comandos individuales
-                commands = script_content.split(';')
-                
-                for command in commands:
-                    command = command.strip()
-                    if command and not command.startswith('--'):
-                        try:
-                            cursor.execute(command)
-                        except Error as e:
-                            print(f"Error al ejecutar comando: {e}")
-                            print(f"Comando problemático: {command[:100]}...")
-                
-                connection.commit()
-                print("Estructura de base de datos creada exitosamente")
-            else:
-                print(f"Archivo esquema.sql no encontrado: {esquema_file}")
+            esquema_file = os.path.join(script_dir, 'tablas.sql')
+            if not os.path.exists(esquema_file):
+                print(f"Archivo tablas.sql no encontrado: {esquema_file}")
+                return False
+            
+            print("Ejecutando script: tablas.sql")
+            with open(esquema_file, 'r', encoding='utf-8') as f:
+                sentencias = dividir_sentencias(f.read())
+            
+            inicio = time.monotonic()
+            for command in sentencias:
+                # La base de datos ya está creada y seleccionada con el
+                # nombre configurado (tablas.sql la borra y la crea)
+                if re.match(r'(DROP|CREATE)\s+DATABASE\b|USE\b', command, re.IGNORECASE):
+                    continue
+                try:
+                    cursor.execute(command)
+                except Error as e:
+                    print(f"Error al ejecutar comando: {e}")
+                    print(f"Comando problemático: {command[:200]}")
+                    return False
+            
+            connection.commit()
+            print(f"Estructura de base de datos creada exitosamente "
+                  f"({len(sentencias)} sentencias, {(time.monotonic() - inicio) * 1000:.0f} ms)")
         else:
             print(f"La base de datos ya tiene {tables_count} tablas")
         
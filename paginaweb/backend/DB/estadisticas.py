@@ -0,0 +1,223 @@
+import os
+import json
+import datetime
+import decimal
+import threading
+from backend.DB.db_manager import execute_query
+from backend.DB.tareas import TareaPeriodica
+
+class EstadisticasConfig:
+    """Configuración de las estadísticas precalculadas del panel de administración"""
+    # Segundos entre revisiones del hilo de fondo
+    INTERVALO_REVISION = float(os.environ.get('ESTADISTICAS_REVISION', 30))
+    # Edad máxima de las listas (pedidos recientes, más vendidos...) aunque no
+    # haya cambios registrados en este worker
+    INTERVALO = float(os.environ.get('ESTADISTICAS_INTERVALO', 600))
+    # Segundos entre recuentos completos de los contadores (COUNT(*) de cada
+    # tabla); entre uno y otro sólo se ajustan con cada escritura
+    INTERVALO_RECONCILIAR = float(os.environ.get('ESTADISTICAS_RECONCILIAR', 86400))
+    # Umbral de "poco stock"
+    STOCK_BAJO = 5
+
+# Contadores que se ajustan al momento en cada escritura
+CONTADORES = ('total_productos', 'total_categorias', 'total_usuarios', 'total_pedidos', 'productos_sin_stock')
+
+# Recalcula todos los contadores en una sola sentencia (corrige cualquier
+# desviación de los ajustes incrementales; sólo cada INTERVALO_RECONCILIAR)
+_RECALCULAR_CONTADORES_SQL = """
+    UPDATE estadisticas_dashboard
+    SET total_productos = (SELECT COUNT(*) FROM productos),
+        total_categorias = (SELECT COUNT(*) FROM categorias),
+        total_usuarios = (SELECT COUNT(*) FROM usuarios),
+        total_pedidos = (SELECT COUNT(*) FROM pedidos),
+        productos_sin_stock = (SELECT COUNT(*) FROM productos WHERE cantidad_stock = 0 AND activo = 1),
+        contadores_reconciliados_en = NOW()
+    WHERE id = 1
+"""
+
+_LISTAS_SQL = {
+    'pedidos_recientes': """
+        SELECT p.id, p.fecha_pedido, p.monto_total, p.estado, p.estado_pago,
+               u.nombre, u.apellidos
+        FROM pedidos p
+        JOIN usuarios u ON p.usuario_id = u.id
+        ORDER BY p.fecha_pedido DESC
+        LIMIT 5
+    """,
+    # Del resumen ventas_diarias (backend/DB/ventas.py), no de pedidos
+    'ventas_por_dia': """
+        SELECT fecha, SUM(ingresos) as total_ventas
+        FROM ventas_diarias
+        WHERE fecha >= DATE_SUB(CURRENT_DATE, INTERVAL 7 DAY)
+        GROUP BY fecha
+        HAVING SUM(pedidos) > 0
+        ORDER BY fecha
+    """,
+    # contador_ventas (unidades de pedidos no cancelados, ver ventas.mover_venta):
+    # no recorre items_pedido
+    'productos_top': """
+        SELECT id, nombre, precio, contador_ventas as total_vendido
+        FROM productos
+        WHERE contador_ventas > 0
+        ORDER BY contador_ventas DESC, id
+        LIMIT 5
+    """,
+    'productos_bajo_stock': f"""
+        SELECT id, nombre, cantidad_stock
+        FROM productos
+        WHERE cantidad_stock <= {EstadisticasConfig.STOCK_BAJO} AND cantidad_stock > 0 AND activo = 1
+        ORDER BY cantidad_stock ASC
+        LIMIT 5
+    """
+}
+
+def _a_json(valor):
+    """Convierte Decimal y fechas de MySQL para guardarlos en JSON"""
+    if isinstance(valor, decimal.Decimal):
+        return float(valor)
+    if isinstance(valor, (datetime.date, datetime.datetime)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+class EstadisticasDashboard:
+    """Estadísticas del panel de administración guardadas en una fila
+    
+    Los contadores (productos, categorías, usuarios, pedidos, sin stock) se
+    ajustan con un UPDATE de una fila después de cada escritura y se
+    recuentan con COUNT(*) sólo cada INTERVALO_RECONCILIAR. Las listas
+    (pedidos recientes, ventas de 7 días, más vendidos, poco stock) se
+    recalculan en segundo plano y se guardan como JSON. El panel las lee
+    con una sola consulta, sin importar el tamaño del historial.
+    """
+    
+    def __init__(self):
+        self._tarea = TareaPeriodica('estadisticas', EstadisticasConfig.INTERVALO_REVISION, self._tarea_actualizar)
+        self._lock = threading.Lock()
+        self._pendiente = False
+    
+    def obtener(self):
+        """Estadísticas precalculadas
+        
+        Returns:
+            dict: Contadores y listas, o None si no se pudieron leer
+        """
+        self._tarea.iniciar()
+        row = execute_query("SELECT * FROM estadisticas_dashboard WHERE id = 1", fetchone=True)
+        if not row or row.get('actualizado_en') is None:
+            # Base recién creada: calcular ahora la primera vez
+            if not (self.reconciliar() and self.actualizar()):
+                return None
+            row = execute_query("SELECT * FROM estadisticas_dashboard WHERE id = 1", fetchone=True)
+            if not row:
+                return None
+        
+        stats = {contador: row[contador] for contador in CONTADORES}
+        for lista in _LISTAS_SQL:
+            valor = row.get(lista)
+            stats[lista] = json.loads(valor) if isinstance(valor, (str, bytes)) else (valor or [])
+        stats['actualizado_en'] = row['actualizado_en']
+        return stats
+    
+    def ajustar(self, contador, cantidad=1):
+        """Suma (o resta) a un contador y programa la actualización de las listas
+        
+        Args:
+            contador (str): Uno de CONTADORES
+            cantidad (int): Valor a sumar
+        """
+        if contador not in CONTADORES:
+            raise ValueError(f"Contador no válido: {contador}")
+        execute_query(
+            f"UPDATE estadisticas_dashboard SET {contador} = GREATEST({contador} + %s, 0) WHERE id = 1",
+            (cantidad,),
+            commit=True
+        )
+        self.marcar_cambio()
+    
+    def marcar_cambio(self):
+        """Indica que las listas cambiaron (se recalculan en la siguiente revisión)"""
+        with self._lock:
+            self._pendiente = True
+        self._tarea.iniciar()
+    
+    def reconciliar(self):
+        """Recuenta los contadores con COUNT(*) de cada tabla
+        
+        Returns:
+            bool: True si se guardaron los valores nuevos
+        """
+        execute_query("INSERT IGNORE INTO estadisticas_dashboard (id) VALUES (1)", commit=True)
+        resultado = execute_query(_RECALCULAR_CONTADORES_SQL, commit=True)
+        return bool(resultado and resultado.get('success'))
+    
+    def actualizar(self):
+        """Recalcula las listas (los contadores no se tocan)
+        
+        Returns:
+            bool: True si se guardaron los valores nuevos
+        """
+        with self._lock:
+            self._pendiente = False
+        
+        listas = {}
+        for nombre, query in _LISTAS_SQL.items():
+            filas = execute_query(query)
+            if filas is None:
+                with self._lock:
+                    self._pendiente = True
+                return False
+            listas[nombre] = json.dumps(filas, default=_a_json)
+        
+        execute_query("INSERT IGNORE INTO estadisticas_dashboard (id) VALUES (1)", commit=True)
+        columnas = ', '.join(f"{nombre} = %s" for nombre in listas)
+        guardado = execute_query(
+            f"UPDATE estadisticas_dashboard SET {columnas}, actualizado_en = NOW() WHERE id = 1",
+            tuple(listas.values()),
+            commit=True
+        )
+        if not (guardado and guardado.get('success')):
+            with self._lock:
+                self._pendiente = True
+            return False
+        return True
+    
+    def _tarea_actualizar(self):
+        """Actualiza las listas si hubo cambios en este worker o si tienen más
+        de INTERVALO, y recuenta los contadores si tienen más de INTERVALO_RECONCILIAR
+        
+        Las edades se leen de la base de datos: cuando un worker actualiza,
+        los demás no repiten el trabajo.
+        """
+        row = execute_query("""
+            SELECT TIMESTAMPDIFF(SECOND, actualizado_en, NOW()) as edad,
+                   TIMESTAMPDIFF(SECOND, contadores_reconciliados_en, NOW()) as edad_contadores
+            FROM estadisticas_dashboard WHERE id = 1
+        """, fetchone=True)
+        if not row:
+            return
+        if row['edad_contadores'] is None or row['edad_contadores'] >= EstadisticasConfig.INTERVALO_RECONCILIAR:
+            self.reconciliar()
+        if self._pendiente or row['edad'] is None or row['edad'] >= EstadisticasConfig.INTERVALO:
+            self.actualizar()
+
+estadisticas_dashboard = EstadisticasDashboard()
+
+def get_estadisticas_dashboard():
+    """Estadísticas precalculadas del panel de administración"""
+    return estadisticas_dashboard.obtener()
+
+def ajustar_estadistica(contador, cantidad=1):
+    """Ajusta un contador tras una escritura (crear o eliminar registros)"""
+    estadisticas_dashboard.ajustar(contador, cantidad)
+
+def marcar_estadisticas_desactualizadas():
+    """Programa el recálculo de las listas tras un cambio que no altera contadores"""
+    estadisticas_dashboard.marcar_cambio()
+
+def actualizar_estadisticas():
+    """Recalcula las listas de estadísticas en el hilo actual"""
+    return estadisticas_dashboard.actualizar()
+
+def reconciliar_estadisticas():
+    """Recuenta los contadores en el hilo actual (tras borrados masivos o en cascada)"""
+    return estadisticas_dashboard.reconciliar()
@@ -0,0 +1,204 @@
+import os
+import re
+from PIL import Image, ImageOps
+from backend.DB.trabajos import registrar_tarea, encolar
+
+class ImagenesConfig:
+    """Configuración de las variantes de imágenes subidas"""
+    # (nombre, ancho máximo en px); la última es la que se guarda como url_imagen
+    VARIANTES = (('thumb', 160), ('card', 480), ('detail', 1200))
+    CALIDAD_WEBP = 80
+    CALIDAD_JPEG = 82
+    # Intentos del trabajo de variantes (una imagen dañada no mejora al reintentar)
+    MAX_INTENTOS = 3
+
+# /uploads/.../<base>_<variante>.<formato>
+_PATRON_VARIANTE = re.compile(r'^(?P<base>.+)_(?P<variante>thumb|card|detail)\.(?P<formato>jpg|png|webp)$')
+
+def _ruta_desde_url(upload_folder, url):
+    """Convierte una URL /uploads/... en la ruta del archivo"""
+    return os.path.join(upload_folder, url.replace('/uploads/', '', 1))
+
+def generar_variantes(ruta_original):
+    """Genera las variantes redimensionadas de una imagen
+    
+    Cada variante se guarda en WebP y en JPEG (PNG si la imagen tiene
+    transparencia) junto al original, como <base>_<variante>.<formato>.
+    La orientación EXIF se aplica a los píxeles y los metadatos no se
+    copian (ubicación GPS, modelo de cámara, etc.).
+    
+    Args:
+        ruta_original (str): Ruta del archivo subido
+    
+    Returns:
+        dict: {variante: {'ancho', 'alto', 'webp', 'jpg' o 'png'}} con los
+        nombres de archivo generados
+    """
+    carpeta = os.path.dirname(ruta_original)
+    base = os.path.splitext(os.path.basename(ruta_original))[0]
+    variantes = {}
+    
+    with Image.open(ruta_original) as original:
+        imagen = ImageOps.exif_transpose(original)
+        transparente = imagen.mode in ('RGBA', 'LA') or (imagen.mode == 'P' and 'transparency' in imagen.info)
+        imagen = imagen.convert('RGBA' if transparente else 'RGB')
+        imagen.info = {}
+        respaldo = 'png' if transparente else 'jpg'
+        
+        for nombre, ancho in ImagenesConfig.VARIANTES:
+            if imagen.width > ancho:
+                alto = max(1, round(imagen.height * ancho / imagen.width))
+                copia = imagen.resize((ancho, alto), Image.LANCZOS)
+            else:
+                copia = imagen
+            
+            archivo_webp = f"{base}_{nombre}.webp"
+            copia.save(os.path.join(carpeta, archivo_webp), 'WEBP',
+                       quality=ImagenesConfig.CALIDAD_WEBP, method=4)
+            
+            archivo_respaldo = f"{base}_{nombre}.{respaldo}"
+            if transparente:
+                copia.save(os.path.join(carpeta, archivo_respaldo), 'PNG', optimize=True)
+            else:
+                copia.save(os.path.join(carpeta, archivo_respaldo), 'JPEG',
+                           quality=ImagenesConfig.CALIDAD_JPEG, optimize=True, progressive=True)
+            
+            variantes[nombre] = {
+                'ancho': copia.width,
+                'alto': copia.height,
+                'webp': archivo_webp,
+                respaldo: archivo_respaldo
+            }
+    
+    return variantes
+
+def url_variantes(url_original, variantes):
+    """Convierte los nombres de archivo de `generar_variantes` en URLs"""
+    carpeta = url_original.rsplit('/', 1)[0]
+    return {
+        nombre: {clave: (f"{carpeta}/{valor}" if isinstance(valor, str) else valor)
+                 for clave, valor in datos.items()}
+        for nombre, datos in variantes.items()
+    }
+
+def eliminar_archivos_imagen(upload_folder, url_imagen):
+    """Elimina una imagen subida y, si es una variante, todas sus hermanas"""
+    if not url_imagen:
+        return
+    rutas = [_ruta_desde_url(upload_folder, url_imagen)]
+    coincidencia = _PATRON_VARIANTE.match(url_imagen)
+    if coincidencia:
+        base = coincidencia.group('base')
+        rutas = [
+            _ruta_desde_url(upload_folder, f"{base}_{nombre}.{formato}")
+            for nombre, _ in ImagenesConfig.VARIANTES
+            for formato in ('webp', 'jpg', 'png')
+        ]
+    for ruta in rutas:
+        if os.path.exists(ruta):
+            try:
+                os.remove(ruta)
+            except Exception as e:
+                print(f"Error eliminando archivo: {str(e)}")
+
+def srcset(url_imagen, formato=None):
+    """Valor del atributo srcset para una imagen con variantes
+    
+    Args:
+        url_imagen (str): URL guardada (variante 'detail')
+        formato (str, optional): 'webp' para la fuente WebP; por defecto el
+            mismo formato de la URL (JPEG o PNG)
+    
+    Returns:
+        str: "url 160w, url 480w, url 1200w", o '' si la imagen no tiene
+        variantes (imágenes subidas antes de este cambio)
+    """
+    coincidencia = _PATRON_VARIANTE.match(url_imagen or '')
+    if not coincidencia:
+        return ''
+    base = coincidencia.group('base')
+    formato = formato or coincidencia.group('formato')
+    return ', '.join(f"{base}_{nombre}.{formato} {ancho}w" for nombre, ancho in ImagenesConfig.VARIANTES)
+
+def url_variante(url_imagen, variante):
+    """URL de otra variante (p. ej. 'thumb') de la misma imagen, o la URL original"""
+    coincidencia = _PATRON_VARIANTE.match(url_imagen or '')
+    if not coincidencia:
+        return url_imagen
+    return f"{coincidencia.group('base')}_{variante}.{coincidencia.group('formato')}"
+
+# Funciones que apuntan el registro de cada tipo de imagen a la variante nueva
+_DESTINOS = {}
+
+def registrar_destino_imagen(destino, funcion):
+    """Registra la función que guarda las variantes de un tipo de imagen
+    
+    Args:
+        destino (str): Nombre usado al encolar ('producto', 'categoria', ...)
+        funcion (callable): `funcion(url_original, url_nueva, variantes, **datos)`;
+            devuelve False si el registro ya no existe
+    """
+    _DESTINOS[destino] = funcion
+
+@registrar_tarea('imagenes.variantes')
+def _tarea_variantes(datos):
+    upload_folder, url_original = datos['upload_folder'], datos['url']
+    if not os.path.exists(_ruta_desde_url(upload_folder, url_original)):
+        return  # la imagen se eliminó antes de procesarla
+    registrar = _DESTINOS.get(datos['destino'])
+    if registrar is None:
+        raise LookupError(f"Destino de imagen no registrado: {datos['destino']}")
+    
+    try:
+        variantes = url_variantes(url_original, generar_variantes(_ruta_desde_url(upload_folder, url_original)))
+    except Exception as e:
+        # Imagen dañada o formato no soportado: se conserva el original
+        print(f"Error generando variantes de {url_original}: {str(e)}")
+        return
+    
+    respaldo = 'png' if 'png' in variantes['detail'] else 'jpg'
+    url_nueva = variantes['detail'][respaldo]
+    try:
+        guardada = registrar(url_original, url_nueva, variantes, **datos.get('datos', {}))
+    except Exception:
+        # Error de base de datos: se reintenta el trabajo completo
+        eliminar_archivos_imagen(upload_folder, url_nueva)
+        raise
+    
+    if guardada:
+        # El original conserva los metadatos EXIF: ya nadie lo referencia
+        eliminar_archivos_imagen(upload_folder, url_original)
+    else:
+        # La imagen se eliminó mientras se procesaba
+        eliminar_archivos_imagen(upload_folder, url_nueva)
+
+@registrar_tarea('imagenes.eliminar')
+def _tarea_eliminar(datos):
+    eliminar_archivos_imagen(datos['upload_folder'], datos['url'])
+
+def procesar_en_segundo_plano(upload_folder, url_original, destino, **datos):
+    """Encola la generación de las variantes de una imagen subida
+    
+    La petición guarda el original y responde de inmediato; mientras tanto
+    la página usa el original. Al terminar se llama a la función registrada
+    para `destino`, que debe apuntar el registro a la variante 'detail' y
+    devolver True; entonces se borra el original. Si devuelve False se
+    borran las variantes.
+    
+    Args:
+        upload_folder (str): Carpeta raíz de /uploads
+        url_original (str): URL /uploads/... del archivo guardado
+        destino (str): Destino registrado con registrar_destino_imagen
+        **datos: Parámetros adicionales para la función del destino
+    """
+    return encolar('imagenes.variantes', {
+        'upload_folder': upload_folder,
+        'url': url_original,
+        'destino': destino,
+        'datos': datos
+    }, max_intentos=ImagenesConfig.MAX_INTENTOS)
+
+def eliminar_en_segundo_plano(upload_folder, url_imagen):
+    """Encola el borrado de una imagen y sus variantes"""
+    if url_imagen:
+        encolar('imagenes.eliminar', {'upload_folder': upload_folder, 'url': url_imagen})
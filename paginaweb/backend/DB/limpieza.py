@@ -0,0 +1,136 @@
+import time
+from backend.DB.db_manager import DatabaseConfig, execute_query, eliminar_por_rangos, recalcular_calificaciones, reconstruir_ventas_diarias
+from backend.DB.cache import invalidar_informacion_tienda, invalidar_paginas_publicas
+from backend.DB.estadisticas import actualizar_estadisticas, reconciliar_estadisticas
+from backend.DB.ventas import recalcular_contador_ventas
+
+class LimpiezaConfig:
+    """Configuración de la limpieza de datos de ejemplo"""
+    # Valores de id por rango (cada rango es una transacción corta)
+    LOTE = DatabaseConfig.DELETE_LOTE
+    # Segundos de pausa entre rangos con borrados (da aire a las réplicas)
+    PAUSA = DatabaseConfig.DELETE_PAUSA
+
+# (descripción, tabla, condición sobre el alias t). Los huérfanos se buscan
+# con NOT EXISTS, que usa el índice de la tabla referenciada, en lugar de
+# NOT IN (SELECT ...). El orden importa: los pasos posteriores limpian lo
+# que dejan huérfano los anteriores.
+_PASOS = [
+    ("Usuarios de ejemplo", "usuarios", """
+        t.correo IN (
+            'admin@talabarteriarodriguez.com',
+            'ventas@talabarteriarodriguez.com',
+            'cliente@ejemplo.com'
+        )
+    """),
+    ("Administradores huérfanos", "administradores", """
+        NOT EXISTS (SELECT 1 FROM usuarios u WHERE u.id = t.usuario_id)
+    """),
+    ("Productos de ejemplo", "productos", """
+        t.sku IN (
+            'MONT-001', 'MONT-002', 'CINCH-001', 'CINCH-002',
+            'BOOT-001', 'HAT-001', 'SPUR-001', 'ACC-001', 'ACC-002'
+        )
+        OR t.nombre IN (
+            'Montura Charra Clásica',
+            'Montura de Gala Premium',
+            'Cincho Piteado Fino',
+            'Cincho Liso Clásico',
+            'Bota Charra de Piel',
+            'Sombrero Charro de Gala',
+            'Espuelas de Acero Inoxidable',
+            'Riendas Trenzadas',
+            'Chicote de Jineteo'
+        )
+    """),
+    ("Categorías de ejemplo vacías", "categorias", """
+        t.nombre IN (
+            'Monturas', 'Cinchos y Cinturones', 'Botas y Calzado',
+            'Sombreros', 'Espuelas', 'Accesorios',
+            'Monturas de Faena', 'Monturas de Gala',
+            'Cinchos de Montura', 'Cinturones Charros'
+        )
+        AND NOT EXISTS (SELECT 1 FROM productos p WHERE p.categoria_id = t.id)
+        AND NOT EXISTS (SELECT 1 FROM categorias h WHERE h.categoria_padre_id = t.id)
+    """),
+    ("Pedidos huérfanos", "pedidos", """
+        (t.usuario_id IS NOT NULL
+         AND NOT EXISTS (SELECT 1 FROM usuarios u WHERE u.id = t.usuario_id))
+        OR (t.direccion_envio_id IS NOT NULL
+            AND NOT EXISTS (SELECT 1 FROM direcciones_envio d WHERE d.id = t.direccion_envio_id))
+    """),
+    ("Información de tienda de ejemplo", "informacion_tienda", """
+        t.email = 'contacto@talabarteriarodriguez.com'
+        AND t.facebook = 'https://facebook.com/talabarteriarodriguez'
+        AND t.instagram = 'https://instagram.com/talabarteriarodriguez'
+    """),
+    ("Imágenes de ejemplo", "imagenes_productos", """
+        t.url_imagen LIKE '%ejemplo.com%'
+    """),
+    ("Reseñas huérfanas", "resenas", """
+        NOT EXISTS (SELECT 1 FROM usuarios u WHERE u.id = t.usuario_id)
+        OR NOT EXISTS (SELECT 1 FROM productos p WHERE p.id = t.producto_id)
+    """),
+    ("Direcciones de envío huérfanas", "direcciones_envio", """
+        t.usuario_id IS NOT NULL
+        AND NOT EXISTS (SELECT 1 FROM usuarios u WHERE u.id = t.usuario_id)
+    """),
+    ("Items de carrito huérfanos", "items_carrito", """
+        NOT EXISTS (SELECT 1 FROM usuarios u WHERE u.id = t.usuario_id)
+        OR NOT EXISTS (SELECT 1 FROM productos p WHERE p.id = t.producto_id)
+    """)
+]
+
+def limpiar_datos_ejemplo(dry_run=False, lote=LimpiezaConfig.LOTE, pausa=LimpiezaConfig.PAUSA, progreso=None):
+    """Elimina los datos de ejemplo de insertar.sql y los registros huérfanos
+    
+    Args:
+        dry_run (bool): Solo cuenta las filas afectadas, sin eliminar nada
+            (no incluye los huérfanos que dejarían los pasos anteriores)
+        lote (int): Valores de id por rango de borrado
+        pausa (float): Segundos entre rangos con borrados
+        progreso (callable, optional): Avance de cada rango (ver eliminar_por_rangos)
+    
+    Returns:
+        dict: Resultado con los siguientes campos:
+            - success (bool): Si todos los pasos terminaron
+            - pasos (list): {'descripcion', 'tabla', 'filas', 'ms'} por paso
+            - total_ms (float): Duración total
+    """
+    inicio = time.monotonic()
+    pasos = []
+    success = True
+    
+    for descripcion, tabla, condicion in _PASOS:
+        inicio_paso = time.monotonic()
+        if dry_run:
+            row = execute_query(f"SELECT COUNT(*) as total FROM {tabla} t WHERE ({condicion})", fetchone=True)
+            filas = row['total'] if row else None
+        else:
+            borrado = eliminar_por_rangos(tabla, condicion, lote=lote, pausa=pausa, progreso=progreso)
+            filas = borrado['eliminadas'] if borrado['success'] else None
+        if filas is None:
+            success = False
+        pasos.append({
+            'descripcion': descripcion,
+            'tabla': tabla,
+            'filas': filas,
+            'ms': round((time.monotonic() - inicio_paso) * 1000, 2)
+        })
+    
+    if not dry_run and any(paso['filas'] for paso in pasos):
+        # Los borrados en cascada (usuarios de ejemplo) no disparan los
+        # triggers de productos.rating_* ni pasan por el resumen de ventas
+        recalcular_calificaciones()
+        reconstruir_ventas_diarias()
+        recalcular_contador_ventas()
+        invalidar_informacion_tienda()
+        invalidar_paginas_publicas()
+        reconciliar_estadisticas()
+        actualizar_estadisticas()
+    
+    return {
+        'success': success,
+        'pasos': pasos,
+        'total_ms': round((time.monotonic() - inicio) * 1000, 2)
+    }
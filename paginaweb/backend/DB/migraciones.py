@@ -0,0 +1,352 @@
+# migraciones.py
+# Cambios de esquema versionados en archivos .sql de la carpeta
+# migraciones_sql/, llamados NNNN_descripcion.sql y aplicados en orden.
+# Cada migración aplicada queda registrada en schema_migrations con el
+# checksum de su archivo y su duración.
+#
+# Se aplican al arrancar (ensure_database_ready) o a mano:
+#   flask --app app migrar
+#   flask --app app migrar --estado
+#
+# Para agregar un cambio: crear el archivo con el siguiente número (nunca
+# modificar uno ya aplicado: el checksum deja de coincidir y el comando se
+# detiene) y hacer el mismo cambio en tablas.sql para las bases nuevas.
+#
+# Los CREATE [UNIQUE] INDEX se ejecutan como ALTER TABLE ... ADD INDEX y los
+# ALTER TABLE sin ALGORITHM explícito llevan ALGORITHM=INPLACE, LOCK=NONE (la
+# tabla sigue aceptando escrituras). Se omiten los índices equivalentes a uno
+# existente, los ALTER TABLE ... ADD COLUMN cuyas columnas ya existen y los
+# CREATE TRIGGER de triggers existentes. El resto de sentencias se ejecutan
+# tal cual; como MySQL confirma cada DDL por separado, deben poder repetirse
+# (IF NOT EXISTS...) por si una migración falla a la mitad.
+import os
+import re
+import time
+import hashlib
+import mysql.connector
+from mysql.connector import Error
+from backend.DB.db_manager import DatabaseConfig, execute_query, dividir_sentencias
+
+class MigracionesConfig:
+    """Configuración del ejecutor de migraciones"""
+    CARPETA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migraciones_sql')
+    # Crear índices y columnas sin bloquear escrituras; si MySQL no puede
+    # hacerlo en línea la migración falla en lugar de bloquear la tabla
+    DDL_EN_LINEA = os.environ.get('MIGRACIONES_EN_LINEA', '1') == '1'
+    # Segundos máximos esperando el bloqueo de metadatos de una tabla (un DDL
+    # en espera también detiene las consultas que llegan después de él)
+    LOCK_WAIT_TIMEOUT = int(os.environ.get('MIGRACIONES_LOCK_WAIT', 10))
+    # Segundos esperando a que otro proceso termine de migrar
+    ESPERA_OTRO_PROCESO = 120
+
+_PATRON_ARCHIVO = re.compile(r'^(\d+)_(\w+)\.sql$')
+_PATRON_INDICE = re.compile(
+    r'^CREATE\s+(UNIQUE\s+)?INDEX\s+(\w+)\s+ON\s+(\w+)\s*\((.+)\)$',
+    re.IGNORECASE | re.DOTALL
+)
+_PATRON_ALTER = re.compile(r'^ALTER\s+TABLE\s+`?(\w+)`?\s+(.+)$', re.IGNORECASE | re.DOTALL)
+_PATRON_COLUMNA = re.compile(r'\bADD\s+COLUMN\s+`?(\w+)`?', re.IGNORECASE)
+_PATRON_TRIGGER = re.compile(r'^CREATE\s+TRIGGER\s+`?(\w+)`?', re.IGNORECASE)
+
+_INDICES_SQL = """
+    SELECT INDEX_NAME as indice, NON_UNIQUE as no_unico,
+           GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX) as columnas
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+    GROUP BY INDEX_NAME, NON_UNIQUE
+"""
+
+def _leer_indices(filas):
+    return {
+        fila['indice']: {'columnas': tuple(fila['columnas'].split(',')), 'unico': not fila['no_unico']}
+        for fila in filas
+    }
+
+def indices_tabla(tabla):
+    """Índices de una tabla con sus columnas en orden
+    
+    Returns:
+        dict: {nombre: {'columnas': tuple, 'unico': bool}}
+    """
+    return _leer_indices(execute_query(_INDICES_SQL, (DatabaseConfig.DATABASE, tabla)) or [])
+
+def _checksum(contenido):
+    """sha256 del archivo, sin importar los saltos de línea (CRLF o LF)"""
+    return hashlib.sha256(contenido.replace('\r\n', '\n').encode('utf-8')).hexdigest()
+
+def cargar_migraciones():
+    """Lee los archivos de MigracionesConfig.CARPETA en orden de versión
+    
+    Returns:
+        list: {'version', 'nombre', 'archivo', 'checksum', 'sentencias'}
+    
+    Raises:
+        ValueError: Si dos archivos tienen la misma versión
+    """
+    migraciones = {}
+    for archivo in sorted(os.listdir(MigracionesConfig.CARPETA)):
+        coincidencia = _PATRON_ARCHIVO.match(archivo)
+        if not coincidencia:
+            continue
+        version = int(coincidencia.group(1))
+        if version in migraciones:
+            raise ValueError(f"Versión de migración repetida: {archivo} y {migraciones[version]['archivo']}")
+        with open(os.path.join(MigracionesConfig.CARPETA, archivo), 'r', encoding='utf-8') as f:
+            contenido = f.read()
+        migraciones[version] = {
+            'version': version,
+            'nombre': coincidencia.group(2),
+            'archivo': archivo,
+            'checksum': _checksum(contenido),
+            'sentencias': dividir_sentencias(contenido)
+        }
+    return [migraciones[version] for version in sorted(migraciones)]
+
+class _Conexion:
+    """Conexión propia del ejecutor, fuera del pool
+    
+    Usa autocommit y toma un bloqueo con nombre (GET_LOCK) para que dos
+    procesos no migren a la vez.
+    """
+    
+    BLOQUEO = f"migraciones_{DatabaseConfig.DATABASE}"
+    
+    def __enter__(self):
+        self.connection = mysql.connector.connect(
+            host=DatabaseConfig.HOST,
+            port=DatabaseConfig.PORT,
+            user=DatabaseConfig.USER,
+            password=DatabaseConfig.PASSWORD,
+            database=DatabaseConfig.DATABASE,
+            autocommit=True
+        )
+        self.cursor = self.connection.cursor(dictionary=True, buffered=True)
+        self.cursor.execute("SET SESSION lock_wait_timeout = %s", (MigracionesConfig.LOCK_WAIT_TIMEOUT,))
+        self.cursor.execute("SELECT GET_LOCK(%s, %s) as obtenido",
+                            (self.BLOQUEO, MigracionesConfig.ESPERA_OTRO_PROCESO))
+        if not self.cursor.fetchone()['obtenido']:
+            self.cursor.close()
+            self.connection.close()
+            raise TimeoutError("Otro proceso está aplicando migraciones")
+        return self
+    
+    def __exit__(self, *args):
+        try:
+            self.cursor.execute("SELECT RELEASE_LOCK(%s)", (self.BLOQUEO,))
+            self.cursor.fetchall()
+            self.cursor.close()
+        finally:
+            self.connection.close()
+    
+    def consultar(self, query, params=()):
+        self.cursor.execute(query, params)
+        return self.cursor.fetchall() if self.cursor.with_rows else None
+    
+    def preparar(self):
+        """Crea schema_migrations si no existe
+        
+        Returns:
+            dict: {versión: fila} de las migraciones aplicadas
+        """
+        self.consultar("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                nombre VARCHAR(255) NOT NULL,
+                checksum CHAR(64) NOT NULL,
+                duracion_ms INT NOT NULL DEFAULT 0,
+                aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB
+        """)
+        
+        filas = self.consultar("SELECT version, nombre, checksum, duracion_ms, aplicada_en FROM schema_migrations")
+        return {fila['version']: fila for fila in filas}
+    
+    def ejecutar(self, sentencia):
+        """Ejecuta una sentencia de una migración
+        
+        Returns:
+            bool: False si se omitió (el índice, las columnas o el trigger ya existen)
+        """
+        indice = _PATRON_INDICE.match(sentencia)
+        if indice:
+            unico, nombre, tabla, columnas = indice.groups()
+            columnas_indice = tuple(columna.strip().strip('`') for columna in columnas.split(','))
+            existentes = _leer_indices(self.consultar(_INDICES_SQL, (DatabaseConfig.DATABASE, tabla)))
+            for nombre_existente, existente in existentes.items():
+                if nombre_existente == nombre or (existente['columnas'] == columnas_indice and (existente['unico'] or not unico)):
+                    return False
+            sentencia = f"ALTER TABLE {tabla} ADD {'UNIQUE ' if unico else ''}INDEX {nombre} ({columnas})"
+        
+        alter = _PATRON_ALTER.match(sentencia)
+        if alter:
+            tabla, cambios = alter.groups()
+            # Bases que ya tenían la columna (esquema anterior a las migraciones)
+            columnas = set(_PATRON_COLUMNA.findall(cambios))
+            if columnas and columnas <= self._columnas(tabla):
+                return False
+            if MigracionesConfig.DDL_EN_LINEA and not re.search(r'\bALGORITHM\s*=', cambios, re.IGNORECASE):
+                sentencia = f"{sentencia}, ALGORITHM=INPLACE, LOCK=NONE"
+        
+        trigger = _PATRON_TRIGGER.match(sentencia)
+        if trigger and self.consultar("""
+            SELECT TRIGGER_NAME FROM information_schema.TRIGGERS
+            WHERE TRIGGER_SCHEMA = %s AND TRIGGER_NAME = %s
+        """, (DatabaseConfig.DATABASE, trigger.group(1))):
+            return False
+        
+        self.consultar(sentencia)
+        return True
+    
+    def _columnas(self, tabla):
+        filas = self.consultar("""
+            SELECT COLUMN_NAME as columna FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+        """, (DatabaseConfig.DATABASE, tabla))
+        return {fila['columna'] for fila in filas}
+
+def _resumen(sentencia):
+    return ' '.join(sentencia.split())[:100]
+
+def _imprimir_avance(avance):
+    tiempo = 'omitida' if avance['omitida'] else f"{avance['ms']:.0f} ms"
+    print(f"  {avance['sentencia']}: {tiempo}")
+
+def estado_migraciones():
+    """Estado de cada migración
+    
+    Returns:
+        list: {'version', 'nombre', 'estado', 'aplicada_en', 'duracion_ms'}
+        por migración; estado es 'aplicada', 'pendiente', 'modificada' (el
+        archivo cambió después de aplicarse) o 'sin_archivo'. None si no se
+        pudo leer.
+    """
+    try:
+        migraciones = cargar_migraciones()
+        with _Conexion() as conexion:
+            aplicadas = conexion.preparar()
+    except (Error, TimeoutError, ValueError) as e:
+        print(f"Error al leer las migraciones: {e}")
+        return None
+    
+    estado = []
+    for migracion in migraciones:
+        fila = aplicadas.pop(migracion['version'], None)
+        if fila is None:
+            situacion = 'pendiente'
+        elif fila['checksum'] != migracion['checksum']:
+            situacion = 'modificada'
+        else:
+            situacion = 'aplicada'
+        estado.append({
+            'version': migracion['version'],
+            'nombre': migracion['nombre'],
+            'estado': situacion,
+            'aplicada_en': fila['aplicada_en'] if fila else None,
+            'duracion_ms': fila['duracion_ms'] if fila else None
+        })
+    for fila in aplicadas.values():
+        estado.append({
+            'version': fila['version'],
+            'nombre': fila['nombre'],
+            'estado': 'sin_archivo',
+            'aplicada_en': fila['aplicada_en'],
+            'duracion_ms': fila['duracion_ms']
+        })
+    return sorted(estado, key=lambda migracion: migracion['version'])
+
+def aplicar_migraciones(progreso=None):
+    """Aplica en orden las migraciones pendientes
+    
+    Es seguro ejecutarlo en cada arranque: las migraciones aplicadas se
+    omiten y el bloqueo con nombre hace esperar a los demás procesos. No
+    aplica nada si el archivo de una migración ya aplicada cambió, y se
+    detiene en la primera sentencia que falla.
+    
+    Args:
+        progreso (callable, optional): Recibe {'version', 'nombre',
+            'sentencia', 'omitida', 'ms'} al terminar cada sentencia (por
+            defecto se imprime)
+    
+    Returns:
+        dict: Resultado con los siguientes campos:
+            - success (bool): Si no quedó ninguna migración fallida
+            - aplicadas (list): {'version', 'nombre', 'ms'} aplicadas ahora
+            - version (int): Última versión aplicada
+            - error (str): Motivo del fallo (si falló)
+    """
+    progreso = progreso or _imprimir_avance
+    resultado = {'success': False, 'aplicadas': [], 'version': 0}
+    try:
+        migraciones = cargar_migraciones()
+        with _Conexion() as conexion:
+            aplicadas = conexion.preparar()
+            resultado['version'] = max(aplicadas, default=0)
+            
+            modificadas = [
+                migracion['archivo'] for migracion in migraciones
+                if migracion['version'] in aplicadas
+                and aplicadas[migracion['version']]['checksum'] != migracion['checksum']
+            ]
+            if modificadas:
+                resultado['error'] = f"Migraciones modificadas después de aplicarse: {', '.join(modificadas)}"
+                print(resultado['error'])
+                return resultado
+            
+            for migracion in migraciones:
+                if migracion['version'] in aplicadas:
+                    continue
+                print(f"Aplicando migración {migracion['archivo']}...")
+                inicio = time.monotonic()
+                for sentencia in migracion['sentencias']:
+                    inicio_sentencia = time.monotonic()
+                    try:
+                        ejecutada = conexion.ejecutar(sentencia)
+                    except Error as e:
+                        resultado['error'] = f"{migracion['archivo']}: {e} en «{_resumen(sentencia)}»"
+                        print(f"Error en la migración {resultado['error']}")
+                        return resultado
+                    ms = round((time.monotonic() - inicio_sentencia) * 1000, 2)
+                    progreso({
+                        'version': migracion['version'],
+                        'nombre': migracion['nombre'],
+                        'sentencia': _resumen(sentencia),
+                        'omitida': not ejecutada,
+                        'ms': ms
+                    })
+                
+                ms = round((time.monotonic() - inicio) * 1000, 2)
+                conexion.consultar("""
+                    INSERT INTO schema_migrations (version, nombre, checksum, duracion_ms)
+                    VALUES (%s, %s, %s, %s)
+                """, (migracion['version'], migracion['nombre'], migracion['checksum'], int(ms)))
+                resultado['aplicadas'].append({'version': migracion['version'], 'nombre': migracion['nombre'], 'ms': ms})
+                resultado['version'] = migracion['version']
+    except (Error, TimeoutError, ValueError) as e:
+        resultado['error'] = str(e)
+        print(f"Error al aplicar migraciones: {e}")
+        return resultado
+    
+    resultado['success'] = True
+    return resultado
+
+def registrar_linea_base():
+    """Marca todas las migraciones como aplicadas sin ejecutarlas
+    
+    Para bases recién creadas desde tablas.sql, que ya incluye sus cambios.
+    
+    Returns:
+        bool: True si se registraron
+    """
+    try:
+        migraciones = cargar_migraciones()
+        with _Conexion() as conexion:
+            conexion.preparar()
+            for migracion in migraciones:
+                conexion.consultar("""
+                    INSERT IGNORE INTO schema_migrations (version, nombre, checksum, duracion_ms)
+                    VALUES (%s, %s, %s, 0)
+                """, (migracion['version'], migracion['nombre'], migracion['checksum']))
+        return True
+    except (Error, TimeoutError, ValueError) as e:
+        print(f"Error al registrar las migraciones: {e}")
+        return False
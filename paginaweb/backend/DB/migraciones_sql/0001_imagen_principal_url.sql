@@ -0,0 +1,10 @@
+-- productos.imagen_principal_url: evita una subconsulta por fila en los listados
+ALTER TABLE productos ADD COLUMN imagen_principal_url VARCHAR(255) NULL AFTER contador_ventas;
+
+UPDATE productos p
+SET p.imagen_principal_url = (
+    SELECT url_imagen FROM imagenes_productos
+    WHERE producto_id = p.id AND es_principal = 1
+    ORDER BY orden_visualizacion, id
+    LIMIT 1
+);
@@ -0,0 +1,51 @@
+-- productos.rating_*: promedio y número de reseñas aprobadas, mantenidos por
+-- triggers (fecha_actualizacion se conserva porque el producto no cambió)
+ALTER TABLE productos
+ADD COLUMN rating_avg DECIMAL(3,2) NOT NULL DEFAULT 0 AFTER imagen_principal_url,
+ADD COLUMN rating_count INT NOT NULL DEFAULT 0 AFTER rating_avg,
+ADD COLUMN rating_suma INT NOT NULL DEFAULT 0 AFTER rating_count;
+
+UPDATE productos p
+LEFT JOIN (
+    SELECT producto_id, COUNT(*) as total, SUM(calificacion) as suma
+    FROM resenas
+    WHERE aprobada = 1
+    GROUP BY producto_id
+) r ON r.producto_id = p.id
+SET p.rating_count = COALESCE(r.total, 0),
+    p.rating_suma = COALESCE(r.suma, 0),
+    p.rating_avg = IF(r.total > 0, r.suma / r.total, 0),
+    p.fecha_actualizacion = p.fecha_actualizacion;
+
+CREATE TRIGGER trg_resenas_calificacion_insert AFTER INSERT ON resenas
+FOR EACH ROW
+UPDATE productos
+SET rating_count = rating_count + IF(NEW.aprobada = 1, 1, 0),
+    rating_suma = rating_suma + IF(NEW.aprobada = 1, NEW.calificacion, 0),
+    rating_avg = IF(rating_count > 0, rating_suma / rating_count, 0),
+    fecha_actualizacion = fecha_actualizacion
+WHERE id = NEW.producto_id AND NEW.aprobada = 1;
+
+CREATE TRIGGER trg_resenas_calificacion_update AFTER UPDATE ON resenas
+FOR EACH ROW
+UPDATE productos
+SET rating_count = rating_count
+        - IF(id = OLD.producto_id AND OLD.aprobada = 1, 1, 0)
+        + IF(id = NEW.producto_id AND NEW.aprobada = 1, 1, 0),
+    rating_suma = rating_suma
+        - IF(id = OLD.producto_id AND OLD.aprobada = 1, OLD.calificacion, 0)
+        + IF(id = NEW.producto_id AND NEW.aprobada = 1, NEW.calificacion, 0),
+    rating_avg = IF(rating_count > 0, rating_suma / rating_count, 0),
+    fecha_actualizacion = fecha_actualizacion
+WHERE id IN (OLD.producto_id, NEW.producto_id)
+AND (OLD.aprobada <> NEW.aprobada OR OLD.calificacion <> NEW.calificacion
+     OR OLD.producto_id <> NEW.producto_id);
+
+CREATE TRIGGER trg_resenas_calificacion_delete AFTER DELETE ON resenas
+FOR EACH ROW
+UPDATE productos
+SET rating_count = rating_count - 1,
+    rating_suma = rating_suma - OLD.calificacion,
+    rating_avg = IF(rating_count > 0, rating_suma / rating_count, 0),
+    fecha_actualizacion = fecha_actualizacion
+WHERE id = OLD.producto_id AND OLD.aprobada = 1;
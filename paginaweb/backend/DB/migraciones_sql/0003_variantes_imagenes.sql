@@ -0,0 +1,2 @@
+-- imagenes_productos.variantes: URLs y tamaños de las variantes WebP/JPEG
+ALTER TABLE imagenes_productos ADD COLUMN variantes JSON NULL AFTER texto_alternativo;
@@ -0,0 +1,9 @@
+-- Productos relacionados precalculados (backend/DB/relacionados.py)
+CREATE TABLE IF NOT EXISTS productos_relacionados (
+    producto_id INT NOT NULL,
+    posicion TINYINT NOT NULL,
+    relacionado_id INT NOT NULL,
+    PRIMARY KEY (producto_id, posicion),
+    FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE,
+    FOREIGN KEY (relacionado_id) REFERENCES productos(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
@@ -0,0 +1,16 @@
+-- Cola de trabajos en segundo plano (correos, imágenes); 'fallido' agotó sus reintentos
+CREATE TABLE IF NOT EXISTS trabajos (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    tipo VARCHAR(50) NOT NULL,
+    datos JSON NOT NULL,
+    estado ENUM('pendiente', 'en_proceso', 'completado', 'fallido') NOT NULL DEFAULT 'pendiente',
+    intentos INT NOT NULL DEFAULT 0,
+    max_intentos INT NOT NULL DEFAULT 5,
+    ejecutar_despues DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    bloqueado_por VARCHAR(100),
+    bloqueado_en DATETIME,
+    ultimo_error TEXT,
+    creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_trabajos_estado (estado, ejecutar_despues)
+) ENGINE=InnoDB;
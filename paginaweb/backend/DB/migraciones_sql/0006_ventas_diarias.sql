@@ -0,0 +1,27 @@
+-- Resumen diario de ventas por estado (checkout y cambios de estado)
+CREATE TABLE IF NOT EXISTS ventas_diarias (
+    fecha DATE NOT NULL,
+    estado ENUM('pendiente', 'procesando', 'enviado', 'entregado', 'cancelado') NOT NULL,
+    pedidos INT NOT NULL DEFAULT 0,
+    ingresos DECIMAL(14,2) NOT NULL DEFAULT 0,
+    unidades INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, estado)
+) ENGINE=InnoDB;
+
+-- Llenar el resumen con los pedidos existentes (igual que reconstruir_ventas_diarias)
+START TRANSACTION;
+
+DELETE FROM ventas_diarias;
+
+INSERT INTO ventas_diarias (fecha, estado, pedidos, ingresos, unidades)
+SELECT DATE(p.fecha_pedido), p.estado, COUNT(*), SUM(p.monto_total),
+       COALESCE(SUM(i.unidades), 0)
+FROM pedidos p
+LEFT JOIN (
+    SELECT pedido_id, SUM(cantidad) as unidades
+    FROM items_pedido
+    GROUP BY pedido_id
+) i ON i.pedido_id = p.id
+GROUP BY DATE(p.fecha_pedido), p.estado;
+
+COMMIT;
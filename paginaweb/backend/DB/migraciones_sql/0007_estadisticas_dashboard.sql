@@ -0,0 +1,14 @@
+-- Estadísticas precalculadas del panel de administración (una fila, id = 1)
+CREATE TABLE IF NOT EXISTS estadisticas_dashboard (
+    id TINYINT PRIMARY KEY,
+    total_productos INT NOT NULL DEFAULT 0,
+    total_categorias INT NOT NULL DEFAULT 0,
+    total_usuarios INT NOT NULL DEFAULT 0,
+    total_pedidos INT NOT NULL DEFAULT 0,
+    productos_sin_stock INT NOT NULL DEFAULT 0,
+    pedidos_recientes JSON,
+    ventas_por_dia JSON,
+    productos_top JSON,
+    productos_bajo_stock JSON,
+    actualizado_en DATETIME NULL
+) ENGINE=InnoDB;
@@ -0,0 +1,13 @@
+-- Índices de los listados paginados y de la imagen principal
+
+-- Imagen principal de un producto (productos_controller)
+CREATE INDEX idx_imagenes_principal ON imagenes_productos(producto_id, es_principal);
+
+-- Paginación por cursor de los listados (InnoDB agrega el id al índice)
+CREATE INDEX idx_productos_fecha_creacion ON productos(fecha_creacion);
+CREATE INDEX idx_productos_orden_listado ON productos(destacado, contador_ventas);
+CREATE INDEX idx_pedidos_fecha ON pedidos(fecha_pedido);
+CREATE INDEX idx_usuarios_fecha_registro ON usuarios(fecha_registro);
+
+-- Reseñas aprobadas de un producto, paginadas por fecha
+CREATE INDEX idx_resenas_producto_fecha ON resenas(producto_id, aprobada, fecha_publicacion);
@@ -0,0 +1,14 @@
+-- Índices compuestos de las consultas frecuentes
+-- (revisados con: flask --app app revisar-indices)
+
+-- Pedidos de un usuario por fecha (dashboard del cliente)
+CREATE INDEX idx_pedidos_usuario_fecha ON pedidos(usuario_id, fecha_pedido);
+
+-- Productos activos ordenados por destacado y ventas (inicio, recomendados)
+CREATE INDEX idx_productos_activo_orden ON productos(activo, destacado, contador_ventas);
+
+-- Un item por producto en el carrito de cada usuario
+CREATE UNIQUE INDEX uq_items_carrito_usuario_producto ON items_carrito(usuario_id, producto_id);
+
+-- Búsqueda del token de recuperación de contraseña
+CREATE INDEX idx_tokens_recuperacion_token ON tokens_recuperacion(token);
@@ -0,0 +1,3 @@
+-- Fecha del último recuento completo de los contadores del panel (los
+-- contadores se ajustan con cada escritura y se recuentan una vez al día)
+ALTER TABLE estadisticas_dashboard ADD COLUMN contadores_reconciliados_en DATETIME NULL AFTER actualizado_en;
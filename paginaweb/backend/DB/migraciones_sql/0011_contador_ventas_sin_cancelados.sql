@@ -0,0 +1,13 @@
+-- productos.contador_ventas: unidades vendidas en pedidos no cancelados
+-- (los más vendidos del panel y el orden del catálogo salen de aquí; el
+-- checkout lo suma y mover_venta lo ajusta al cancelar o restaurar)
+UPDATE productos p
+LEFT JOIN (
+    SELECT ip.producto_id, SUM(ip.cantidad) as unidades
+    FROM items_pedido ip
+    JOIN pedidos pd ON ip.pedido_id = pd.id
+    WHERE pd.estado != 'cancelado'
+    GROUP BY ip.producto_id
+) v ON v.producto_id = p.id
+SET p.contador_ventas = COALESCE(v.unidades, 0),
+    p.fecha_actualizacion = p.fecha_actualizacion;
@@ -0,0 +1,6 @@
+-- Versiones de cachés en memoria (invalidación entre workers)
+CREATE TABLE IF NOT EXISTS cache_versiones (
+    clave VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
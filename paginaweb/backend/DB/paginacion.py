@@ -0,0 +1,188 @@
+import os
+import re
+import json
+import base64
+from datetime import datetime, date
+from decimal import Decimal
+from backend.DB.db_manager import execute_query
+from backend.DB.cache import TTLCache
+
+class PaginacionConfig:
+    """Configuración de la paginación de listados"""
+    # Segundos que se reutiliza el total de un listado con los mismos filtros
+    TOTALES_TTL = float(os.environ.get('PAGINACION_TOTALES_TTL', 30))
+
+_totales_cache = TTLCache(PaginacionConfig.TOTALES_TTL)
+
+_SELECT_INICIAL = re.compile(r'^\s*SELECT\s', re.IGNORECASE)
+
+def _clave_total(query, params):
+    """Clave del total: la consulta sin espacios redundantes y sus filtros"""
+    return (' '.join(query.split()), tuple(params or ()))
+
+def invalidar_totales():
+    """Descarta los totales cacheados (p. ej. después de una carga masiva)"""
+    _totales_cache.invalidate()
+
+def consultar_pagina(query, params=None, limit=20, offset=0):
+    """Obtiene una página de resultados y el total en un solo viaje a MySQL
+    
+    La primera vez agrega `COUNT(*) OVER()` a la consulta para leer filas y
+    total juntos; el total queda cacheado unos segundos por consulta y
+    filtros, así que las páginas siguientes ya no lo calculan.
+    
+    Args:
+        query (str): Consulta SELECT con WHERE y ORDER BY, sin LIMIT/OFFSET
+            (no debe empezar con SELECT DISTINCT)
+        params (list, optional): Parámetros de los filtros
+        limit (int): Filas por página
+        offset (int): Filas a saltar
+        
+    Returns:
+        tuple: (lista de filas de la página, total de filas)
+    """
+    params = list(params or [])
+    clave = _clave_total(query, params)
+    total = _totales_cache.get(clave)
+    
+    if total is not None:
+        filas = execute_query(query + " LIMIT %s OFFSET %s", params + [limit, offset]) or []
+        return filas, total
+    
+    # La función de ventana se evalúa antes del LIMIT: cuenta todas las filas
+    query_total = _SELECT_INICIAL.sub("SELECT COUNT(*) OVER() AS total_filas, ", query, count=1)
+    filas = execute_query(query_total + " LIMIT %s OFFSET %s", params + [limit, offset])
+    if filas is None:
+        return [], 0
+    
+    if filas:
+        total = filas[0]['total_filas']
+        for fila in filas:
+            fila.pop('total_filas', None)
+    elif offset > 0:
+        # Página fuera de rango: no hay filas de donde leer el total
+        conteo = execute_query(f"SELECT COUNT(*) AS total FROM ({query}) t", params, fetchone=True)
+        total = conteo['total'] if conteo else 0
+    else:
+        total = 0
+    
+    _totales_cache.set(clave, total)
+    return filas, total
+
+# ----- Paginación por cursor (keyset) -----
+
+def codificar_cursor(valores):
+    """Convierte los valores de orden de la última fila en un cursor opaco
+    
+    Args:
+        valores (list): Valores de las columnas de orden (la última es el id)
+        
+    Returns:
+        str: Cursor en base64 apto para URLs
+    """
+    datos = []
+    for valor in valores:
+        if isinstance(valor, datetime):
+            datos.append(['dt', valor.isoformat()])
+        elif isinstance(valor, date):
+            datos.append(['d', valor.isoformat()])
+        elif isinstance(valor, Decimal):
+            datos.append(['dec', str(valor)])
+        else:
+            datos.append(['v', valor])
+    texto = json.dumps(datos, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decodificar_cursor(cursor):
+    """Recupera los valores de orden guardados en un cursor
+    
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno).decode('utf-8'))
+        valores = []
+        for tipo, valor in datos:
+            if tipo == 'dt':
+                valores.append(datetime.fromisoformat(valor))
+            elif tipo == 'd':
+                valores.append(date.fromisoformat(valor))
+            elif tipo == 'dec':
+                valores.append(Decimal(valor))
+            else:
+                valores.append(valor)
+        return valores
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+def _condicion_cursor(columnas, descendente):
+    """Arma (c1 < %s) OR (c1 = %s AND c2 < %s) ... para continuar después del cursor
+    
+    Se escribe expandida en lugar de (c1, c2) < (%s, %s) para que MySQL use
+    el índice en todas las versiones.
+    """
+    operador = '<' if descendente else '>'
+    partes = []
+    for i, columna in enumerate(columnas):
+        iguales = [f"{c} = %s" for c in columnas[:i]]
+        partes.append("(" + " AND ".join(iguales + [f"{columna} {operador} %s"]) + ")")
+    return "(" + " OR ".join(partes) + ")"
+
+def _params_cursor(valores):
+    """Parámetros en el orden que espera _condicion_cursor"""
+    params = []
+    for i in range(len(valores)):
+        params.extend(valores[:i + 1])
+    return params
+
+def consultar_pagina_cursor(query, where_clauses, params, orden, limit=20, cursor=None, descendente=True):
+    """Obtiene la página siguiente a un cursor sin recorrer las filas anteriores
+    
+    En lugar de OFFSET, filtra por los valores de orden de la última fila
+    vista, así cualquier página cuesta lo mismo que la primera.
+    
+    Args:
+        query (str): SELECT ... FROM ... JOIN ... sin WHERE ni ORDER BY
+        where_clauses (list): Condiciones de filtro (se unen con AND)
+        params (list): Parámetros de las condiciones
+        orden (list): Pares (expresión SQL, clave en la fila); el último debe
+            ser el id para que el orden sea único
+        limit (int): Filas por página
+        cursor (str, optional): Cursor devuelto por la página anterior
+        descendente (bool): Dirección del orden (la misma para todas las columnas)
+        
+    Returns:
+        dict: {'filas': [...], 'siguiente_cursor': str o None, 'hay_mas': bool}
+        
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    where_clauses = list(where_clauses or [])
+    params = list(params or [])
+    columnas = [expresion for expresion, _ in orden]
+    
+    if cursor:
+        valores = decodificar_cursor(cursor)
+        if len(valores) != len(columnas):
+            raise ValueError('Cursor inválido')
+        where_clauses.append(_condicion_cursor(columnas, descendente))
+        params.extend(_params_cursor(valores))
+    
+    if where_clauses:
+        query += " WHERE " + " AND ".join(where_clauses)
+    direccion = 'DESC' if descendente else 'ASC'
+    query += " ORDER BY " + ", ".join(f"{c} {direccion}" for c in columnas)
+    # Una fila extra indica si hay página siguiente
+    query += " LIMIT %s"
+    params.append(limit + 1)
+    
+    filas = execute_query(query, params) or []
+    hay_mas = len(filas) > limit
+    filas = filas[:limit]
+    
+    siguiente = None
+    if hay_mas and filas:
+        siguiente = codificar_cursor([filas[-1][clave] for _, clave in orden])
+    
+    return {'filas': filas, 'siguiente_cursor': siguiente, 'hay_mas': hay_mas}
@@ -0,0 +1,314 @@
+import os
+import heapq
+import threading
+import time
+from backend.DB.db_manager import execute_query, execute_many, transaction
+from backend.DB.cache import TTLCache, get_version, bump_version
+from backend.DB.tareas import TareaPeriodica
+
+class RelacionadosConfig:
+    """Configuración de los productos relacionados precalculados"""
+    # Relacionados guardados por producto (el detalle muestra MOSTRAR)
+    GUARDAR = 8
+    MOSTRAR = 4
+    # Segundos entre reconstrucciones completas (una por noche: recogen los
+    # cambios de ventas y destacados, que también alteran el orden)
+    INTERVALO = float(os.environ.get('RELACIONADOS_INTERVALO', 86400))
+    # Segundos que un worker reutiliza la lista leída de un producto
+    CACHE_TTL = float(os.environ.get('RELACIONADOS_CACHE_TTL', 300))
+    # Filas por INSERT al reconstruir
+    LOTE = 1000
+
+# Productos cuya lista puede cambiar al editar uno: él mismo, los de su
+# categoría, los que comparten alguna etiqueta y los que ya lo tenían en su
+# lista (por si cambió de categoría o de etiquetas)
+_AFECTADOS_SQL = """
+    SELECT id FROM productos
+    WHERE id = %s OR categoria_id = (SELECT categoria_id FROM productos WHERE id = %s)
+    UNION
+    SELECT pe1.producto_id
+    FROM productos_etiquetas pe1
+    JOIN productos_etiquetas pe2 ON pe1.etiqueta_id = pe2.etiqueta_id
+    WHERE pe2.producto_id = %s
+    UNION
+    SELECT producto_id FROM productos_relacionados WHERE relacionado_id = %s
+"""
+
+_LECTURA_SQL = """
+    SELECT p.*, c.nombre as categoria_nombre,
+           p.imagen_principal_url as imagen_principal
+    FROM productos_relacionados pr
+    JOIN productos p ON p.id = pr.relacionado_id
+    LEFT JOIN categorias c ON p.categoria_id = c.id
+    WHERE pr.producto_id = %s
+    AND p.activo = 1
+    ORDER BY pr.posicion
+    LIMIT %s
+"""
+
+def _clave(producto):
+    return (-int(producto['destacado'] or 0), -int(producto['contador_ventas'] or 0), producto['id'])
+
+def _placeholders(valores):
+    return ', '.join(['%s'] * len(valores))
+
+def calcular_relacionados(productos_ids=None):
+    """Calcula en memoria los relacionados de los productos activos
+    
+    Como todos los productos se ordenan con la misma clave (destacado,
+    ventas, id), los mejores N de la unión de "misma categoría" y "comparte
+    etiqueta" están entre los N+1 primeros de cada grupo; basta con ordenar
+    cada categoría y cada etiqueta una vez.
+    
+    Args:
+        productos_ids (list, optional): Calcular sólo estos productos (se leen
+            sólo sus categorías y etiquetas); por defecto todos
+    
+    Returns:
+        dict: {producto_id: [relacionado_id, ...]}, o None si falló la consulta
+    """
+    if productos_ids is None:
+        productos = execute_query("""
+            SELECT id, categoria_id, destacado, contador_ventas
+            FROM productos WHERE activo = 1
+        """)
+        etiquetas = execute_query("SELECT producto_id, etiqueta_id FROM productos_etiquetas")
+    else:
+        productos, etiquetas = _candidatos(productos_ids)
+    if productos is None or etiquetas is None:
+        return None
+    
+    claves = {p['id']: _clave(p) for p in productos}
+    n = RelacionadosConfig.GUARDAR + 1  # +1 por si el propio producto está entre los primeros
+    
+    por_categoria = {}
+    for p in productos:
+        if p['categoria_id'] is not None:
+            por_categoria.setdefault(p['categoria_id'], []).append(claves[p['id']])
+    por_categoria = {c: heapq.nsmallest(n, grupo) for c, grupo in por_categoria.items()}
+    
+    etiquetas_producto = {}
+    por_etiqueta = {}
+    for row in etiquetas:
+        clave = claves.get(row['producto_id'])
+        if clave is None:
+            continue  # producto inactivo
+        etiquetas_producto.setdefault(row['producto_id'], []).append(row['etiqueta_id'])
+        por_etiqueta.setdefault(row['etiqueta_id'], []).append(clave)
+    por_etiqueta = {e: heapq.nsmallest(n, grupo) for e, grupo in por_etiqueta.items()}
+    
+    relacionados = {}
+    for p in productos:
+        if productos_ids is not None and p['id'] not in productos_ids:
+            continue
+        candidatos = set(por_categoria.get(p['categoria_id'], ()))
+        for etiqueta_id in etiquetas_producto.get(p['id'], ()):
+            candidatos.update(por_etiqueta[etiqueta_id])
+        candidatos.discard(claves[p['id']])
+        relacionados[p['id']] = [c[2] for c in heapq.nsmallest(RelacionadosConfig.GUARDAR, candidatos)]
+    return relacionados
+
+def _candidatos(productos_ids):
+    """Productos activos y etiquetas de las categorías y etiquetas de `productos_ids`
+    
+    Returns:
+        tuple: (productos, etiquetas) con las mismas columnas que la lectura
+        completa; (None, None) si falló alguna consulta
+    """
+    ids = list(productos_ids)
+    propios = execute_query(f"""
+        SELECT id, categoria_id FROM productos
+        WHERE id IN ({_placeholders(ids)}) AND activo = 1
+    """, ids)
+    etiquetas_propias = execute_query(f"""
+        SELECT DISTINCT etiqueta_id FROM productos_etiquetas
+        WHERE producto_id IN ({_placeholders(ids)})
+    """, ids)
+    if propios is None or etiquetas_propias is None:
+        return None, None
+    
+    categorias = list({p['categoria_id'] for p in propios if p['categoria_id'] is not None})
+    etiquetas_ids = [row['etiqueta_id'] for row in etiquetas_propias]
+    condiciones = [f"id IN ({_placeholders(ids)})"]
+    params = list(ids)
+    if categorias:
+        condiciones.append(f"categoria_id IN ({_placeholders(categorias)})")
+        params.extend(categorias)
+    if etiquetas_ids:
+        condiciones.append(f"id IN (SELECT producto_id FROM productos_etiquetas WHERE etiqueta_id IN ({_placeholders(etiquetas_ids)}))")
+        params.extend(etiquetas_ids)
+    productos = execute_query(f"""
+        SELECT id, categoria_id, destacado, contador_ventas
+        FROM productos
+        WHERE activo = 1 AND ({' OR '.join(condiciones)})
+    """, params)
+    
+    etiquetas = []
+    if etiquetas_ids:
+        etiquetas = execute_query(f"""
+            SELECT producto_id, etiqueta_id FROM productos_etiquetas
+            WHERE etiqueta_id IN ({_placeholders(etiquetas_ids)})
+        """, etiquetas_ids)
+    return productos, etiquetas
+
+class RelacionadosPrecalculados:
+    """Lista de productos relacionados guardada en `productos_relacionados`
+    
+    El detalle de un producto lee sus relacionados con una búsqueda por
+    clave primaria en lugar de cruzar `productos_etiquetas` consigo misma
+    en cada visita. Al crear o editar un producto se recalculan al momento
+    su lista y las de los productos de su categoría o etiquetas; la
+    reconstrucción completa queda para la tarea nocturna y el comando
+    `flask --app app reconstruir-relacionados`.
+    """
+    
+    def __init__(self):
+        self._cache = TTLCache(RelacionadosConfig.CACHE_TTL, max_items=2048)
+        self._tarea = TareaPeriodica('relacionados', RelacionadosConfig.INTERVALO, self._tarea_reconstruir)
+        self._lock = threading.Lock()
+        self._pendiente = False
+        self._construida = None  # None: sin comprobar en este proceso
+        self._ultimo_ms = 0.0
+    
+    def obtener(self, producto_id, limite=RelacionadosConfig.MOSTRAR):
+        """Relacionados de un producto con sus datos de listado
+        
+        Args:
+            producto_id (int): ID del producto
+            limite (int): Cantidad máxima de productos
+        
+        Returns:
+            list: Productos relacionados, o None si la tabla aún no se ha
+            construido (el llamador usa la consulta directa)
+        """
+        self._tarea.iniciar()
+        clave = (producto_id, limite)
+        relacionados = self._cache.get(clave)
+        if relacionados is not None:
+            return relacionados
+        if not self._esta_construida():
+            return None
+        relacionados = execute_query(_LECTURA_SQL, (producto_id, limite))
+        if relacionados is None:
+            return None
+        self._cache.set(clave, relacionados)
+        return relacionados
+    
+    def recalcular(self, producto_id):
+        """Recalcula las listas que pueden cambiar al modificar un producto
+        
+        Se llama al crear, editar, activar o desactivar un producto: su
+        categoría o etiquetas pueden haber cambiado, lo que también afecta a
+        las listas de los productos de su categoría o etiquetas (las nuevas y
+        las que lo tenían en su lista).
+        
+        Returns:
+            bool: True si se guardaron las listas nuevas
+        """
+        afectados = execute_query(_AFECTADOS_SQL, (producto_id,) * 4)
+        if afectados is None:
+            print(f"Error al recalcular relacionados del producto {producto_id}")
+            return False
+        afectados = {row['id'] for row in afectados} | {producto_id}
+        relacionados = calcular_relacionados(afectados)
+        if relacionados is None:
+            print(f"Error al recalcular relacionados del producto {producto_id}")
+            return False
+        
+        ids = list(afectados)
+        filas = [(pid, posicion, relacionado_id)
+                 for pid, lista in relacionados.items()
+                 for posicion, relacionado_id in enumerate(lista, 1)]
+        with transaction() as tx:
+            # Los productos inactivos del grupo se quedan sin lista
+            execute_query(f"DELETE FROM productos_relacionados WHERE producto_id IN ({_placeholders(ids)})",
+                          ids, commit=True)
+            for i in range(0, len(filas), RelacionadosConfig.LOTE):
+                execute_many(
+                    "INSERT INTO productos_relacionados (producto_id, posicion, relacionado_id) VALUES (%s, %s, %s)",
+                    filas[i:i + RelacionadosConfig.LOTE]
+                )
+        if not tx.committed:
+            print(f"Error al recalcular relacionados del producto {producto_id}")
+            return False
+        
+        self._cache.invalidate()
+        return True
+    
+    def reconstruir(self):
+        """Recalcula y reemplaza todas las listas
+        
+        Returns:
+            bool: True si se guardaron las listas nuevas
+        """
+        inicio = time.monotonic()
+        with self._lock:
+            self._pendiente = False
+        relacionados = calcular_relacionados()
+        if relacionados is None:
+            with self._lock:
+                self._pendiente = True
+            return False
+        
+        filas = [(producto_id, posicion, relacionado_id)
+                 for producto_id, lista in relacionados.items()
+                 for posicion, relacionado_id in enumerate(lista, 1)]
+        with transaction() as tx:
+            execute_query("DELETE FROM productos_relacionados", commit=True)
+            for i in range(0, len(filas), RelacionadosConfig.LOTE):
+                execute_many(
+                    "INSERT INTO productos_relacionados (producto_id, posicion, relacionado_id) VALUES (%s, %s, %s)",
+                    filas[i:i + RelacionadosConfig.LOTE]
+                )
+        if not tx.committed:
+            with self._lock:
+                self._pendiente = True
+            return False
+        
+        bump_version('productos_relacionados')
+        self._construida = True
+        self._cache.invalidate()
+        self._ultimo_ms = (time.monotonic() - inicio) * 1000
+        print(f"Productos relacionados reconstruidos: {len(relacionados)} productos en {self._ultimo_ms:.0f} ms")
+        return True
+    
+    def _esta_construida(self):
+        """Indica si alguna reconstrucción completa ya guardó las listas"""
+        if self._construida:
+            return True
+        self._construida = bool(get_version('productos_relacionados'))
+        if not self._construida:
+            # Base recién creada o actualizada: construir en segundo plano
+            with self._lock:
+                self._pendiente = True
+            self._tarea.despertar()
+        return self._construida
+    
+    def _tarea_reconstruir(self):
+        """Reconstruye si hay cambios pendientes o si la última tiene más de INTERVALO
+        
+        La edad se lee de la base de datos: cuando un worker reconstruye,
+        los demás esperan otro intervalo en lugar de repetir el trabajo.
+        """
+        if not self._pendiente:
+            row = execute_query("""
+                SELECT TIMESTAMPDIFF(SECOND, actualizado_en, NOW()) as edad
+                FROM cache_versiones WHERE clave = 'productos_relacionados'
+            """, fetchone=True)
+            if row and row['edad'] is not None and row['edad'] < RelacionadosConfig.INTERVALO:
+                return
+        self.reconstruir()
+
+relacionados_precalculados = RelacionadosPrecalculados()
+
+def get_productos_relacionados(producto_id, limite=RelacionadosConfig.MOSTRAR):
+    """Relacionados precalculados de un producto, o None si aún no existen"""
+    return relacionados_precalculados.obtener(producto_id, limite)
+
+def recalcular_relacionados(producto_id):
+    """Actualiza los relacionados tras un cambio en el producto"""
+    return relacionados_precalculados.recalcular(producto_id)
+
+def reconstruir_relacionados():
+    """Reconstruye todas las listas de relacionados en el hilo actual"""
+    return relacionados_precalculados.reconstruir()
@@ -0,0 +1,116 @@
+# revision_indices.py
+# Revisa con EXPLAIN que las consultas frecuentes de los controladores sigan
+# usando un índice adecuado (después de cambiar una consulta o el esquema):
+#   flask --app app revisar-indices
+#   flask --app app revisar-indices --min-filas 0
+#
+# Termina con código 1 si alguna consulta dejó de usar el índice esperado.
+from backend.DB.db_manager import execute_query
+from backend.DB.migraciones import indices_tabla
+from backend.controladores.productos_controller import ProductosController
+from backend.controladores.dashboardHome_controller import DashboardHomeController
+from backend.controladores.carro_controller import CarroController
+from backend.controladores.login_controller import LoginController
+
+class RevisionIndicesConfig:
+    """Configuración de la revisión de planes de consulta"""
+    # Con menos filas el optimizador prefiere recorrer la tabla completa y
+    # el plan no dice nada; esas consultas se omiten
+    MIN_FILAS = 1000
+
+# (descripción, tabla, alias en el EXPLAIN, columnas con las que debe
+# empezar el índice usado, consulta, parámetros de ejemplo). Las consultas son
+# las mismas constantes que ejecutan los controladores, así que un cambio en
+# ellas se revisa aquí sin copiarlo a mano.
+CONSULTAS = [
+    ("Imagen principal de un producto (productos_controller)", 'imagenes_productos', 'imagenes_productos',
+     ('producto_id', 'es_principal'),
+     ProductosController.IMAGEN_PRINCIPAL_SQL,
+     (1,)),
+    ("Agregados de pedidos del usuario (dashboardHome_controller)", 'pedidos', 'pedidos',
+     ('usuario_id',),
+     DashboardHomeController.AGREGADOS_PEDIDOS_SQL,
+     (30, 30, 30, 1)),
+    ("Pedidos recientes del usuario (dashboardHome_controller)", 'pedidos', 'p',
+     ('usuario_id', 'fecha_pedido'),
+     DashboardHomeController.PEDIDOS_RECIENTES_SQL,
+     (7, 1, 5, 8)),
+    ("Productos destacados por ventas (dashboardHome_controller)", 'productos', 'p',
+     ('activo', 'destacado', 'contador_ventas'),
+     DashboardHomeController.PRODUCTOS_DESTACADOS_SQL.format(excluir=''),
+     (4,)),
+    ("Producto en el carrito del usuario (carro_controller)", 'items_carrito', 'items_carrito',
+     ('usuario_id', 'producto_id'),
+     CarroController.ITEM_CARRITO_SQL,
+     (1, 1)),
+    ("Carrito del usuario (carro_controller)", 'items_carrito', 'ic',
+     ('usuario_id',),
+     CarroController.CARRITO_USUARIO_SQL,
+     (1,)),
+    ("Token de recuperación (login_controller)", 'tokens_recuperacion', 't',
+     ('token',),
+     LoginController.TOKEN_RECUPERACION_SQL,
+     ('token-de-ejemplo',))
+]
+
+def _filas_estimadas(tabla):
+    """Filas estimadas de una tabla (information_schema, sin COUNT)"""
+    row = execute_query("""
+        SELECT TABLE_ROWS as filas FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (tabla,), fetchone=True)
+    return (row and row['filas']) or 0
+
+def revisar_consultas(min_filas=RevisionIndicesConfig.MIN_FILAS):
+    """Ejecuta EXPLAIN de cada consulta de CONSULTAS
+    
+    Args:
+        min_filas (int): Omitir las consultas sobre tablas con menos filas
+    
+    Returns:
+        dict: Resultado con los siguientes campos:
+            - success (bool): False si alguna consulta tiene una regresión o error
+            - consultas (list): {'descripcion', 'tabla', 'indice', 'tipo',
+              'filas', 'estado'} por consulta; estado es 'ok', 'regresion',
+              'omitida' (tabla pequeña) o 'error'
+    """
+    consultas = []
+    indices = {}
+    success = True
+    
+    for descripcion, tabla, alias, columnas, query, params in CONSULTAS:
+        plan = execute_query(f"EXPLAIN {query}", params)
+        fila = next((f for f in plan or [] if f.get('table') == alias), None)
+        if fila is None:
+            # Con la tabla vacía MySQL resuelve la consulta sin plan
+            # ("no matching row in const table"): no hay nada que revisar
+            sin_datos = any('no matching row' in (f.get('Extra') or '') or 'Impossible' in (f.get('Extra') or '')
+                            for f in plan or [])
+            if not sin_datos:
+                success = False
+            consultas.append({'descripcion': descripcion, 'tabla': tabla, 'indice': None,
+                              'tipo': None, 'filas': None, 'estado': 'omitida' if sin_datos else 'error'})
+            continue
+        
+        if tabla not in indices:
+            indices[tabla] = indices_tabla(tabla)
+        indice = fila.get('key')
+        columnas_indice = indices[tabla].get(indice, {}).get('columnas', ())
+        if columnas_indice[:len(columnas)] == columnas:
+            estado = 'ok'
+        elif _filas_estimadas(tabla) < min_filas:
+            estado = 'omitida'
+        else:
+            estado = 'regresion'
+            success = False
+        
+        consultas.append({
+            'descripcion': descripcion,
+            'tabla': tabla,
+            'indice': indice,
+            'tipo': fila.get('type'),
+            'filas': fila.get('rows'),
+            'estado': estado
+        })
+    
+    return {'success': success, 'consultas': consultas}
@@ -71,6 +71,10 @@ CREATE TABLE productos (
     fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     contador_vistas INT DEFAULT 0,
     contador_ventas INT DEFAULT 0,
+    imagen_principal_url VARCHAR(255) NULL, -- copia de imagenes_productos (es_principal = 1)
+    rating_avg DECIMAL(3,2) NOT NULL DEFAULT 0, -- reseñas aprobadas, mantenidos por triggers
+    rating_count INT NOT NULL DEFAULT 0,
+    rating_suma INT NOT NULL DEFAULT 0,
     FOREIGN KEY (categoria_id) REFERENCES categorias(id) ON DELETE SET NULL
 ) ENGINE=InnoDB;
 
@@ -91,6 +95,7 @@ CREATE TABLE imagenes_productos (
     es_principal BOOLEAN DEFAULT 0,
     orden_visualizacion INT DEFAULT 0,
     texto_alternativo VARCHAR(100),
+    variantes JSON NULL, -- {variante: {ancho, alto, webp, jpg|png}} (backend/DB/imagenes.py)
     FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE
 ) ENGINE=InnoDB;
 
@@ -214,6 +219,75 @@ CREATE TABLE informacion_tienda (
     banner_principal_url VARCHAR(255)
 ) ENGINE=InnoDB;
 
+-- Productos relacionados precalculados (backend/DB/relacionados.py)
+CREATE TABLE productos_relacionados (
+    producto_id INT NOT NULL,
+    posicion TINYINT NOT NULL,
+    relacionado_id INT NOT NULL,
+    PRIMARY KEY (producto_id, posicion),
+    FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE,
+    FOREIGN KEY (relacionado_id) REFERENCES productos(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- Cola de trabajos en segundo plano (correos, imágenes); 'fallido' agotó sus reintentos
+CREATE TABLE trabajos (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    tipo VARCHAR(50) NOT NULL,
+    datos JSON NOT NULL,
+    estado ENUM('pendiente', 'en_proceso', 'completado', 'fallido') NOT NULL DEFAULT 'pendiente',
+    intentos INT NOT NULL DEFAULT 0,
+    max_intentos INT NOT NULL DEFAULT 5,
+    ejecutar_despues DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    bloqueado_por VARCHAR(100),
+    bloqueado_en DATETIME,
+    ultimo_error TEXT,
+    creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_trabajos_estado (estado, ejecutar_despues)
+) ENGINE=InnoDB;
+
+-- Resumen diario de ventas por estado (checkout y cambios de estado)
+CREATE TABLE ventas_diarias (
+    fecha DATE NOT NULL,
+    estado ENUM('pendiente', 'procesando', 'enviado', 'entregado', 'cancelado') NOT NULL,
+    pedidos INT NOT NULL DEFAULT 0,
+    ingresos DECIMAL(14,2) NOT NULL DEFAULT 0,
+    unidades INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, estado)
+) ENGINE=InnoDB;
+
+-- Estadísticas precalculadas del panel de administración (una fila, id = 1)
+CREATE TABLE estadisticas_dashboard (
+    id TINYINT PRIMARY KEY,
+    total_productos INT NOT NULL DEFAULT 0,
+    total_categorias INT NOT NULL DEFAULT 0,
+    total_usuarios INT NOT NULL DEFAULT 0,
+    total_pedidos INT NOT NULL DEFAULT 0,
+    productos_sin_stock INT NOT NULL DEFAULT 0,
+    pedidos_recientes JSON,
+    ventas_por_dia JSON,
+    productos_top JSON,
+    productos_bajo_stock JSON,
+    actualizado_en DATETIME NULL,
+    contadores_reconciliados_en DATETIME NULL
+) ENGINE=InnoDB;
+
+-- Migraciones de esquema aplicadas (backend/DB/migraciones_sql, checksum sha256 del archivo)
+CREATE TABLE schema_migrations (
+    version INT PRIMARY KEY,
+    nombre VARCHAR(255) NOT NULL,
+    checksum CHAR(64) NOT NULL,
+    duracion_ms INT NOT NULL DEFAULT 0,
+    aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+-- Versiones de cachés en memoria (invalidación entre workers)
+CREATE TABLE cache_versiones (
+    clave VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
 -- Índices para mejorar el rendimiento
 CREATE INDEX idx_productos_categoria ON productos(categoria_id);
 CREATE INDEX idx_productos_activo ON productos(activo);
@@ -223,6 +297,49 @@ CREATE INDEX idx_pedidos_usuario ON pedidos(usuario_id);
 CREATE INDEX idx_pedidos_estado ON pedidos(estado);
 CREATE INDEX idx_resenas_producto ON resenas(producto_id);
 CREATE INDEX idx_imagenes_productos ON imagenes_productos(producto_id);
+CREATE INDEX idx_imagenes_principal ON imagenes_productos(producto_id, es_principal);
+CREATE INDEX idx_productos_fecha_creacion ON productos(fecha_creacion);
+CREATE INDEX idx_productos_orden_listado ON productos(destacado, contador_ventas);
+CREATE INDEX idx_pedidos_fecha ON pedidos(fecha_pedido);
+CREATE INDEX idx_usuarios_fecha_registro ON usuarios(fecha_registro);
+CREATE INDEX idx_resenas_producto_fecha ON resenas(producto_id, aprobada, fecha_publicacion);
 CREATE INDEX idx_direcciones_usuario ON direcciones_envio(usuario_id);
 CREATE INDEX idx_paypal_order_id ON pagos_paypal(paypal_order_id);
-CREATE INDEX idx_paypal_pedido_id ON pagos_paypal(pedido_id);
\ No newline at end of file
+CREATE INDEX idx_paypal_pedido_id ON pagos_paypal(pedido_id);
+CREATE INDEX idx_pedidos_usuario_fecha ON pedidos(usuario_id, fecha_pedido);
+CREATE INDEX idx_productos_activo_orden ON productos(activo, destacado, contador_ventas);
+CREATE INDEX idx_tokens_recuperacion_token ON tokens_recuperacion(token);
+
+-- Promedio y número de reseñas aprobadas por producto (productos.rating_*)
+CREATE TRIGGER trg_resenas_calificacion_insert AFTER INSERT ON resenas
+FOR EACH ROW
+UPDATE productos
+SET rating_count = rating_count + IF(NEW.aprobada = 1, 1, 0),
+    rating_suma = rating_suma + IF(NEW.aprobada = 1, NEW.calificacion, 0),
+    rating_avg = IF(rating_count > 0, rating_suma / rating_count, 0),
+    fecha_actualizacion = fecha_actualizacion
+WHERE id = NEW.producto_id AND NEW.aprobada = 1;
+
+CREATE TRIGGER trg_resenas_calificacion_update AFTER UPDATE ON resenas
+FOR EACH ROW
+UPDATE productos
+SET rating_count = rating_count
+        - IF(id = OLD.producto_id AND OLD.aprobada = 1, 1, 0)
+        + IF(id = NEW.producto_id AND NEW.aprobada = 1, 1, 0),
+    rating_suma = rating_suma
+        - IF(id = OLD.producto_id AND OLD.aprobada = 1, OLD.calificacion, 0)
+        + IF(id = NEW.producto_id AND NEW.aprobada = 1, NEW.calificacion, 0),
+    rating_avg = IF(rating_count > 0, rating_suma / rating_count, 0),
+    fecha_actualizacion = fecha_actualizacion
+WHERE id IN (OLD.producto_id, NEW.producto_id)
+AND (OLD.aprobada <> NEW.aprobada OR OLD.calificacion <> NEW.calificacion
+     OR OLD.producto_id <> NEW.producto_id);
+
+CREATE TRIGGER trg_resenas_calificacion_delete AFTER DELETE ON resenas
+FOR EACH ROW
+UPDATE productos
+SET rating_count = rating_count - 1,
+    rating_suma = rating_suma - OLD.calificacion,
+    rating_avg = IF(rating_count > 0, rating_suma / rating_count, 0),
+    fecha_actualizacion = fecha_actualizacion
+WHERE id = OLD.producto_id AND OLD.aprobada = 1;
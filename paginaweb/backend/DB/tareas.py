@@ -0,0 +1,71 @@
+import os
+import threading
+
+class TareaPeriodica:
+    """Ejecuta una función cada cierto tiempo en un hilo de fondo del proceso
+    
+    El hilo se inicia la primera vez que se llama a `iniciar()` en cada
+    proceso: si gunicorn bifurca el proceso después de importar la app, cada
+    worker arranca su propio hilo. `despertar()` adelanta la siguiente
+    ejecución y `detener()` hace una última ejecución al apagar.
+    """
+    
+    def __init__(self, nombre, intervalo, funcion):
+        self.nombre = nombre
+        self.intervalo = intervalo
+        self.funcion = funcion
+        self._lock = threading.Lock()
+        self._pid = None
+        self._hilo = None
+        self._evento = None
+        self._detenida = False
+    
+    def iniciar(self):
+        """Inicia el hilo si todavía no corre en este proceso"""
+        if self._pid == os.getpid() and self._hilo is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._hilo is not None:
+                return
+            self._pid = os.getpid()
+            self._evento = threading.Event()
+            self._detenida = False
+            self._hilo = threading.Thread(target=self._ciclo, name=self.nombre, daemon=True)
+            self._hilo.start()
+    
+    def despertar(self):
+        """Adelanta la siguiente ejecución"""
+        if self._evento is not None:
+            self._evento.set()
+    
+    def ejecutar(self):
+        """Ejecuta la función ahora en el hilo actual"""
+        try:
+            self.funcion()
+        except Exception as e:
+            print(f"Error en tarea periódica {self.nombre}: {str(e)}")
+    
+    def detener(self, ejecutar_final=True):
+        """Detiene el hilo de este proceso y, si se indica, ejecuta una última vez"""
+        with self._lock:
+            hilo = self._hilo if self._pid == os.getpid() else None
+            self._detenida = True
+            self._hilo = None
+            if self._evento is not None:
+                self._evento.set()
+        if hilo is not None and hilo is not threading.current_thread():
+            hilo.join(timeout=self.intervalo)
+        if ejecutar_final:
+            self.ejecutar()
+    
+    def _ciclo(self):
+        evento = self._evento
+        while not self._detenida:
+            evento.wait(self.intervalo)
+            if self._detenida:
+                break
+            # Limpiar justo antes de ejecutar (nunca después): un despertar()
+            # que llegue durante la ejecución deja el evento activo y la
+            # siguiente espera vuelve de inmediato para otra pasada
+            evento.clear()
+            self.ejecutar()
@@ -0,0 +1,308 @@
+import os
+import json
+import random
+import socket
+import threading
+import time
+import traceback
+from backend.DB.db_manager import execute_query, transaction
+
+class TrabajosConfig:
+    """Configuración de la cola de trabajos en segundo plano"""
+    # Hilos por worker que ejecutan trabajos
+    WORKERS = int(os.environ.get('TRABAJOS_WORKERS', 2))
+    # Segundos entre consultas a la tabla cuando no hay trabajo
+    INTERVALO = float(os.environ.get('TRABAJOS_INTERVALO', 5))
+    # Reintentos: espera BACKOFF_BASE * 2^(intento-1) segundos, hasta BACKOFF_MAX
+    MAX_INTENTOS = int(os.environ.get('TRABAJOS_MAX_INTENTOS', 5))
+    BACKOFF_BASE = 10
+    BACKOFF_MAX = 3600
+    # Un trabajo 'en_proceso' más antiguo que esto se da por abandonado
+    # (el worker murió) y vuelve a la cola
+    TIMEOUT = int(os.environ.get('TRABAJOS_TIMEOUT', 600))
+    # Días que se conservan los trabajos completados
+    DIAS_COMPLETADOS = 7
+
+_MANEJADORES = {}
+
+def registrar_tarea(tipo):
+    """Registra la función que ejecuta los trabajos de un tipo
+    
+    Uso:
+        @registrar_tarea('correo.enviar')
+        def enviar(datos):
+            ...
+    
+    La función recibe el diccionario `datos` del trabajo; si lanza una
+    excepción el trabajo se reintenta.
+    """
+    def decorador(funcion):
+        _MANEJADORES[tipo] = funcion
+        return funcion
+    return decorador
+
+def encolar(tipo, datos=None, max_intentos=None, retraso=0):
+    """Agrega un trabajo a la cola persistente
+    
+    Args:
+        tipo (str): Tipo registrado con @registrar_tarea
+        datos (dict): Parámetros del trabajo (serializables a JSON)
+        max_intentos (int, optional): Intentos antes de marcarlo como fallido
+        retraso (int): Segundos antes de la primera ejecución
+    
+    Returns:
+        int: ID del trabajo, o None si no se pudo guardar (en ese caso se
+        ejecuta en memoria sin reintentos para no perderlo)
+    """
+    if tipo not in _MANEJADORES:
+        raise ValueError(f"Tipo de trabajo no registrado: {tipo}")
+    datos = datos or {}
+    
+    trabajo_id = execute_query(
+        """
+        INSERT INTO trabajos (tipo, datos, max_intentos, ejecutar_despues)
+        VALUES (%s, %s, %s, NOW() + INTERVAL %s SECOND)
+        """,
+        (tipo, json.dumps(datos, default=str), max_intentos or TrabajosConfig.MAX_INTENTOS, int(retraso)),
+        commit=True,
+        return_last_id=True
+    )
+    
+    if not isinstance(trabajo_id, int) or not trabajo_id:
+        print(f"No se pudo guardar el trabajo {tipo}; se ejecuta sin persistencia")
+        cola_trabajos.ejecutar_en_memoria(tipo, datos)
+        return None
+    
+    cola_trabajos.iniciar()
+    cola_trabajos.despertar()
+    return trabajo_id
+
+def _backoff(intento):
+    """Segundos de espera antes del siguiente intento (con variación aleatoria)"""
+    espera = min(TrabajosConfig.BACKOFF_BASE * 2 ** (intento - 1), TrabajosConfig.BACKOFF_MAX)
+    return int(espera * random.uniform(0.8, 1.2))
+
+class ColaTrabajos:
+    """Ejecuta en hilos de fondo los trabajos guardados en la tabla `trabajos`
+    
+    Cada worker de gunicorn arranca sus propios hilos (se detecta el cambio
+    de pid). Los hilos toman trabajos con SELECT ... FOR UPDATE SKIP LOCKED,
+    así varios workers comparten la tabla sin ejecutar dos veces el mismo.
+    Los trabajos que agotan sus intentos quedan en estado 'fallido' para
+    revisarlos y reencolarlos a mano.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._hilos = []
+        self._evento = threading.Event()
+        self._detenida = False
+        self._ultimo_mantenimiento = 0.0
+        self._nombre = f"{socket.gethostname()}:{os.getpid()}"
+        # Métricas de este proceso
+        self._completados = 0
+        self._reintentos = 0
+        self._fallidos = 0
+    
+    def iniciar(self):
+        """Arranca los hilos si todavía no corren en este proceso"""
+        if self._pid == os.getpid() and self._hilos:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._hilos:
+                return
+            self._pid = os.getpid()
+            self._nombre = f"{socket.gethostname()}:{self._pid}"
+            self._evento = threading.Event()
+            self._detenida = False
+            self._hilos = [
+                threading.Thread(target=self._ciclo, name=f"trabajos-{i}", daemon=True)
+                for i in range(TrabajosConfig.WORKERS)
+            ]
+            for hilo in self._hilos:
+                hilo.start()
+    
+    def despertar(self):
+        """Hace que un hilo revise la cola sin esperar al intervalo"""
+        self._evento.set()
+    
+    def detener(self, timeout=10):
+        """Detiene los hilos de este proceso esperando el trabajo en curso"""
+        with self._lock:
+            hilos = self._hilos if self._pid == os.getpid() else []
+            self._detenida = True
+            self._hilos = []
+            self._evento.set()
+        for hilo in hilos:
+            if hilo is not threading.current_thread():
+                hilo.join(timeout=timeout)
+    
+    def ejecutar_pendientes(self, limite=None):
+        """Ejecuta en el hilo actual los trabajos listos (scripts y CLI)
+        
+        Returns:
+            int: Trabajos procesados
+        """
+        procesados = 0
+        while limite is None or procesados < limite:
+            if not self._procesar_siguiente():
+                break
+            procesados += 1
+        return procesados
+    
+    def ejecutar_en_memoria(self, tipo, datos):
+        """Ejecuta un trabajo sin pasar por la tabla (la base de datos no respondió)"""
+        def ejecutar():
+            try:
+                _MANEJADORES[tipo](datos)
+            except Exception as e:
+                print(f"Error en trabajo {tipo} (sin persistencia): {str(e)}")
+        threading.Thread(target=ejecutar, name=f"trabajo-{tipo}", daemon=True).start()
+    
+    def _ciclo(self):
+        evento = self._evento
+        while not self._detenida:
+            # Limpiar antes de buscar trabajo: un aviso que llegue mientras
+            # se procesa la cola no se pierde
+            evento.clear()
+            try:
+                self._mantenimiento()
+                if self._procesar_siguiente():
+                    continue
+            except Exception as e:
+                print(f"Error en la cola de trabajos: {str(e)}")
+            evento.wait(TrabajosConfig.INTERVALO)
+    
+    def _tomar_siguiente(self):
+        """Marca como 'en_proceso' el siguiente trabajo listo y lo devuelve"""
+        with transaction() as tx:
+            trabajo = execute_query("""
+                SELECT id, tipo, datos, intentos, max_intentos
+                FROM trabajos
+                WHERE estado = 'pendiente' AND ejecutar_despues <= NOW()
+                ORDER BY ejecutar_despues, id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            """, fetchone=True)
+            if trabajo:
+                execute_query("""
+                    UPDATE trabajos
+                    SET estado = 'en_proceso', intentos = intentos + 1,
+                        bloqueado_por = %s, bloqueado_en = NOW()
+                    WHERE id = %s
+                """, (self._nombre, trabajo['id']), commit=True)
+        if not trabajo or not tx.committed:
+            return None
+        trabajo['intentos'] += 1
+        return trabajo
+    
+    def _procesar_siguiente(self):
+        """Ejecuta un trabajo de la cola
+        
+        Returns:
+            bool: True si había un trabajo listo
+        """
+        trabajo = self._tomar_siguiente()
+        if trabajo is None:
+            return False
+        
+        manejador = _MANEJADORES.get(trabajo['tipo'])
+        try:
+            if manejador is None:
+                raise LookupError(f"Tipo de trabajo no registrado: {trabajo['tipo']}")
+            datos = trabajo['datos']
+            manejador(json.loads(datos) if isinstance(datos, (str, bytes)) else (datos or {}))
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)}\n{traceback.format_exc(limit=5)}"
+            if manejador is not None and trabajo['intentos'] < trabajo['max_intentos']:
+                espera = _backoff(trabajo['intentos'])
+                self._reintentos += 1
+                print(f"Trabajo {trabajo['id']} ({trabajo['tipo']}) falló, reintento en {espera} s: {str(e)}")
+                execute_query("""
+                    UPDATE trabajos
+                    SET estado = 'pendiente', ultimo_error = %s, bloqueado_por = NULL,
+                        ejecutar_despues = NOW() + INTERVAL %s SECOND
+                    WHERE id = %s
+                """, (error, espera, trabajo['id']), commit=True)
+            else:
+                # Sin más intentos: queda en la cola de fallidos
+                self._fallidos += 1
+                print(f"Trabajo {trabajo['id']} ({trabajo['tipo']}) marcado como fallido: {str(e)}")
+                execute_query("""
+                    UPDATE trabajos
+                    SET estado = 'fallido', ultimo_error = %s, bloqueado_por = NULL
+                    WHERE id = %s
+                """, (error, trabajo['id']), commit=True)
+            return True
+        
+        self._completados += 1
+        execute_query("""
+            UPDATE trabajos
+            SET estado = 'completado', ultimo_error = NULL, bloqueado_por = NULL
+            WHERE id = %s
+        """, (trabajo['id'],), commit=True)
+        return True
+    
+    def _mantenimiento(self):
+        """Recupera trabajos abandonados y borra completados antiguos (cada minuto)"""
+        if time.monotonic() - self._ultimo_mantenimiento < 60:
+            return
+        self._ultimo_mantenimiento = time.monotonic()
+        # Un trabajo que tumba al worker se abandona en cada intento: sin
+        # este límite volvería a la cola para siempre
+        execute_query("""
+            UPDATE trabajos
+            SET estado = 'fallido', bloqueado_por = NULL,
+                ultimo_error = 'Abandonado en proceso sin terminar en el último intento'
+            WHERE estado = 'en_proceso' AND bloqueado_en < NOW() - INTERVAL %s SECOND
+            AND intentos >= max_intentos
+        """, (TrabajosConfig.TIMEOUT,), commit=True)
+        execute_query("""
+            UPDATE trabajos
+            SET estado = 'pendiente', bloqueado_por = NULL
+            WHERE estado = 'en_proceso' AND bloqueado_en < NOW() - INTERVAL %s SECOND
+            AND intentos < max_intentos
+        """, (TrabajosConfig.TIMEOUT,), commit=True)
+        execute_query("""
+            DELETE FROM trabajos
+            WHERE estado = 'completado' AND actualizado_en < NOW() - INTERVAL %s DAY
+            LIMIT 1000
+        """, (TrabajosConfig.DIAS_COMPLETADOS,), commit=True)
+    
+    def stats(self):
+        """Trabajos por estado y métricas de este proceso"""
+        filas = execute_query("SELECT estado, COUNT(*) as total FROM trabajos GROUP BY estado") or []
+        return {
+            'pid': os.getpid(),
+            'hilos': len(self._hilos) if self._pid == os.getpid() else 0,
+            'por_estado': {fila['estado']: fila['total'] for fila in filas},
+            'completados': self._completados,
+            'reintentos': self._reintentos,
+            'fallidos': self._fallidos
+        }
+
+cola_trabajos = ColaTrabajos()
+
+def reintentar_fallidos(tipo=None):
+    """Devuelve a la cola los trabajos fallidos (todos o de un tipo)"""
+    filtro = "AND tipo = %s" if tipo else ""
+    resultado = execute_query(f"""
+        UPDATE trabajos
+        SET estado = 'pendiente', intentos = 0, ejecutar_despues = NOW()
+        WHERE estado = 'fallido' {filtro}
+    """, (tipo,) if tipo else (), commit=True)
+    cola_trabajos.despertar()
+    return resultado
+
+def iniciar_trabajadores():
+    """Arranca los hilos de la cola en este proceso (si no corren ya)"""
+    cola_trabajos.iniciar()
+
+def detener_trabajadores():
+    """Detiene los hilos de la cola al apagar el worker"""
+    cola_trabajos.detener()
+
+def get_trabajos_stats():
+    """Métricas de la cola de trabajos"""
+    return cola_trabajos.stats()
@@ -0,0 +1,222 @@
+import datetime
+from backend.DB.db_manager import execute_query
+
+class VentasConfig:
+    """Configuración del resumen diario de ventas"""
+    # Rangos predefinidos del endpoint: (días o meses incluidos, agrupación)
+    RANGOS = {
+        '7d': (7, 'dia'),
+        '30d': (30, 'dia'),
+        '90d': (90, 'dia'),
+        '12m': (12, 'mes')
+    }
+    # Días máximos de un rango arbitrario
+    MAX_DIAS = 3660
+    # Estados que no cuentan como venta en la serie
+    EXCLUIR = ('cancelado',)
+
+def registrar_venta(estado, monto, unidades, pedidos=1, fecha=None):
+    """Suma un pedido (o lo resta, con valores negativos) al resumen del día
+    
+    Se llama dentro de la transacción que escribe el pedido para que el
+    resumen y la tabla de pedidos cambien juntos.
+    
+    Args:
+        estado (str): Estado del pedido
+        monto (float): monto_total del pedido
+        unidades (int): Unidades vendidas en el pedido
+        pedidos (int): 1 al sumar, -1 al restar
+        fecha (date, optional): Día del pedido; por defecto CURRENT_DATE
+            (el mismo reloj que fecha_pedido)
+    
+    Returns:
+        dict: Resultado de execute_query
+    """
+    return execute_query(
+        """
+        INSERT INTO ventas_diarias (fecha, estado, pedidos, ingresos, unidades)
+        VALUES (COALESCE(%s, CURRENT_DATE), %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            pedidos = pedidos + VALUES(pedidos),
+            ingresos = ingresos + VALUES(ingresos),
+            unidades = unidades + VALUES(unidades)
+        """,
+        (fecha, estado, pedidos, monto, unidades),
+        commit=True
+    )
+
+def mover_venta(pedido, estado_nuevo):
+    """Pasa un pedido de su estado actual a `estado_nuevo` en el resumen
+    
+    Args:
+        pedido (dict): Con 'estado', 'fecha', 'monto_total' y 'unidades'
+            (ver PEDIDO_RESUMEN_SQL)
+        estado_nuevo (str): Estado que se está guardando
+    """
+    if pedido['estado'] == estado_nuevo:
+        return
+    unidades = int(pedido['unidades'] or 0)
+    registrar_venta(pedido['estado'], -pedido['monto_total'], -unidades, pedidos=-1, fecha=pedido['fecha'])
+    registrar_venta(estado_nuevo, pedido['monto_total'], unidades, fecha=pedido['fecha'])
+    
+    # productos.contador_ventas no cuenta los pedidos cancelados: restar al
+    # cancelar y volver a sumar si se restaura
+    cancelado_antes = pedido['estado'] in VentasConfig.EXCLUIR
+    if cancelado_antes != (estado_nuevo in VentasConfig.EXCLUIR):
+        ajustar_contador_ventas(pedido['id'], 1 if cancelado_antes else -1)
+
+def ajustar_contador_ventas(pedido_id, signo):
+    """Suma (signo 1) o resta (signo -1) las unidades de un pedido a
+    productos.contador_ventas
+    
+    Returns:
+        dict: Resultado de execute_query
+    """
+    return execute_query(
+        """
+        UPDATE productos p
+        JOIN (
+            SELECT producto_id, SUM(cantidad) as cantidad
+            FROM items_pedido
+            WHERE pedido_id = %s
+            GROUP BY producto_id
+        ) i ON i.producto_id = p.id
+        SET p.contador_ventas = GREATEST(p.contador_ventas + %s * i.cantidad, 0),
+            p.fecha_actualizacion = p.fecha_actualizacion
+        """,
+        (pedido_id, signo),
+        commit=True
+    )
+
+def recalcular_contador_ventas():
+    """Recalcula productos.contador_ventas desde items_pedido (sin cancelados)
+    
+    El checkout y mover_venta lo mantienen al día; esto sólo hace falta
+    después de borrados masivos de pedidos (limpieza de datos de ejemplo,
+    cascadas al eliminar usuarios).
+    """
+    return execute_query("""
+        UPDATE productos p
+        LEFT JOIN (
+            SELECT ip.producto_id, SUM(ip.cantidad) as unidades
+            FROM items_pedido ip
+            JOIN pedidos pd ON ip.pedido_id = pd.id
+            WHERE pd.estado != 'cancelado'
+            GROUP BY ip.producto_id
+        ) v ON v.producto_id = p.id
+        SET p.contador_ventas = COALESCE(v.unidades, 0),
+            p.fecha_actualizacion = p.fecha_actualizacion
+    """, commit=True)
+
+# Datos de un pedido para mover_venta (bloquea la fila del pedido)
+PEDIDO_RESUMEN_SQL = """
+    SELECT p.id, p.usuario_id, p.estado, DATE(p.fecha_pedido) as fecha, p.monto_total,
+           (SELECT COALESCE(SUM(ip.cantidad), 0) FROM items_pedido ip WHERE ip.pedido_id = p.id) as unidades
+    FROM pedidos p
+    WHERE p.id = %s
+    FOR UPDATE
+"""
+
+def _periodo(fecha, agrupar):
+    return fecha.replace(day=1) if agrupar == 'mes' else fecha
+
+def _siguiente(fecha, agrupar):
+    if agrupar == 'mes':
+        return (fecha.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return fecha + datetime.timedelta(days=1)
+
+def consultar_ventas(rango='7d', desde=None, hasta=None, agrupar=None):
+    """Serie de ventas leída sólo del resumen diario
+    
+    El costo depende de los días del rango, no de la cantidad de pedidos.
+    
+    Args:
+        rango (str): Uno de VentasConfig.RANGOS (se ignora si se indica `desde`;
+            define también la agrupación)
+        desde (date, optional): Primer día de un rango arbitrario
+        hasta (date, optional): Último día (por defecto hoy)
+        agrupar (str, optional): 'dia' o 'mes' para un rango arbitrario
+    
+    Returns:
+        dict: Resultado con los siguientes campos:
+            - desde, hasta (str): Rango consultado (ISO)
+            - agrupar (str): 'dia' o 'mes'
+            - series (list): {'periodo', 'pedidos', 'ingresos', 'unidades'} por
+              día o mes, con ceros donde no hubo ventas (sin cancelados)
+            - por_estado (dict): Totales del rango por estado
+            - totales (dict): Totales del rango (sin cancelados)
+        o None si falló la consulta
+    
+    Raises:
+        ValueError: Si el rango o las fechas no son válidos
+    """
+    hoy = datetime.date.today()
+    hasta = hasta or hoy
+    if desde is None:
+        if rango not in VentasConfig.RANGOS:
+            raise ValueError(f"Rango no válido: {rango}")
+        cantidad, agrupar = VentasConfig.RANGOS[rango]
+        if agrupar == 'mes':
+            meses = hasta.year * 12 + hasta.month - cantidad
+            desde = datetime.date(meses // 12, meses % 12 + 1, 1)
+        else:
+            desde = hasta - datetime.timedelta(days=cantidad - 1)
+    agrupar = agrupar or 'dia'
+    if agrupar not in ('dia', 'mes'):
+        raise ValueError(f"Agrupación no válida: {agrupar}")
+    if desde > hasta:
+        raise ValueError("La fecha inicial es posterior a la final")
+    if (hasta - desde).days >= VentasConfig.MAX_DIAS:
+        raise ValueError(f"El rango no puede superar {VentasConfig.MAX_DIAS} días")
+    
+    filas = execute_query(
+        """
+        SELECT fecha, estado, pedidos, ingresos, unidades
+        FROM ventas_diarias
+        WHERE fecha BETWEEN %s AND %s
+        ORDER BY fecha
+        """,
+        (desde, hasta)
+    )
+    if filas is None:
+        return None
+    
+    vacio = lambda: {'pedidos': 0, 'ingresos': 0.0, 'unidades': 0}
+    series = {}
+    periodo = _periodo(desde, agrupar)
+    while periodo <= hasta:
+        series[periodo] = vacio()
+        periodo = _siguiente(periodo, agrupar)
+    
+    por_estado = {}
+    totales = vacio()
+    for fila in filas:
+        valores = {
+            'pedidos': int(fila['pedidos']),
+            'ingresos': float(fila['ingresos']),
+            'unidades': int(fila['unidades'])
+        }
+        estado = por_estado.setdefault(fila['estado'], vacio())
+        for clave, valor in valores.items():
+            estado[clave] += valor
+        if fila['estado'] in VentasConfig.EXCLUIR:
+            continue
+        punto = series[_periodo(fila['fecha'], agrupar)]
+        for clave, valor in valores.items():
+            punto[clave] += valor
+            totales[clave] += valor
+    
+    return {
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'agrupar': agrupar,
+        'series': [
+            dict(periodo=periodo.isoformat(), **{clave: round(valor, 2) for clave, valor in punto.items()})
+            for periodo, punto in series.items()
+        ],
+        'por_estado': {
+            estado: {clave: round(valor, 2) for clave, valor in valores.items()}
+            for estado, valores in por_estado.items()
+        },
+        'totales': {clave: round(valor, 2) for clave, valor in totales.items()}
+    }
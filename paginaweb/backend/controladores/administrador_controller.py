@@ -2,23 +2,17 @@ import os
 import datetime
 import json
 from backend.configuracion.config import Config
-from backend.DB.db_manager import execute_query, check_database_exists, create_database
+from backend.DB.db_manager import execute_query, transaction
+from backend.DB.cache import get_informacion_tienda, invalidar_informacion_tienda, invalidar_paginas_publicas, invalidar_resumen_usuario
+from backend.DB.paginacion import consultar_pagina, consultar_pagina_cursor
+from backend.DB.ventas import PEDIDO_RESUMEN_SQL, mover_venta
+from backend.DB.estadisticas import CONTADORES, get_estadisticas_dashboard, ajustar_estadistica, marcar_estadisticas_desactualizadas
 
 class AdministradorController:
     """Controlador para el panel de administración de Talabartería Rodríguez"""
     
     def __init__(self):
-        self._ensure_db_exists()
-    
-    def _ensure_db_exists(self):
-        """Asegura que la base de datos existe y tiene la estructura necesaria"""
-        # Verificar si la base de datos existe
-        if not check_database_exists():
-            print("La base de datos no existe o está incompleta. Creando...")
-            if create_database():
-                print("Base de datos creada exitosamente")
-            else:
-                print("Error al crear la base de datos")
+        pass
     
     def get_admin_data(self, admin_id):
         """Obtiene los datos necesarios para el panel de administración
@@ -45,10 +39,7 @@ class AdministradorController:
             return None
         
         # Obtener información general de la tienda
-        tienda_info = execute_query(
-            "SELECT * FROM informacion_tienda LIMIT 1", 
-            fetchone=True
-        ) or {}
+        tienda_info = get_informacion_tienda() or {}
         
         # Obtener estadísticas generales
         stats = self.get_dashboard_stats()
@@ -69,115 +60,40 @@ class AdministradorController:
     def get_dashboard_stats(self):
         """Obtiene estadísticas para el dashboard
         
+        Los valores vienen precalculados de estadisticas_dashboard (una sola
+        consulta); ver backend/DB/estadisticas.py.
+        
         Returns:
             dict: Estadísticas para el dashboard
         """
-        # Total de productos
-        total_productos = execute_query(
-            "SELECT COUNT(*) as total FROM productos", 
-            fetchone=True
-        )
-        
-        # Total de categorías
-        total_categorias = execute_query(
-            "SELECT COUNT(*) as total FROM categorias", 
-            fetchone=True
-        )
-        
-        # Total de usuarios
-        total_usuarios = execute_query(
-            "SELECT COUNT(*) as total FROM usuarios", 
-            fetchone=True
-        )
-        
-        # Total de pedidos
-        total_pedidos = execute_query(
-            "SELECT COUNT(*) as total FROM pedidos", 
-            fetchone=True
-        )
-        
-        # Pedidos recientes
-        pedidos_recientes = execute_query(
-            """
-            SELECT p.id, p.fecha_pedido, p.monto_total, p.estado, p.estado_pago,
-                   u.nombre, u.apellidos
-            FROM pedidos p
-            JOIN usuarios u ON p.usuario_id = u.id
-            ORDER BY p.fecha_pedido DESC
-            LIMIT 5
-            """
-        )
-        
-        # Ventas por día (últimos 7 días)
-        ventas_por_dia = execute_query(
-            """
-            SELECT DATE(fecha_pedido) as fecha, SUM(monto_total) as total_ventas
-            FROM pedidos
-            WHERE fecha_pedido >= DATE_SUB(CURRENT_DATE, INTERVAL 7 DAY)
-            GROUP BY DATE(fecha_pedido)
-            ORDER BY fecha
-            """
-        )
-        
-        # Productos más vendidos
-        productos_top = execute_query(
-            """
-            SELECT p.id, p.nombre, p.precio, SUM(ip.cantidad) as total_vendido
-            FROM items_pedido ip
-            JOIN productos p ON ip.producto_id = p.id
-            JOIN pedidos pd ON ip.pedido_id = pd.id
-            WHERE pd.estado != 'cancelado'
-            GROUP BY p.id
-            ORDER BY total_vendido DESC
-            LIMIT 5
-            """
-        )
-        
-        # Productos con poco stock
-        productos_bajo_stock = execute_query(
-            """
-            SELECT id, nombre, cantidad_stock
-            FROM productos
-            WHERE cantidad_stock <= 5 AND cantidad_stock > 0 AND activo = 1
-            ORDER BY cantidad_stock ASC
-            LIMIT 5
-            """
-        )
-        
-        # Productos sin stock
-        productos_sin_stock = execute_query(
-            """
-            SELECT COUNT(*) as total
-            FROM productos
-            WHERE cantidad_stock = 0 AND activo = 1
-            """
-        )
-        
-        # Combinar todas las estadísticas
-        stats = {
-            'total_productos': total_productos['total'] if total_productos else 0,
-            'total_categorias': total_categorias['total'] if total_categorias else 0,
-            'total_usuarios': total_usuarios['total'] if total_usuarios else 0,
-            'total_pedidos': total_pedidos['total'] if total_pedidos else 0,
-            'pedidos_recientes': pedidos_recientes,
-            'ventas_por_dia': ventas_por_dia,
-            'productos_top': productos_top,
-            'productos_bajo_stock': productos_bajo_stock,
-            'productos_sin_stock': productos_sin_stock['total'] if productos_sin_stock else 0,
-        }
+        stats = get_estadisticas_dashboard()
+        if stats is None:
+            stats = {contador: 0 for contador in CONTADORES}
+            stats.update({
+                'pedidos_recientes': [],
+                'ventas_por_dia': [],
+                'productos_top': [],
+                'productos_bajo_stock': []
+            })
         
         return stats
     
-    def get_productos_admin(self, filtros=None, pagina=1, items_por_pagina=20):
+    def get_productos_admin(self, filtros=None, pagina=1, items_por_pagina=20, cursor=None):
         """Obtiene la lista de productos para administración
         
         Args:
             filtros (dict, optional): Filtros para la búsqueda
-            pagina (int, optional): Número de página
+            pagina (int, optional): Número de página (saltar a una página)
             items_por_pagina (int, optional): Ítems por página
+            cursor (str, optional): Cursor de la página anterior. Si se indica
+                (cadena vacía para la primera página) se pagina por cursor y
+                se ignora `pagina`.
             
         Returns:
             dict: Datos de productos y paginación
+            
+        Raises:
+            ValueError: Si el cursor no es válido
         """
         # Calcular offset para paginación
         offset = (pagina - 1) * items_por_pagina
@@ -212,11 +128,28 @@ class AdministradorController:
             SELECT p.id, p.nombre, p.precio, p.precio_descuento, p.cantidad_stock,
                    p.activo, p.destacado, p.nuevo, p.fecha_creacion,
                    c.nombre as categoria_nombre, 
-                   (SELECT url_imagen FROM imagenes_productos WHERE producto_id = p.id AND es_principal = 1 LIMIT 1) as imagen_principal
+                   p.imagen_principal_url as imagen_principal
             FROM productos p
             LEFT JOIN categorias c ON p.categoria_id = c.id
         """
         
+        # Modo cursor: continuar después de la última fila vista, sin OFFSET
+        if cursor is not None:
+            resultado = consultar_pagina_cursor(
+                query, where_clauses, params,
+                orden=[('p.fecha_creacion', 'fecha_creacion'), ('p.id', 'id')],
+                limit=items_por_pagina,
+                cursor=cursor
+            )
+            return {
+                'productos': resultado['filas'],
+                'paginacion': {
+                    'items_por_pagina': items_por_pagina,
+                    'siguiente_cursor': resultado['siguiente_cursor'],
+                    'hay_mas': resultado['hay_mas']
+                }
+            }
+        
         # Añadir cláusulas WHERE si existen
         if where_clauses:
             query += " WHERE " + " AND ".join(where_clauses)
@@ -224,27 +157,10 @@ class AdministradorController:
         # Añadir ordenación
         query += " ORDER BY p.fecha_creacion DESC"
         
-        # Añadir paginación
-        query += " LIMIT %s OFFSET %s"
-        params.extend([items_por_pagina, offset])
-        
-        # Ejecutar consulta
-        productos = execute_query(query, params)
-        
-        # Obtener total de productos para paginación
-        query_count = """
-            SELECT COUNT(*) as total
-            FROM productos p
-            LEFT JOIN categorias c ON p.categoria_id = c.id
-        """
-        
-        if where_clauses:
-            query_count += " WHERE " + " AND ".join(where_clauses)
-        
-        total = execute_query(query_count, params[:-2], fetchone=True)
+        # Ejecutar consulta (página y total en un solo viaje)
+        productos, total_productos = consultar_pagina(query, params, items_por_pagina, offset)
         
         # Calcular datos de paginación
-        total_productos = total['total'] if total else 0
         total_paginas = (total_productos + items_por_pagina - 1) // items_por_pagina
         
         # Devolver resultado
@@ -278,16 +194,22 @@ class AdministradorController:
         
         return categorias
     
-    def get_pedidos_admin(self, filtros=None, pagina=1, items_por_pagina=20):
+    def get_pedidos_admin(self, filtros=None, pagina=1, items_por_pagina=20, cursor=None):
         """Obtiene la lista de pedidos para administración
         
         Args:
             filtros (dict, optional): Filtros para la búsqueda
-            pagina (int, optional): Número de página
+            pagina (int, optional): Número de página (saltar a una página)
             items_por_pagina (int, optional): Ítems por página
+            cursor (str, optional): Cursor de la página anterior. Si se indica
+                (cadena vacía para la primera página) se pagina por cursor y
+                se ignora `pagina`.
             
         Returns:
             dict: Datos de pedidos y paginación
+            
+        Raises:
+            ValueError: Si el cursor no es válido
         """
         # Calcular offset para paginación
         offset = (pagina - 1) * items_por_pagina
@@ -327,6 +249,23 @@ class AdministradorController:
             JOIN usuarios u ON p.usuario_id = u.id
         """
         
+        # Modo cursor: continuar después de la última fila vista, sin OFFSET
+        if cursor is not None:
+            resultado = consultar_pagina_cursor(
+                query, where_clauses, params,
+                orden=[('p.fecha_pedido', 'fecha_pedido'), ('p.id', 'id')],
+                limit=items_por_pagina,
+                cursor=cursor
+            )
+            return {
+                'pedidos': resultado['filas'],
+                'paginacion': {
+                    'items_por_pagina': items_por_pagina,
+                    'siguiente_cursor': resultado['siguiente_cursor'],
+                    'hay_mas': resultado['hay_mas']
+                }
+            }
+        
         # Añadir cláusulas WHERE si existen
         if where_clauses:
             query += " WHERE " + " AND ".join(where_clauses)
@@ -334,27 +273,10 @@ class AdministradorController:
         # Añadir ordenación
         query += " ORDER BY p.fecha_pedido DESC"
         
-        # Añadir paginación
-        query += " LIMIT %s OFFSET %s"
-        params.extend([items_por_pagina, offset])
-        
-        # Ejecutar consulta
-        pedidos = execute_query(query, params)
-        
-        # Obtener total de pedidos para paginación
-        query_count = """
-            SELECT COUNT(*) as total
-            FROM pedidos p
-            JOIN usuarios u ON p.usuario_id = u.id
-        """
-        
-        if where_clauses:
-            query_count += " WHERE " + " AND ".join(where_clauses)
-        
-        total = execute_query(query_count, params[:-2], fetchone=True)
+        # Ejecutar consulta (página y total en un solo viaje)
+        pedidos, total_pedidos = consultar_pagina(query, params, items_por_pagina, offset)
         
         # Calcular datos de paginación
-        total_pedidos = total['total'] if total else 0
         total_paginas = (total_pedidos + items_por_pagina - 1) // items_por_pagina
         
         # Devolver resultado
@@ -368,16 +290,22 @@ class AdministradorController:
             }
         }
     
-    def get_usuarios_admin(self, filtros=None, pagina=1, items_por_pagina=20):
+    def get_usuarios_admin(self, filtros=None, pagina=1, items_por_pagina=20, cursor=None):
         """Obtiene la lista de usuarios para administración
         
         Args:
             filtros (dict, optional): Filtros para la búsqueda
-            pagina (int, optional): Número de página
+            pagina (int, optional): Número de página (saltar a una página)
             items_por_pagina (int, optional): Ítems por página
+            cursor (str, optional): Cursor de la página anterior. Si se indica
+                (cadena vacía para la primera página) se pagina por cursor y
+                se ignora `pagina`.
             
         Returns:
             dict: Datos de usuarios y paginación
+            
+        Raises:
+            ValueError: Si el cursor no es válido
         """
         # Calcular offset para paginación
         offset = (pagina - 1) * items_por_pagina
@@ -412,6 +340,23 @@ class AdministradorController:
             LEFT JOIN administradores a ON u.id = a.usuario_id
         """
         
+        # Modo cursor: continuar después de la última fila vista, sin OFFSET
+        if cursor is not None:
+            resultado = consultar_pagina_cursor(
+                query, where_clauses, params,
+                orden=[('u.fecha_registro', 'fecha_registro'), ('u.id', 'id')],
+                limit=items_por_pagina,
+                cursor=cursor
+            )
+            return {
+                'usuarios': resultado['filas'],
+                'paginacion': {
+                    'items_por_pagina': items_por_pagina,
+                    'siguiente_cursor': resultado['siguiente_cursor'],
+                    'hay_mas': resultado['hay_mas']
+                }
+            }
+        
         # Añadir cláusulas WHERE si existen
         if where_clauses:
             query += " WHERE " + " AND ".join(where_clauses)
@@ -419,27 +364,10 @@ class AdministradorController:
         # Añadir ordenación
         query += " ORDER BY u.fecha_registro DESC"
         
-        # Añadir paginación
-        query += " LIMIT %s OFFSET %s"
-        params.extend([items_por_pagina, offset])
-        
-        # Ejecutar consulta
-        usuarios = execute_query(query, params)
-        
-        # Obtener total de usuarios para paginación
-        query_count = """
-            SELECT COUNT(*) as total
-            FROM usuarios u
-            LEFT JOIN administradores a ON u.id = a.usuario_id
-        """
-        
-        if where_clauses:
-            query_count += " WHERE " + " AND ".join(where_clauses)
-        
-        total = execute_query(query_count, params[:-2], fetchone=True)
+        # Ejecutar consulta (página y total en un solo viaje)
+        usuarios, total_usuarios = consultar_pagina(query, params, items_por_pagina, offset)
         
         # Calcular datos de paginación
-        total_usuarios = total['total'] if total else 0
         total_paginas = (total_usuarios + items_por_pagina - 1) // items_por_pagina
         
         # Devolver resultado
@@ -512,11 +440,14 @@ class AdministradorController:
                 # Ejecutar actualización
                 execute_query(
                     f"UPDATE productos SET {', '.join(update_fields)} WHERE id = %s",
-                    update_values
+                    update_values,
+                    commit=True
                 )
                 
                 # Verificar resultado
                 if execute_query("SELECT id FROM productos WHERE id = %s", (producto_id,), fetchone=True):
+                    invalidar_paginas_publicas()
+                    marcar_estadisticas_desactualizadas()
                     return {
                         'success': True,
                         'message': 'Producto actualizado exitosamente',
@@ -536,10 +467,13 @@ class AdministradorController:
                 nuevo_id = execute_query(
                     f"INSERT INTO productos ({', '.join(fields)}) VALUES ({placeholders})",
                     list(producto_data.values()),
+                    commit=True,
                     return_last_id=True
                 )
                 
                 if nuevo_id:
+                    invalidar_paginas_publicas()
+                    ajustar_estadistica('total_productos', 1)
                     return {
                         'success': True,
                         'message': 'Producto creado exitosamente',
@@ -608,11 +542,13 @@ class AdministradorController:
                 # Ejecutar actualización
                 execute_query(
                     f"UPDATE categorias SET {', '.join(update_fields)} WHERE id = %s",
-                    update_values
+                    update_values,
+                    commit=True
                 )
                 
                 # Verificar resultado
                 if execute_query("SELECT id FROM categorias WHERE id = %s", (categoria_id,), fetchone=True):
+                    invalidar_paginas_publicas()
                     return {
                         'success': True,
                         'message': 'Categoría actualizada exitosamente',
@@ -632,10 +568,13 @@ class AdministradorController:
                 nuevo_id = execute_query(
                     f"INSERT INTO categorias ({', '.join(fields)}) VALUES ({placeholders})",
                     list(categoria_data.values()),
+                    commit=True,
                     return_last_id=True
                 )
                 
                 if nuevo_id:
+                    invalidar_paginas_publicas()
+                    ajustar_estadistica('total_categorias', 1)
                     return {
                         'success': True,
                         'message': 'Categoría creada exitosamente',
@@ -667,19 +606,6 @@ class AdministradorController:
             dict: Resultado de la operación
         """
         try:
-            # Validar que el pedido existe
-            pedido = execute_query(
-                "SELECT id, estado FROM pedidos WHERE id = %s",
-                (pedido_id,),
-                fetchone=True
-            )
-            
-            if not pedido:
-                return {
-                    'success': False,
-                    'message': 'El pedido no existe'
-                }
-            
             # Validar que el estado es válido
             estados_validos = ['pendiente', 'procesando', 'enviado', 'entregado', 'cancelado']
             if nuevo_estado not in estados_validos:
@@ -710,11 +636,32 @@ class AdministradorController:
             # Añadir ID al final de los parámetros
             update_values.append(pedido_id)
             
-            # Ejecutar actualización
-            execute_query(
-                f"UPDATE pedidos SET {', '.join(update_fields)} WHERE id = %s",
-                update_values
-            )
+            # El pedido se bloquea para mover su venta entre estados en el
+            # resumen diario junto con la actualización
+            with transaction() as tx:
+                pedido = execute_query(PEDIDO_RESUMEN_SQL, (pedido_id,), fetchone=True)
+                if pedido:
+                    execute_query(
+                        f"UPDATE pedidos SET {', '.join(update_fields)} WHERE id = %s",
+                        update_values,
+                        commit=True
+                    )
+                    mover_venta(pedido, nuevo_estado)
+            
+            if not pedido:
+                return {
+                    'success': False,
+                    'message': 'El pedido no existe'
+                }
+            
+            if not tx.committed:
+                return {
+                    'success': False,
+                    'message': 'Error al actualizar el estado del pedido'
+                }
+            
+            invalidar_resumen_usuario(pedido['usuario_id'])
+            marcar_estadisticas_desactualizadas()
             
             return {
                 'success': True,
@@ -987,6 +934,7 @@ class AdministradorController:
                     f"UPDATE informacion_tienda SET {', '.join(update_fields)} WHERE id = %s",
                     update_values
                 )
+                invalidar_informacion_tienda()
                 
                 return {
                     'success': True,
@@ -1003,6 +951,7 @@ class AdministradorController:
                     list(tienda_data.values()),
                     return_last_id=True
                 )
+                invalidar_informacion_tienda()
                 
                 if nuevo_id:
                     return {
@@ -3,38 +3,41 @@ import sys
 import json
 from datetime import datetime
 from backend.configuracion.config import Config
-from backend.DB.db_manager import execute_query, check_database_exists, create_database
+from backend.DB.db_manager import execute_query, execute_many, transaction
+from backend.DB.cache import get_informacion_tienda, invalidar_resumen_usuario
+from backend.DB.estadisticas import ajustar_estadistica
+from backend.DB.ventas import registrar_venta
+
+class CheckoutError(Exception):
+    """Error de validación del checkout; revierte la transacción del pedido"""
+    pass
 
 class CarroController:
     """Controlador para la página de carrito de compras de Talabartería Rodríguez"""
     
-    def __init__(self):
-        self._ensure_db_exists()
+    # Consultas frecuentes; revision_indices revisa su plan con EXPLAIN
+    CARRITO_USUARIO_SQL = """
+        SELECT ic.*, p.nombre, p.precio, p.precio_descuento, c.nombre as categoria_nombre,
+                p.imagen_principal_url as imagen
+        FROM items_carrito ic
+        JOIN productos p ON ic.producto_id = p.id
+        LEFT JOIN categorias c ON p.categoria_id = c.id
+        WHERE ic.usuario_id = %s
+    """
+    ITEM_CARRITO_SQL = "SELECT * FROM items_carrito WHERE usuario_id = %s AND producto_id = %s"
     
-    def _ensure_db_exists(self):
-        """Asegura que la base de datos existe y tiene la estructura necesaria"""
-        # Verificar si la base de datos existe
-        if not check_database_exists():
-            print("La base de datos no existe o está incompleta. Creando...")
-            if create_database():
-                print("Base de datos creada exitosamente")
-            else:
-                print("Error al crear la base de datos")
+    def __init__(self):
+        pass
     
     def get_carro_data(self, usuario_id=None):
         """Obtiene los datos para mostrar en la página del carrito"""
         # Obtener información de la tienda
-        tienda_info = execute_query(
-            "SELECT * FROM informacion_tienda LIMIT 1", 
-            fetchone=True
-        ) or {}
+        tienda_info = get_informacion_tienda() or {}
         
         # Productos relacionados/recomendados (destacados aleatorios)
         productos_relacionados = execute_query("""
             SELECT p.*, c.nombre as categoria_nombre, 
-                    (SELECT url_imagen FROM imagenes_productos 
-                    WHERE producto_id = p.id AND es_principal = 1 
-                    LIMIT 1) as imagen_principal
+                    p.imagen_principal_url as imagen_principal
             FROM productos p
             LEFT JOIN categorias c ON p.categoria_id = c.id
             WHERE p.destacado = 1 AND p.activo = 1
@@ -71,14 +74,7 @@ class CarroController:
             """, (usuario_id,)) or []
             
             # Obtener items del carrito del usuario desde la base de datos
-            items_carrito = execute_query("""
-                SELECT ic.*, p.nombre, p.precio, p.precio_descuento, c.nombre as categoria_nombre,
-                        (SELECT url_imagen FROM imagenes_productos WHERE producto_id = p.id AND es_principal = 1 LIMIT 1) as imagen
-                FROM items_carrito ic
-                JOIN productos p ON ic.producto_id = p.id
-                LEFT JOIN categorias c ON p.categoria_id = c.id
-                WHERE ic.usuario_id = %s
-            """, (usuario_id,)) or []
+            items_carrito = execute_query(self.CARRITO_USUARIO_SQL, (usuario_id,)) or []
             
             # Formatear datos de items del carrito para la interfaz
             items_formateados = []
@@ -122,14 +118,7 @@ class CarroController:
         if not usuario_id:
             return []
         
-        items_carrito = execute_query("""
-            SELECT ic.*, p.nombre, p.precio, p.precio_descuento, c.nombre as categoria_nombre,
-                    (SELECT url_imagen FROM imagenes_productos WHERE producto_id = p.id AND es_principal = 1 LIMIT 1) as imagen
-            FROM items_carrito ic
-            JOIN productos p ON ic.producto_id = p.id
-            LEFT JOIN categorias c ON p.categoria_id = c.id
-            WHERE ic.usuario_id = %s
-        """, (usuario_id,)) or []
+        items_carrito = execute_query(self.CARRITO_USUARIO_SQL, (usuario_id,)) or []
         
         # Formatear datos para enviar al cliente
         items_formateados = []
@@ -168,7 +157,7 @@ class CarroController:
             
             # Verificar si ya existe en el carrito
             item_existente = execute_query(
-                "SELECT * FROM items_carrito WHERE usuario_id = %s AND producto_id = %s", 
+                self.ITEM_CARRITO_SQL, 
                 (usuario_id, producto_id), 
                 fetchone=True
             )
@@ -193,6 +182,79 @@ class CarroController:
             print(f"Error al guardar item en carrito: {str(e)}")
             return {'success': False, 'message': 'Error al guardar en el carrito'}
     
+    def sincronizar_carrito(self, usuario_id, items):
+        """Sincroniza de una vez el carrito de localStorage con el del usuario
+        
+        Se usa al iniciar sesión. En lugar de llamar a guardar_item_carrito por
+        cada item (3 consultas por item) hace una validación de productos con
+        IN (...), un INSERT ... ON DUPLICATE KEY UPDATE múltiple y una lectura
+        final del carrito.
+        
+        Args:
+            usuario_id (int): ID del usuario autenticado
+            items (list): Items del carrito local ({'id', 'cantidad'})
+            
+        Returns:
+            dict: Resultado, carrito actualizado e IDs de productos omitidos
+        """
+        if not usuario_id:
+            return {'success': False, 'message': 'Datos incompletos'}
+        
+        # Agrupar cantidades por producto
+        cantidades = {}
+        omitidos = []
+        for item in items or []:
+            try:
+                producto_id = int(item.get('id'))
+                cantidad = int(item.get('cantidad', 1))
+            except (AttributeError, TypeError, ValueError):
+                continue
+            if cantidad > 0:
+                cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+        
+        try:
+            if cantidades:
+                # Validar todos los productos en una sola consulta
+                ids = list(cantidades)
+                placeholders = ', '.join(['%s'] * len(ids))
+                productos = execute_query(
+                    f"SELECT id, cantidad_stock FROM productos WHERE id IN ({placeholders}) AND activo = 1",
+                    ids
+                ) or []
+                stock = {p['id']: p['cantidad_stock'] for p in productos}
+                
+                filas = []
+                for producto_id, cantidad in cantidades.items():
+                    # Mismas reglas que guardar_item_carrito: producto activo y stock suficiente
+                    if producto_id not in stock or stock[producto_id] < cantidad:
+                        omitidos.append(producto_id)
+                        continue
+                    filas.append((usuario_id, producto_id, cantidad))
+                
+                # Insertar o sumar cantidades en un solo INSERT múltiple
+                if filas:
+                    resultado = execute_many(
+                        """
+                        INSERT INTO items_carrito (usuario_id, producto_id, cantidad)
+                        VALUES (%s, %s, %s)
+                        ON DUPLICATE KEY UPDATE cantidad = cantidad + VALUES(cantidad), fecha_agregado = NOW()
+                        """,
+                        filas
+                    )
+                    if not resultado.get('success'):
+                        return {'success': False, 'message': 'Error al sincronizar el carrito'}
+            
+            return {
+                'success': True,
+                'message': 'Carrito sincronizado correctamente',
+                'carrito': self.get_items_carrito(usuario_id),
+                'omitidos': [str(producto_id) for producto_id in omitidos]
+            }
+            
+        except Exception as e:
+            print(f"Error al sincronizar carrito: {str(e)}")
+            return {'success': False, 'message': 'Error al sincronizar el carrito'}
+    
     def actualizar_item_carrito(self, usuario_id, producto_id, cantidad):
         """Actualiza la cantidad de un item en el carrito"""
         if not usuario_id or not producto_id:
@@ -264,32 +326,39 @@ class CarroController:
             return {'success': False, 'message': 'Datos incompletos'}
         
         try:
-            # Si es dirección principal, quitar marca de principal de otras direcciones
-            if datos_direccion.get('es_principal'):
-                execute_query(
-                    "UPDATE direcciones_envio SET es_principal = 0 WHERE usuario_id = %s", 
-                    (usuario_id,)
+            # Quitar la marca de principal e insertar la dirección en una sola transacción
+            with transaction() as tx:
+                # Si es dirección principal, quitar marca de principal de otras direcciones
+                if datos_direccion.get('es_principal'):
+                    execute_query(
+                        "UPDATE direcciones_envio SET es_principal = 0 WHERE usuario_id = %s", 
+                        (usuario_id,),
+                        commit=True
+                    )
+                
+                # Insertar nueva dirección
+                id_direccion = execute_query(
+                    """
+                    INSERT INTO direcciones_envio 
+                    (usuario_id, direccion_linea1, direccion_linea2, ciudad, estado, codigo_postal, pais, es_principal) 
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    """, 
+                    (
+                        usuario_id, 
+                        datos_direccion['direccion_linea1'], 
+                        datos_direccion.get('direccion_linea2', ''), 
+                        datos_direccion['ciudad'], 
+                        datos_direccion['estado'], 
+                        datos_direccion['codigo_postal'], 
+                        datos_direccion.get('pais', 'México'), 
+                        1 if datos_direccion.get('es_principal') else 0
+                    ),
+                    commit=True,
+                    return_last_id=True
                 )
             
-            # Insertar nueva dirección
-            id_direccion = execute_query(
-                """
-                INSERT INTO direcciones_envio 
-                (usuario_id, direccion_linea1, direccion_linea2, ciudad, estado, codigo_postal, pais, es_principal) 
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """, 
-                (
-                    usuario_id, 
-                    datos_direccion['direccion_linea1'], 
-                    datos_direccion.get('direccion_linea2', ''), 
-                    datos_direccion['ciudad'], 
-                    datos_direccion['estado'], 
-                    datos_direccion['codigo_postal'], 
-                    datos_direccion.get('pais', 'México'), 
-                    1 if datos_direccion.get('es_principal') else 0
-                ),
-                return_last_id=True
-            )
+            if not tx.committed:
+                return {'success': False, 'message': 'Error al guardar la dirección'}
             
             return {'success': True, 'message': 'Dirección guardada correctamente', 'id': id_direccion}
             
@@ -298,91 +367,172 @@ class CarroController:
             return {'success': False, 'message': 'Error al guardar la dirección'}
     
     def procesar_pedido(self, datos_pedido):
-        """Procesa un nuevo pedido con costos de envío dinámicos"""
+        """Procesa un nuevo pedido con costos de envío dinámicos
+        
+        Todo el checkout ocurre en una sola transacción: se bloquean las filas
+        de los productos (SELECT ... FOR UPDATE) para validar el stock, se
+        inserta el pedido y sus items en un solo INSERT múltiple, se descuenta
+        el stock y se suma a contador_ventas. Si algo falla no queda nada a
+        medias y dos compradores simultáneos no pueden vender de más.
+        """
         usuario_id = datos_pedido.get('usuario_id')
         direccion_id = datos_pedido.get('direccion_id')
         metodo_envio = datos_pedido.get('metodo_envio')
         items = datos_pedido.get('items', [])
         
-        # Si no hay usuario autenticado, permitir compra como invitado
-        if not direccion_id and not usuario_id:
-            # Guardar dirección temporal para usuarios no autenticados
-            direccion_nueva = datos_pedido.get('direccion_nueva')
-            if direccion_nueva:
-                direccion_id = execute_query(
+        # Agrupar cantidades por producto (el mismo producto puede venir repetido)
+        cantidades = {}
+        try:
+            for item in items:
+                cantidad = int(item['cantidad'])
+                if cantidad > 0:
+                    producto_id = int(item['id'])
+                    cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+        except (KeyError, TypeError, ValueError):
+            return {'success': False, 'message': 'Datos de productos inválidos'}
+        
+        if not cantidades:
+            return {'success': False, 'message': 'El carrito está vacío'}
+        
+        try:
+            with transaction() as tx:
+                # Si no hay usuario autenticado, permitir compra como invitado
+                if not direccion_id and not usuario_id:
+                    # Guardar dirección temporal para usuarios no autenticados
+                    direccion_nueva = datos_pedido.get('direccion_nueva')
+                    if direccion_nueva:
+                        direccion_id = execute_query(
+                            """
+                            INSERT INTO direcciones_envio 
+                            (usuario_id, direccion_linea1, direccion_linea2, ciudad, estado, codigo_postal, pais) 
+                            VALUES (NULL, %s, %s, %s, %s, %s, %s)
+                            """, 
+                            (
+                                direccion_nueva['direccion_linea1'],
+                                direccion_nueva.get('direccion_linea2', ''),
+                                direccion_nueva['ciudad'],
+                                direccion_nueva['estado'],
+                                direccion_nueva['codigo_postal'],
+                                direccion_nueva.get('pais', 'México')
+                            ),
+                            commit=True,
+                            return_last_id=True
+                        )
+                
+                # Bloquear los productos en orden de id (evita interbloqueos entre compras)
+                ids = sorted(cantidades)
+                placeholders = ', '.join(['%s'] * len(ids))
+                productos = execute_query(
+                    f"""
+                    SELECT id, nombre, precio, precio_descuento, cantidad_stock, activo
+                    FROM productos
+                    WHERE id IN ({placeholders})
+                    ORDER BY id
+                    FOR UPDATE
+                    """,
+                    ids
+                )
+                if productos is None:
+                    raise CheckoutError('Error al procesar el pedido')
+                
+                por_id = {p['id']: p for p in productos}
+                sin_stock = []
+                for producto_id in ids:
+                    producto = por_id.get(producto_id)
+                    if not producto or not producto['activo']:
+                        raise CheckoutError('Uno de los productos ya no está disponible')
+                    if producto['cantidad_stock'] < cantidades[producto_id]:
+                        sin_stock.append(producto['nombre'])
+                if sin_stock:
+                    raise CheckoutError(f"Stock insuficiente para: {', '.join(sin_stock)}")
+                
+                # Precios tomados de la base de datos (la fila bloqueada), no del cliente
+                lineas = []
+                for producto_id in ids:
+                    producto = por_id[producto_id]
+                    precio = float(producto['precio_descuento'] or producto['precio'])
+                    lineas.append((producto_id, cantidades[producto_id], precio, precio * cantidades[producto_id]))
+                
+                # Calcular montos
+                subtotal = sum(linea[3] for linea in lineas)
+                impuestos = subtotal * 0.16
+                
+                # Calcular costo de envío dinámico
+                costo_envio = self._calcular_costo_envio(subtotal, metodo_envio)
+                
+                # Aplicar cupón si existe
+                cupon = datos_pedido.get('cupon')
+                if cupon and cupon['tipo'] == 'envio_gratis':
+                    costo_envio = 0
+                
+                # Calcular total
+                monto_total = subtotal + impuestos + costo_envio
+                
+                # Insertar el pedido (usuario_id puede ser NULL para invitados)
+                pedido_id = execute_query(
                     """
-                    INSERT INTO direcciones_envio 
-                    (usuario_id, direccion_linea1, direccion_linea2, ciudad, estado, codigo_postal, pais) 
-                    VALUES (NULL, %s, %s, %s, %s, %s, %s)
+                    INSERT INTO pedidos 
+                    (usuario_id, estado, monto_total, direccion_envio_id, metodo_envio, costo_envio, metodo_pago, estado_pago, notas) 
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                     """, 
                     (
-                        direccion_nueva['direccion_linea1'],
-                        direccion_nueva.get('direccion_linea2', ''),
-                        direccion_nueva['ciudad'],
-                        direccion_nueva['estado'],
-                        direccion_nueva['codigo_postal'],
-                        direccion_nueva.get('pais', 'México')
+                        usuario_id or None,  # NULL si no hay usuario
+                        'pendiente', 
+                        monto_total, 
+                        direccion_id, 
+                        metodo_envio, 
+                        costo_envio,
+                        'tarjeta', 
+                        'pendiente',
+                        f'Costo de envío: ${costo_envio:.2f}'
                     ),
+                    commit=True,
                     return_last_id=True
                 )
-        
-        try:
-            # Calcular montos
-            subtotal = sum(float(item['precio']) * int(item['cantidad']) for item in items)
-            impuestos = subtotal * 0.16
-            
-            # Calcular costo de envío dinámico
-            costo_envio = self._calcular_costo_envio(subtotal, metodo_envio)
-            
-            # Aplicar cupón si existe
-            cupon = datos_pedido.get('cupon')
-            if cupon and cupon['tipo'] == 'envio_gratis':
-                costo_envio = 0
-            
-            # Calcular total
-            monto_total = subtotal + impuestos + costo_envio
-            
-            # Insertar el pedido (usuario_id puede ser NULL para invitados)
-            pedido_id = execute_query(
-                """
-                INSERT INTO pedidos 
-                (usuario_id, estado, monto_total, direccion_envio_id, metodo_envio, costo_envio, metodo_pago, estado_pago, notas) 
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, 
-                (
-                    usuario_id or None,  # NULL si no hay usuario
-                    'pendiente', 
-                    monto_total, 
-                    direccion_id, 
-                    metodo_envio, 
-                    costo_envio,
-                    'tarjeta', 
-                    'pendiente',
-                    f'Costo de envío: ${costo_envio:.2f}'
-                ),
-                return_last_id=True
-            )
-            
-            # Insertar items del pedido
-            for item in items:
-                execute_query(
+                if not isinstance(pedido_id, int):
+                    raise CheckoutError('Error al procesar el pedido')
+                
+                # Insertar todos los items del pedido en un solo INSERT múltiple
+                execute_many(
                     """
                     INSERT INTO items_pedido 
                     (pedido_id, producto_id, cantidad, precio_unitario, precio_total) 
                     VALUES (%s, %s, %s, %s, %s)
                     """, 
-                    (
-                        pedido_id, 
-                        item['id'], 
-                        item['cantidad'], 
-                        item['precio'], 
-                        float(item['precio']) * int(item['cantidad'])
-                    )
+                    [(pedido_id,) + linea for linea in lineas]
+                )
+                
+                # Resumen diario de ventas (misma transacción que el pedido)
+                registrar_venta('pendiente', monto_total, sum(cantidades.values()))
+                
+                # Descontar stock y sumar ventas de todos los productos en una sentencia
+                casos = ' '.join(['WHEN %s THEN %s'] * len(ids))
+                params_casos = [valor for producto_id in ids for valor in (producto_id, cantidades[producto_id])]
+                execute_query(
+                    f"""
+                    UPDATE productos
+                    SET cantidad_stock = cantidad_stock - (CASE id {casos} END),
+                        contador_ventas = contador_ventas + (CASE id {casos} END)
+                    WHERE id IN ({placeholders})
+                    """,
+                    params_casos + params_casos + ids,
+                    commit=True
                 )
+                
+                # Si hay usuario autenticado, vaciar su carrito
+                if usuario_id:
+                    execute_query("DELETE FROM items_carrito WHERE usuario_id = %s", (usuario_id,), commit=True)
+            
+            if not tx.committed:
+                return {'success': False, 'message': 'Error al procesar el pedido'}
+            
+            invalidar_resumen_usuario(usuario_id)
             
-            # Si hay usuario autenticado, vaciar su carrito
-            if usuario_id:
-                execute_query("DELETE FROM items_carrito WHERE usuario_id = %s", (usuario_id,))
+            # Contadores del panel, fuera de la transacción (fila compartida)
+            ajustar_estadistica('total_pedidos', 1)
+            agotados = sum(1 for producto_id in ids if por_id[producto_id]['cantidad_stock'] == cantidades[producto_id])
+            if agotados:
+                ajustar_estadistica('productos_sin_stock', agotados)
             
             return {
                 'success': True, 
@@ -391,6 +541,8 @@ class CarroController:
                 'costo_envio': costo_envio
             }
             
+        except CheckoutError as e:
+            return {'success': False, 'message': str(e)}
         except Exception as e:
             print(f"Error al procesar pedido: {str(e)}")
             return {'success': False, 'message': 'Error al procesar el pedido'}
@@ -2,24 +2,31 @@ import os
 from datetime import datetime
 from werkzeug.utils import secure_filename
 from backend.DB.db_manager import execute_query
+from backend.DB.cache import get_informacion_tienda, invalidar_paginas_publicas
+from backend.DB.imagenes import procesar_en_segundo_plano, eliminar_en_segundo_plano, registrar_destino_imagen
+from backend.DB.estadisticas import ajustar_estadistica
 
 class CategoriasController:
     """Controlador para gestión de categorías en el dashboard admin"""
     
-    def __init__(self):
+    def __init__(self, upload_folder=None):
+        """Inicializa el controlador
+        
+        Args:
+            upload_folder (str, optional): Carpeta de uploads ya preparada por la
+                aplicación. Si no se indica, se usa la del proyecto y se crea aquí.
+        """
         self.allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
         # Configurar la ruta de uploads relativa al proyecto
         self.base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        self.upload_folder = os.path.join(self.base_dir, 'uploads')
         
-        # Crear carpeta de uploads si no existe
-        if not os.path.exists(self.upload_folder):
-            os.makedirs(self.upload_folder)
+        if upload_folder is None:
+            upload_folder = os.path.join(self.base_dir, 'uploads')
+            # Crear subcarpeta de categorías si no existe
+            os.makedirs(os.path.join(upload_folder, 'categories'), exist_ok=True)
         
-        # Crear subcarpeta de categorías si no existe
-        categories_folder = os.path.join(self.upload_folder, 'categories')
-        if not os.path.exists(categories_folder):
-            os.makedirs(categories_folder)
+        self.upload_folder = upload_folder
+        registrar_destino_imagen('categoria', self._registrar_variantes)
     
     def get_categorias_data(self):
         """Obtiene datos de categorías para el dashboard
@@ -28,10 +35,7 @@ class CategoriasController:
             dict: Datos para la vista de categorías
         """
         # Obtener información de la tienda
-        tienda_info = execute_query(
-            "SELECT * FROM informacion_tienda LIMIT 1", 
-            fetchone=True
-        ) or {}
+        tienda_info = get_informacion_tienda() or {}
         
         # Obtener todas las categorías con sus relaciones
         categorias = execute_query(
@@ -171,6 +175,12 @@ class CategoriasController:
             if not result:
                 return {'success': False, 'message': 'Error al crear la categoría'}
             
+            if url_imagen:
+                self._generar_variantes(url_imagen)
+            
+            invalidar_paginas_publicas()
+            ajustar_estadistica('total_categorias', 1)
+            
             return {'success': True, 'message': 'Categoría creada exitosamente'}
             
         except Exception as e:
@@ -205,11 +215,13 @@ class CategoriasController:
             
             # Procesar nueva imagen si se proporciona
             url_imagen = exists.get('url_imagen')
+            nueva_imagen = False
             if file and self._allowed_file(file.filename):
                 # Eliminar imagen anterior si existe
                 if url_imagen:
                     self._eliminar_archivo_imagen(url_imagen)
                 url_imagen = self._procesar_imagen(file)
+                nueva_imagen = True
             
             # Preparar datos para actualizar
             update_data = {
@@ -231,6 +243,11 @@ class CategoriasController:
                 commit=True
             )
             
+            if nueva_imagen:
+                self._generar_variantes(url_imagen)
+            
+            invalidar_paginas_publicas()
+            
             return {'success': True, 'message': 'Categoría actualizada exitosamente'}
             
         except Exception as e:
@@ -288,6 +305,9 @@ class CategoriasController:
                 commit=True
             )
             
+            invalidar_paginas_publicas()
+            ajustar_estadistica('total_categorias', -1)
+            
             return {'success': True, 'message': 'Categoría eliminada exitosamente'}
             
         except Exception as e:
@@ -311,6 +331,8 @@ class CategoriasController:
                 commit=True
             )
             
+            invalidar_paginas_publicas()
+            
             return {'success': True, 'message': 'Estado actualizado correctamente'}
             
         except Exception as e:
@@ -341,20 +363,33 @@ class CategoriasController:
         # Retornar URL relativa
         return f"/uploads/categories/{new_filename}"
     
+    def _generar_variantes(self, url_original):
+        """Encola la generación de las variantes de la imagen de una categoría
+        
+        Al terminar, la categoría apunta a la variante 'detail'.
+        
+        Args:
+            url_original (str): URL del archivo subido
+        """
+        procesar_en_segundo_plano(self.upload_folder, url_original, 'categoria')
+    
+    def _registrar_variantes(self, url_original, url_nueva, variantes):
+        """Apunta la categoría a la variante 'detail' (trabajo de la cola)"""
+        execute_query(
+            "UPDATE categorias SET url_imagen = %s WHERE url_imagen = %s",
+            (url_nueva, url_original),
+            commit=True
+        )
+        if not execute_query("SELECT id FROM categorias WHERE url_imagen = %s", (url_nueva,), fetchone=True):
+            return False
+        invalidar_paginas_publicas()
+        return True
+    
     def _allowed_file(self, filename):
         """Verifica si el archivo tiene una extensión permitida"""
         return '.' in filename and \
                filename.rsplit('.', 1)[1].lower() in self.allowed_extensions
     
     def _eliminar_archivo_imagen(self, url_imagen):
-        """Elimina un archivo de imagen del servidor"""
-        if url_imagen:
-            # Convertir URL a ruta de archivo
-            file_path = url_imagen.replace('/uploads/', '')
-            full_path = os.path.join(self.upload_folder, file_path)
-            
-            if os.path.exists(full_path):
-                try:
-                    os.remove(full_path)
-                except Exception as e:
-                    print(f"Error eliminando archivo: {str(e)}")
\ No newline at end of file
+        """Encola el borrado de un archivo de imagen (con sus variantes)"""
+        eliminar_en_segundo_plano(self.upload_folder, url_imagen)
\ No newline at end of file
@@ -2,24 +2,30 @@ import os
 from datetime import datetime
 from werkzeug.utils import secure_filename
 from backend.DB.db_manager import execute_query
+from backend.DB.cache import get_informacion_tienda, invalidar_informacion_tienda
+from backend.DB.imagenes import procesar_en_segundo_plano, eliminar_en_segundo_plano, registrar_destino_imagen
 
 class ConfiguracionController:
     """Controlador para gestión de configuración de la tienda"""
     
-    def __init__(self):
+    def __init__(self, upload_folder=None):
+        """Inicializa el controlador
+        
+        Args:
+            upload_folder (str, optional): Carpeta de uploads ya preparada por la
+                aplicación. Si no se indica, se usa la del proyecto y se crea aquí.
+        """
         self.allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
         # Configurar la ruta de uploads relativa al proyecto
         self.base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        self.upload_folder = os.path.join(self.base_dir, 'uploads')
         
-        # Crear carpeta de uploads si no existe
-        if not os.path.exists(self.upload_folder):
-            os.makedirs(self.upload_folder)
+        if upload_folder is None:
+            upload_folder = os.path.join(self.base_dir, 'uploads')
+            # Crear subcarpeta de configuración si no existe
+            os.makedirs(os.path.join(upload_folder, 'config'), exist_ok=True)
         
-        # Crear subcarpeta de configuración si no existe
-        config_folder = os.path.join(self.upload_folder, 'config')
-        if not os.path.exists(config_folder):
-            os.makedirs(config_folder)
+        self.upload_folder = upload_folder
+        registrar_destino_imagen('configuracion', self._registrar_variantes)
     
     def get_configuracion_data(self):
         """Obtiene datos de configuración para el dashboard
@@ -28,10 +34,7 @@ class ConfiguracionController:
             dict: Datos para la vista de configuración
         """
         # Obtener información de la tienda
-        tienda_info = execute_query(
-            "SELECT * FROM informacion_tienda LIMIT 1", 
-            fetchone=True
-        )
+        tienda_info = get_informacion_tienda()
         
         # Si no existe, crear registro vacío
         if not tienda_info:
@@ -42,11 +45,9 @@ class ConfiguracionController:
                 ('Talabartería Rodríguez', 'Artesanía en cuero de calidad'),
                 commit=True
             )
+            invalidar_informacion_tienda()
             
-            tienda_info = execute_query(
-                "SELECT * FROM informacion_tienda LIMIT 1", 
-                fetchone=True
-            )
+            tienda_info = get_informacion_tienda()
         
         # Preparar datos para la vista
         data = {
@@ -136,11 +137,14 @@ class ConfiguracionController:
                     commit=True
                 )
             
-            # Obtener datos actualizados
-            updated_config = execute_query(
-                "SELECT * FROM informacion_tienda LIMIT 1",
-                fetchone=True
-            )
+            # Variantes WebP/JPEG de las imágenes nuevas, fuera de la petición
+            for columna in ('logo_url', 'banner_principal_url'):
+                if columna in update_data:
+                    self._generar_variantes(columna, update_data[columna])
+            
+            # Invalidar la caché en todos los workers y obtener datos actualizados
+            invalidar_informacion_tienda()
+            updated_config = get_informacion_tienda()
             
             return {
                 'success': True,
@@ -177,20 +181,36 @@ class ConfiguracionController:
         # Retornar URL relativa
         return f"/uploads/config/{new_filename}"
     
+    def _generar_variantes(self, columna, url_original):
+        """Encola la generación de las variantes del logo o del banner
+        
+        Al terminar, informacion_tienda apunta a la variante 'detail'.
+        
+        Args:
+            columna (str): 'logo_url' o 'banner_principal_url'
+            url_original (str): URL del archivo subido
+        """
+        procesar_en_segundo_plano(self.upload_folder, url_original, 'configuracion', columna=columna)
+    
+    def _registrar_variantes(self, url_original, url_nueva, variantes, columna):
+        """Apunta el logo o el banner a la variante 'detail' (trabajo de la cola)"""
+        if columna not in ('logo_url', 'banner_principal_url'):
+            raise ValueError(f"Columna de imagen no válida: {columna}")
+        execute_query(
+            f"UPDATE informacion_tienda SET {columna} = %s WHERE {columna} = %s",
+            (url_nueva, url_original),
+            commit=True
+        )
+        if not execute_query(f"SELECT id FROM informacion_tienda WHERE {columna} = %s", (url_nueva,), fetchone=True):
+            return False
+        invalidar_informacion_tienda()
+        return True
+    
     def _allowed_file(self, filename):
         """Verifica si el archivo tiene una extensión permitida"""
         return '.' in filename and \
                filename.rsplit('.', 1)[1].lower() in self.allowed_extensions
     
     def _eliminar_archivo_imagen(self, url_imagen):
-        """Elimina un archivo de imagen del servidor"""
-        if url_imagen:
-            # Convertir URL a ruta de archivo
-            file_path = url_imagen.replace('/uploads/', '')
-            full_path = os.path.join(self.upload_folder, file_path)
-            
-            if os.path.exists(full_path):
-                try:
-                    os.remove(full_path)
-                except Exception as e:
-                    print(f"Error eliminando archivo: {str(e)}")
\ No newline at end of file
+        """Encola el borrado de un archivo de imagen (con sus variantes)"""
+        eliminar_en_segundo_plano(self.upload_folder, url_imagen)
\ No newline at end of file
@@ -3,10 +3,61 @@ import sys
 from datetime import datetime, timedelta
 from backend.configuracion.config import Config
 from backend.DB.db_manager import execute_query
+from backend.DB.cache import get_informacion_tienda, resumen_usuarios_cache
 
 class DashboardHomeController:
     """Controlador para el dashboard home de Talabartería Rodríguez"""
     
+    # Pedidos recientes que se muestran (y se cachean) por usuario
+    PEDIDOS_RECIENTES = 5
+    # Período de actividad incluido en el resumen cacheado
+    DIAS_ACTIVIDAD = 30
+    # Notificaciones de pedidos enviados o entregados en los últimos días
+    NOTIFICACIONES = 3
+    DIAS_NOTIFICACIONES = 7
+    
+    # Consultas frecuentes; revision_indices revisa su plan con EXPLAIN
+    AGREGADOS_PEDIDOS_SQL = """
+        SELECT COUNT(*) as total_orders,
+               SUM(estado IN ('pendiente', 'procesando', 'enviado')) as pending_orders,
+               SUM(estado = 'entregado') as completed_orders,
+               SUM(CASE WHEN estado != 'cancelado' THEN monto_total END) as total_spent,
+               SUM(estado != 'cancelado' AND fecha_pedido >= DATE_SUB(NOW(), INTERVAL %s DAY)) as period_orders,
+               SUM(CASE WHEN estado != 'cancelado' AND fecha_pedido >= DATE_SUB(NOW(), INTERVAL %s DAY)
+                   THEN monto_total END) as period_spent,
+               MAX(CASE WHEN estado != 'cancelado' AND fecha_pedido >= DATE_SUB(NOW(), INTERVAL %s DAY)
+                   THEN fecha_pedido END) as last_order_date
+        FROM pedidos
+        WHERE usuario_id = %s
+    """
+    # Parámetros: días de notificación, usuario, pedidos recientes, límite
+    PEDIDOS_RECIENTES_SQL = """
+        SELECT r.id, r.fecha_pedido, r.estado, r.monto_total,
+               r.estado_pago, r.numero_seguimiento, r.fila, r.notificar,
+               (SELECT COUNT(*) FROM items_pedido ip WHERE ip.pedido_id = r.id) as total_items
+        FROM (
+            SELECT p.id, p.fecha_pedido, p.estado, p.monto_total,
+                   p.estado_pago, p.numero_seguimiento,
+                   ROW_NUMBER() OVER (ORDER BY p.fecha_pedido DESC, p.id DESC) as fila,
+                   (p.estado IN ('enviado', 'entregado')
+                    AND p.fecha_pedido >= DATE_SUB(NOW(), INTERVAL %s DAY)) as notificar
+            FROM pedidos p
+            WHERE p.usuario_id = %s
+        ) r
+        WHERE r.fila <= %s OR r.notificar
+        ORDER BY r.fila
+        LIMIT %s
+    """
+    # {excluir} es la condición opcional con los productos ya recomendados
+    PRODUCTOS_DESTACADOS_SQL = """
+        SELECT p.*, p.imagen_principal_url as imagen_principal
+        FROM productos p
+        WHERE p.activo = 1 AND p.cantidad_stock > 0
+        {excluir}
+        ORDER BY p.destacado DESC, p.contador_ventas DESC, p.nuevo DESC
+        LIMIT %s
+    """
+    
     def __init__(self):
         pass
     
@@ -20,12 +71,9 @@ class DashboardHomeController:
             dict: Datos para el dashboard
         """
         # Obtener información de la tienda
-        tienda_info = execute_query(
-            "SELECT * FROM informacion_tienda LIMIT 1", 
-            fetchone=True
-        ) or {}
+        tienda_info = get_informacion_tienda() or {}
         
-        # Obtener datos del usuario
+        # Obtener datos del usuario (incluye las unidades del carrito)
         user_data = self._get_user_data(user_id)
         
         # Obtener estadísticas del usuario
@@ -37,9 +85,6 @@ class DashboardHomeController:
         # Obtener productos recomendados
         recommended_products = self._get_recommended_products(user_id)
         
-        # Contar items en el carrito
-        cart_count = self._get_cart_count(user_id)
-        
         # Preparar datos para la vista
         data = {
             'app_name': tienda_info.get('nombre', 'Talabartería Rodríguez'),
@@ -48,26 +93,28 @@ class DashboardHomeController:
             'stats': stats,
             'recent_orders': recent_orders,
             'recommended_products': recommended_products,
-            'cart_count': cart_count
+            'cart_count': user_data.get('cart_count', 0)
         }
         
         return data
     
     def _get_user_data(self, user_id):
-        """Obtiene los datos del usuario
+        """Obtiene los datos del usuario y las unidades en su carrito
         
         Args:
             user_id (int): ID del usuario
             
         Returns:
-            dict: Datos del usuario
+            dict: Datos del usuario (incluye 'cart_count')
         """
         user = execute_query(
             """
             SELECT u.id, u.nombre, u.apellidos, u.correo as email, 
                    u.telefono, u.fecha_registro, u.ultimo_acceso,
                    CASE WHEN a.id IS NOT NULL THEN 1 ELSE 0 END as is_admin,
-                   a.rol as admin_role
+                   a.rol as admin_role,
+                   (SELECT COALESCE(SUM(ic.cantidad), 0)
+                    FROM items_carrito ic WHERE ic.usuario_id = u.id) as cart_count
             FROM usuarios u
             LEFT JOIN administradores a ON u.id = a.usuario_id
             WHERE u.id = %s
@@ -76,88 +123,109 @@ class DashboardHomeController:
             fetchone=True
         )
         
+        if user:
+            user['cart_count'] = int(user['cart_count'] or 0)
         return user or {}
     
-    def _get_user_stats(self, user_id):
-        """Obtiene estadísticas del usuario
+    def _get_agregados_pedidos(self, user_id, days):
+        """Cuenta y suma los pedidos del usuario en una sola consulta
         
         Args:
             user_id (int): ID del usuario
+            days (int): Días del período de actividad
             
         Returns:
-            dict: Estadísticas del usuario
+            dict: Estadísticas ('stats') y actividad del período ('activity'),
+            o None si falló la consulta
         """
-        stats = {}
-        
-        # Total de pedidos
-        total_orders = execute_query(
-            "SELECT COUNT(*) as total FROM pedidos WHERE usuario_id = %s",
-            (user_id,),
+        row = execute_query(
+            self.AGREGADOS_PEDIDOS_SQL,
+            (days, days, days, user_id),
             fetchone=True
         )
-        stats['total_orders'] = total_orders.get('total', 0) if total_orders else 0
+        if not row:
+            return None
+        
+        return {
+            'stats': {
+                'total_orders': int(row['total_orders'] or 0),
+                'pending_orders': int(row['pending_orders'] or 0),
+                'completed_orders': int(row['completed_orders'] or 0),
+                'total_spent': float(row['total_spent'] or 0)
+            },
+            'activity': {
+                'total_orders': int(row['period_orders'] or 0),
+                'total_spent': float(row['period_spent'] or 0),
+                'products_viewed': 0,
+                'last_order_date': row['last_order_date']
+            }
+        }
+    
+    def _get_resumen_pedidos(self, user_id):
+        """Resumen de pedidos del usuario, cacheado por usuario
         
-        # Pedidos pendientes
-        pending_orders = execute_query(
-            """
-            SELECT COUNT(*) as total FROM pedidos 
-            WHERE usuario_id = %s AND estado IN ('pendiente', 'procesando', 'enviado')
-            """,
-            (user_id,),
-            fetchone=True
-        )
-        stats['pending_orders'] = pending_orders.get('total', 0) if pending_orders else 0
+        Son las dos únicas consultas a pedidos del dashboard: los agregados
+        (estadísticas y actividad) y los pedidos recientes, que también
+        alimentan las notificaciones. La caché se descarta en este worker
+        cuando se crea o cambia un pedido del usuario (invalidar_resumen_usuario)
+        y expira tras CacheConfig.RESUMEN_USUARIO_TTL segundos en los demás.
         
-        # Pedidos completados
-        completed_orders = execute_query(
-            """
-            SELECT COUNT(*) as total FROM pedidos 
-            WHERE usuario_id = %s AND estado = 'entregado'
-            """,
-            (user_id,),
-            fetchone=True
-        )
-        stats['completed_orders'] = completed_orders.get('total', 0) if completed_orders else 0
+        Args:
+            user_id (int): ID del usuario
+            
+        Returns:
+            dict: 'stats', 'activity' y 'orders', o None si falló la consulta
+        """
+        resumen = resumen_usuarios_cache.get(user_id)
+        if resumen is not None:
+            return resumen
         
-        # Total gastado
-        total_spent = execute_query(
-            """
-            SELECT SUM(monto_total) as total FROM pedidos 
-            WHERE usuario_id = %s AND estado != 'cancelado'
-            """,
-            (user_id,),
-            fetchone=True
+        resumen = self._get_agregados_pedidos(user_id, self.DIAS_ACTIVIDAD)
+        if resumen is None:
+            return None
+        
+        # Los últimos PEDIDOS_RECIENTES más los enviados o entregados en los
+        # últimos días para las notificaciones (como máximo NOTIFICACIONES)
+        orders = execute_query(
+            self.PEDIDOS_RECIENTES_SQL,
+            (self.DIAS_NOTIFICACIONES, user_id, self.PEDIDOS_RECIENTES,
+             self.PEDIDOS_RECIENTES + self.NOTIFICACIONES)
         )
-        stats['total_spent'] = float(total_spent.get('total', 0)) if total_spent and total_spent.get('total') else 0
+        if orders is None:
+            return None
         
-        return stats
+        resumen['orders'] = orders
+        resumen_usuarios_cache.set(user_id, resumen)
+        return resumen
     
-    def _get_recent_orders(self, user_id, limit=5):
+    def _get_user_stats(self, user_id):
+        """Obtiene estadísticas del usuario
+        
+        Args:
+            user_id (int): ID del usuario
+            
+        Returns:
+            dict: Estadísticas del usuario
+        """
+        resumen = self._get_resumen_pedidos(user_id)
+        if not resumen:
+            return {'total_orders': 0, 'pending_orders': 0, 'completed_orders': 0, 'total_spent': 0}
+        return dict(resumen['stats'])
+    
+    def _get_recent_orders(self, user_id, limit=PEDIDOS_RECIENTES):
         """Obtiene los pedidos más recientes del usuario
         
         Args:
             user_id (int): ID del usuario
-            limit (int): Número máximo de pedidos a retornar
+            limit (int): Número máximo de pedidos a retornar (hasta PEDIDOS_RECIENTES)
             
         Returns:
             list: Lista de pedidos recientes
         """
-        orders = execute_query(
-            """
-            SELECT p.id, p.fecha_pedido, p.estado, p.monto_total,
-                   p.estado_pago, p.numero_seguimiento,
-                   COUNT(ip.id) as total_items
-            FROM pedidos p
-            LEFT JOIN items_pedido ip ON p.id = ip.pedido_id
-            WHERE p.usuario_id = %s
-            GROUP BY p.id
-            ORDER BY p.fecha_pedido DESC
-            LIMIT %s
-            """,
-            (user_id, limit)
-        )
-        
-        return orders or []
+        resumen = self._get_resumen_pedidos(user_id)
+        if not resumen:
+            return []
+        return [order for order in resumen['orders'] if order['fila'] <= limit]
     
     def _get_recommended_products(self, user_id, limit=4):
         """Obtiene productos recomendados para el usuario
@@ -172,9 +240,8 @@ class DashboardHomeController:
         # Primero, intentar obtener productos basados en compras anteriores
         recommended = execute_query(
             """
-            SELECT DISTINCT p.*, img.url_imagen as imagen_principal
+            SELECT DISTINCT p.*, p.imagen_principal_url as imagen_principal
             FROM productos p
-            LEFT JOIN imagenes_productos img ON p.id = img.producto_id AND img.es_principal = 1
             WHERE p.activo = 1 AND p.cantidad_stock > 0
             AND p.categoria_id IN (
                 SELECT DISTINCT p2.categoria_id
@@ -204,15 +271,7 @@ class DashboardHomeController:
             exclude_clause = f"AND p.id NOT IN ({','.join(map(str, exclude_ids))})" if exclude_ids else ""
             
             additional_products = execute_query(
-                f"""
-                SELECT p.*, img.url_imagen as imagen_principal
-                FROM productos p
-                LEFT JOIN imagenes_productos img ON p.id = img.producto_id AND img.es_principal = 1
-                WHERE p.activo = 1 AND p.cantidad_stock > 0
-                {exclude_clause}
-                ORDER BY p.destacado DESC, p.contador_ventas DESC, p.nuevo DESC
-                LIMIT %s
-                """,
+                self.PRODUCTOS_DESTACADOS_SQL.format(excluir=exclude_clause),
                 (additional_limit,)
             )
             
@@ -276,19 +335,11 @@ class DashboardHomeController:
         # En una implementación completa, esto vendría de una tabla de notificaciones
         notifications = []
         
-        # Verificar pedidos con cambios de estado recientes
-        recent_status_changes = execute_query(
-            """
-            SELECT id, estado, fecha_pedido
-            FROM pedidos
-            WHERE usuario_id = %s 
-            AND fecha_pedido >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-            AND estado IN ('enviado', 'entregado')
-            ORDER BY fecha_pedido DESC
-            LIMIT 3
-            """,
-            (user_id,)
-        )
+        # Verificar pedidos con cambios de estado recientes (del resumen cacheado)
+        resumen = self._get_resumen_pedidos(user_id)
+        recent_status_changes = [
+            order for order in (resumen['orders'] if resumen else []) if order['notificar']
+        ][:self.NOTIFICACIONES]
         
         if recent_status_changes:
             for order in recent_status_changes:
@@ -319,7 +370,7 @@ class DashboardHomeController:
         
         return notifications
     
-    def get_user_activity(self, user_id, days=30):
+    def get_user_activity(self, user_id, days=DIAS_ACTIVIDAD):
         """Obtiene la actividad reciente del usuario
         
         Args:
@@ -329,35 +380,19 @@ class DashboardHomeController:
         Returns:
             dict: Actividad del usuario
         """
-        activity = {
-            'total_orders': 0,
-            'total_spent': 0,
-            'products_viewed': 0,
-            'last_order_date': None
-        }
-        
-        # Obtener estadísticas de pedidos en el período
-        order_stats = execute_query(
-            """
-            SELECT 
-                COUNT(*) as total_orders,
-                SUM(monto_total) as total_spent,
-                MAX(fecha_pedido) as last_order_date
-            FROM pedidos
-            WHERE usuario_id = %s 
-            AND fecha_pedido >= DATE_SUB(NOW(), INTERVAL %s DAY)
-            AND estado != 'cancelado'
-            """,
-            (user_id, days),
-            fetchone=True
-        )
-        
-        if order_stats:
-            activity['total_orders'] = order_stats.get('total_orders', 0)
-            activity['total_spent'] = float(order_stats.get('total_spent', 0)) if order_stats.get('total_spent') else 0
-            activity['last_order_date'] = order_stats.get('last_order_date')
-        
-        return activity
+        if days == self.DIAS_ACTIVIDAD:
+            resumen = self._get_resumen_pedidos(user_id)
+        else:
+            resumen = self._get_agregados_pedidos(user_id, days)
+        
+        if not resumen:
+            return {
+                'total_orders': 0,
+                'total_spent': 0,
+                'products_viewed': 0,
+                'last_order_date': None
+            }
+        return dict(resumen['activity'])
     
     def get_special_offers(self, user_id):
         """Obtiene ofertas especiales para el usuario
@@ -371,9 +406,8 @@ class DashboardHomeController:
         # Obtener productos con descuento
         offers = execute_query(
             """
-            SELECT p.*, img.url_imagen as imagen_principal
+            SELECT p.*, p.imagen_principal_url as imagen_principal
             FROM productos p
-            LEFT JOIN imagenes_productos img ON p.id = img.producto_id AND img.es_principal = 1
             WHERE p.activo = 1 
             AND p.cantidad_stock > 0
             AND p.precio_descuento IS NOT NULL
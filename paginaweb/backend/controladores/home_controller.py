@@ -1,38 +1,24 @@
 import os
 import sys
 from backend.configuracion.config import Config
-from backend.DB.db_manager import execute_query, check_database_exists, create_database
+from backend.DB.db_manager import execute_query
+from backend.DB.cache import get_informacion_tienda
 
 class HomeController:
     """Controlador para la página de inicio de Talabartería Rodríguez"""
     
     def __init__(self):
-        self._ensure_db_exists()
-    
-    def _ensure_db_exists(self):
-        """Asegura que la base de datos existe y tiene la estructura necesaria"""
-        # Verificar si la base de datos existe
-        if not check_database_exists():
-            print("La base de datos no existe o está incompleta. Creando...")
-            if create_database():
-                print("Base de datos creada exitosamente")
-            else:
-                print("Error al crear la base de datos")
+        pass
     
     def get_home_data(self):
         """Obtiene los datos para mostrar en la página de inicio"""
         # Obtener información de la tienda
-        tienda_info = execute_query(
-            "SELECT * FROM informacion_tienda LIMIT 1", 
-            fetchone=True
-        ) or {}
+        tienda_info = get_informacion_tienda() or {}
         
         # Obtener productos destacados
         productos_destacados = execute_query("""
             SELECT p.*, c.nombre as categoria_nombre, 
-                   (SELECT url_imagen FROM imagenes_productos 
-                    WHERE producto_id = p.id AND es_principal = 1 
-                    LIMIT 1) as imagen_principal
+                   p.imagen_principal_url as imagen_principal
             FROM productos p
             LEFT JOIN categorias c ON p.categoria_id = c.id
             WHERE p.destacado = 1 AND p.activo = 1
@@ -42,9 +28,7 @@ class HomeController:
         # Obtener productos nuevos
         productos_nuevos = execute_query("""
             SELECT p.*, c.nombre as categoria_nombre, 
-                   (SELECT url_imagen FROM imagenes_productos 
-                    WHERE producto_id = p.id AND es_principal = 1 
-                    LIMIT 1) as imagen_principal
+                   p.imagen_principal_url as imagen_principal
             FROM productos p
             LEFT JOIN categorias c ON p.categoria_id = c.id
             WHERE p.nuevo = 1 AND p.activo = 1
@@ -85,9 +69,7 @@ class HomeController:
         resenas_recientes = execute_query("""
             SELECT r.*, p.nombre as producto_nombre, u.nombre as usuario_nombre, 
                    u.apellidos as usuario_apellidos,
-                   (SELECT url_imagen FROM imagenes_productos 
-                    WHERE producto_id = p.id AND es_principal = 1 
-                    LIMIT 1) as producto_imagen
+                   p.imagen_principal_url as producto_imagen
             FROM resenas r
             JOIN productos p ON r.producto_id = p.id
             JOIN usuarios u ON r.usuario_id = u.id
@@ -4,31 +4,29 @@ import hashlib
 import uuid
 import datetime
 from backend.configuracion.config import Config
-from backend.DB.db_manager import execute_query, check_database_exists, create_database
+from backend.DB.db_manager import execute_query
+from backend.DB.cache import get_informacion_tienda
+from backend.DB.correo import CorreoConfig, encolar_correo
+from backend.DB.estadisticas import ajustar_estadistica
 
 class LoginController:
     """Controlador para la autenticación de usuarios de Talabartería Rodríguez"""
     
-    def __init__(self):
-        self._ensure_db_exists()
+    # Consulta frecuente; revision_indices revisa su plan con EXPLAIN
+    TOKEN_RECUPERACION_SQL = """
+        SELECT t.id, t.usuario_id, t.usado, t.expira_en, u.activo
+        FROM tokens_recuperacion t
+        JOIN usuarios u ON t.usuario_id = u.id
+        WHERE t.token = %s
+    """
     
-    def _ensure_db_exists(self):
-        """Asegura que la base de datos existe y tiene la estructura necesaria"""
-        # Verificar si la base de datos existe
-        if not check_database_exists():
-            print("La base de datos no existe o está incompleta. Creando...")
-            if create_database():
-                print("Base de datos creada exitosamente")
-            else:
-                print("Error al crear la base de datos")
+    def __init__(self):
+        pass
     
     def get_login_data(self):
         """Obtiene los datos para mostrar en la página de login"""
         # Obtener información de la tienda
-        tienda_info = execute_query(
-            "SELECT * FROM informacion_tienda LIMIT 1", 
-            fetchone=True
-        ) or {}
+        tienda_info = get_informacion_tienda() or {}
         
         # Verificar si el login social está habilitado
         social_login_enabled = execute_query(
@@ -223,14 +221,16 @@ class LoginController:
                 VALUES (%s, %s, %s, %s, %s, 1, CURRENT_TIMESTAMP)
                 """,
                 (nombre, apellidos, email, password_hash, telefono),
+                commit=True,
                 return_last_id=True
             )
             
-            if not user_id:
+            if not isinstance(user_id, int) or not user_id:
                 return {
                     'success': False,
                     'message': 'Error al registrar el usuario, por favor intenta nuevamente'
                 }
+            ajustar_estadistica('total_usuarios', 1)
             
             return {
                 'success': True,
@@ -294,7 +294,8 @@ class LoginController:
             # Eliminar tokens antiguos para este usuario
             execute_query(
                 "DELETE FROM tokens_recuperacion WHERE usuario_id = %s", 
-                (user.get('id'),)
+                (user.get('id'),),
+                commit=True
             )
             
             # Insertar nuevo token
@@ -303,15 +304,30 @@ class LoginController:
                 INSERT INTO tokens_recuperacion (usuario_id, token, creado_en, expira_en, usado)
                 VALUES (%s, %s, CURRENT_TIMESTAMP, %s, 0)
                 """,
-                (user.get('id'), token, expira_en)
+                (user.get('id'), token, expira_en),
+                commit=True
             )
             
-            # Aquí se enviaría el correo electrónico con el enlace de recuperación
-            # Por simplicidad, no implementamos el envío real de correo en este ejemplo
-            # En producción, usa una biblioteca como smtplib o un servicio como SendGrid
-            
-            recuperacion_url = f"/reset-password?token={token}"
-            print(f"[ENVÍO DE CORREO] Link de recuperación: {recuperacion_url}")
+            # Enviar el enlace de recuperación (lo hace la cola de trabajos)
+            recuperacion_url = f"{CorreoConfig.URL_SITIO}/reset-password?token={token}"
+            encolar_correo(
+                user.get('correo'),
+                "Recupera tu contraseña de Talabartería Rodríguez",
+                f"""
+        Hola {user.get('nombre')},
+        
+        Recibimos una solicitud para restablecer la contraseña de tu cuenta. Para elegir una nueva, abre el siguiente enlace:
+        
+        {recuperacion_url}
+        
+        Este enlace expirará en 24 horas.
+        
+        Si no has solicitado este cambio, puedes ignorar este correo.
+        
+        Saludos,
+        El equipo de Talabartería Rodríguez
+        """
+            )
             
             return {
                 'success': True,
@@ -353,12 +369,7 @@ class LoginController:
         
         # Verificar token
         token_info = execute_query(
-            """
-            SELECT t.id, t.usuario_id, t.usado, t.expira_en, u.activo
-            FROM tokens_recuperacion t
-            JOIN usuarios u ON t.usuario_id = u.id
-            WHERE t.token = %s
-            """,
+            self.TOKEN_RECUPERACION_SQL,
             (token,),
             fetchone=True
         )
@@ -3,65 +3,98 @@ import json
 from datetime import datetime
 from werkzeug.utils import secure_filename
 from backend.DB.db_manager import execute_query
+from backend.DB.cache import get_informacion_tienda, invalidar_paginas_publicas
+from backend.DB.busqueda import sincronizar_producto
+from backend.DB.relacionados import recalcular_relacionados
+from backend.DB.imagenes import procesar_en_segundo_plano, eliminar_en_segundo_plano, registrar_destino_imagen
+from backend.DB.paginacion import consultar_pagina, consultar_pagina_cursor
+from backend.DB.estadisticas import ajustar_estadistica, marcar_estadisticas_desactualizadas
 
 class ProductosController:
     """Controlador para gestión de productos en el dashboard admin"""
     
-    def __init__(self):
+    # Consultas frecuentes; revision_indices revisa su plan con EXPLAIN
+    IMAGEN_PRINCIPAL_SQL = "SELECT id FROM imagenes_productos WHERE producto_id = %s AND es_principal = 1"
+    
+    def __init__(self, upload_folder=None):
+        """Inicializa el controlador
+        
+        Args:
+            upload_folder (str, optional): Carpeta de uploads ya preparada por la
+                aplicación. Si no se indica, se usa la del proyecto y se crea aquí.
+        """
         self.allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
         # Configurar la ruta de uploads relativa al proyecto
         self.base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        self.upload_folder = os.path.join(self.base_dir, 'uploads')
         
-        # Crear carpeta de uploads si no existe
-        if not os.path.exists(self.upload_folder):
-            os.makedirs(self.upload_folder)
+        if upload_folder is None:
+            upload_folder = os.path.join(self.base_dir, 'uploads')
+            # Crear subcarpeta de productos si no existe
+            os.makedirs(os.path.join(upload_folder, 'products'), exist_ok=True)
         
-        # Crear subcarpeta de productos si no existe
-        products_folder = os.path.join(self.upload_folder, 'products')
-        if not os.path.exists(products_folder):
-            os.makedirs(products_folder)
+        self.upload_folder = upload_folder
+        registrar_destino_imagen('producto', self._registrar_variantes)
     
-    def get_productos_data(self, page=1, per_page=10):
+    def get_productos_data(self, page=1, per_page=10, cursor=None):
         """Obtiene datos de productos para el dashboard
         
         Args:
-            page (int): Página actual
+            page (int): Página actual (saltar a una página)
             per_page (int): Productos por página
+            cursor (str, optional): Cursor de la página anterior. Si se indica
+                (cadena vacía para la primera página) se pagina por cursor y
+                se ignora `page`.
             
         Returns:
             dict: Datos para la vista de productos
+            
+        Raises:
+            ValueError: Si el cursor no es válido
         """
         # Offset para paginación
         offset = (page - 1) * per_page
         
         # Obtener información de la tienda
-        tienda_info = execute_query(
-            "SELECT * FROM informacion_tienda LIMIT 1", 
-            fetchone=True
-        ) or {}
+        tienda_info = get_informacion_tienda() or {}
         
         # Obtener categorías para filtros
         categorias = execute_query(
             "SELECT id, nombre FROM categorias WHERE activo = 1 ORDER BY nombre"
         ) or []
         
-        # Contar total de productos
-        total_count = execute_query(
-            "SELECT COUNT(*) as total FROM productos",
-            fetchone=True
-        )
-        total_productos = total_count.get('total', 0) if total_count else 0
-        
-        # Calcular páginas totales
-        total_pages = (total_productos + per_page - 1) // per_page
+        if cursor is not None:
+            # Modo cursor: continuar después del último producto visto, sin OFFSET
+            resultado = consultar_pagina_cursor(
+                """
+                SELECT p.*, c.nombre as categoria_nombre, p.categoria_id,
+                       p.imagen_principal_url as imagen_principal,
+                       CASE 
+                           WHEN p.precio_descuento IS NOT NULL THEN 
+                               ROUND(((p.precio - p.precio_descuento) / p.precio) * 100)
+                           ELSE 0 
+                       END as porcentaje_descuento
+                FROM productos p
+                LEFT JOIN categorias c ON p.categoria_id = c.id
+                """,
+                [], [],
+                orden=[('p.id', 'id')],
+                limit=per_page,
+                cursor=cursor
+            )
+            return {
+                'app_name': tienda_info.get('nombre', 'Talabartería Rodríguez'),
+                'productos': resultado['filas'],
+                'categorias': categorias,
+                'per_page': per_page,
+                'siguiente_cursor': resultado['siguiente_cursor'],
+                'hay_mas': resultado['hay_mas']
+            }
         
-        # Obtener productos con paginación
-        productos = execute_query(
+        # Obtener productos con paginación y el total en la misma consulta
+        productos, total_productos = consultar_pagina(
             """
             SELECT p.*, c.nombre as categoria_nombre, p.categoria_id,
-                   (SELECT url_imagen FROM imagenes_productos 
-                    WHERE producto_id = p.id AND es_principal = 1 LIMIT 1) as imagen_principal,
+                   p.imagen_principal_url as imagen_principal,
                    CASE 
                        WHEN p.precio_descuento IS NOT NULL THEN 
                            ROUND(((p.precio - p.precio_descuento) / p.precio) * 100)
@@ -70,10 +103,13 @@ class ProductosController:
             FROM productos p
             LEFT JOIN categorias c ON p.categoria_id = c.id
             ORDER BY p.id DESC
-            LIMIT %s OFFSET %s
             """,
-            (per_page, offset)
-        ) or []
+            limit=per_page,
+            offset=offset
+        )
+        
+        # Calcular páginas totales
+        total_pages = (total_productos + per_page - 1) // per_page
         
         # Preparar datos para la vista
         data = {
@@ -262,6 +298,11 @@ class ProductosController:
             if files:
                 self._procesar_imagenes(producto_id, files)
             
+            sincronizar_producto(producto_id)
+            recalcular_relacionados(producto_id)
+            invalidar_paginas_publicas()
+            ajustar_estadistica('total_productos', 1)
+            
             return {
                 'success': True, 
                 'message': 'Producto creado exitosamente',
@@ -335,6 +376,11 @@ class ProductosController:
             if files:
                 self._procesar_imagenes(producto_id, files)
             
+            sincronizar_producto(producto_id)
+            recalcular_relacionados(producto_id)
+            invalidar_paginas_publicas()
+            marcar_estadisticas_desactualizadas()
+            
             return {'success': True, 'message': 'Producto actualizado exitosamente'}
             
         except Exception as e:
@@ -353,7 +399,7 @@ class ProductosController:
         try:
             # Verificar si el producto existe
             producto = execute_query(
-                "SELECT id FROM productos WHERE id = %s",
+                "SELECT id, activo, cantidad_stock FROM productos WHERE id = %s",
                 (producto_id,),
                 fetchone=True
             )
@@ -361,6 +407,9 @@ class ProductosController:
             if not producto:
                 return {'success': False, 'message': 'Producto no encontrado'}
             
+            # productos_sin_stock solo cuenta productos activos sin stock
+            sin_stock = 1 if producto['activo'] and producto['cantidad_stock'] == 0 else 0
+            
             # Verificar si el producto tiene pedidos asociados
             pedidos = execute_query(
                 "SELECT COUNT(*) as total FROM items_pedido WHERE producto_id = %s",
@@ -375,6 +424,13 @@ class ProductosController:
                     (producto_id,),
                     commit=True
                 )
+                sincronizar_producto(producto_id)
+                recalcular_relacionados(producto_id)
+                invalidar_paginas_publicas()
+                if sin_stock:
+                    ajustar_estadistica('productos_sin_stock', -1)
+                else:
+                    marcar_estadisticas_desactualizadas()
                 return {'success': True, 'message': 'Producto desactivado (tiene pedidos asociados)'}
             
             # Obtener imágenes para eliminar archivos
@@ -389,12 +445,20 @@ class ProductosController:
                     self._eliminar_archivo_imagen(imagen.get('url_imagen'))
             
             # Eliminar el producto (cascade eliminará las imágenes y relaciones)
-            execute_query(
+            borrado = execute_query(
                 "DELETE FROM productos WHERE id = %s",
                 (producto_id,),
                 commit=True
             )
             
+            sincronizar_producto(producto_id)
+            recalcular_relacionados(producto_id)
+            invalidar_paginas_publicas()
+            if borrado and borrado.get('rowcount'):
+                ajustar_estadistica('total_productos', -1)
+                if sin_stock:
+                    ajustar_estadistica('productos_sin_stock', -1)
+            
             return {'success': True, 'message': 'Producto eliminado exitosamente'}
             
         except Exception as e:
@@ -412,12 +476,30 @@ class ProductosController:
             dict: Resultado de la operación
         """
         try:
+            producto = execute_query(
+                "SELECT activo, cantidad_stock FROM productos WHERE id = %s",
+                (producto_id,),
+                fetchone=True
+            )
+            if not producto:
+                return {'success': False, 'message': 'Producto no encontrado'}
+            
             execute_query(
                 "UPDATE productos SET activo = %s WHERE id = %s",
                 (activo, producto_id),
                 commit=True
             )
             
+            sincronizar_producto(producto_id)
+            recalcular_relacionados(producto_id)
+            invalidar_paginas_publicas()
+            # Activar o desactivar no cambia total_productos; solo cuenta en
+            # productos_sin_stock si el producto no tiene stock
+            if producto['cantidad_stock'] == 0 and bool(producto['activo']) != bool(activo):
+                ajustar_estadistica('productos_sin_stock', 1 if activo else -1)
+            else:
+                marcar_estadisticas_desactualizadas()
+            
             return {'success': True, 'message': 'Estado actualizado correctamente'}
             
         except Exception as e:
@@ -437,7 +519,7 @@ class ProductosController:
         
         # Verificar si ya hay imágenes principales
         main_image_exists = execute_query(
-            "SELECT id FROM imagenes_productos WHERE producto_id = %s AND es_principal = 1",
+            self.IMAGEN_PRINCIPAL_SQL,
             (producto_id,),
             fetchone=True
         )
@@ -461,15 +543,81 @@ class ProductosController:
                 es_principal = index == 0 and not main_image_exists
                 
                 # Insertar en base de datos
-                execute_query(
+                imagen_id = execute_query(
                     """
                     INSERT INTO imagenes_productos 
                     (producto_id, url_imagen, es_principal, orden_visualizacion)
                     VALUES (%s, %s, %s, %s)
                     """,
                     (producto_id, url_imagen, es_principal, index),
-                    commit=True
+                    commit=True,
+                    return_last_id=True
                 )
+                
+                # Variantes WebP/JPEG redimensionadas, fuera de la petición
+                if imagen_id:
+                    self._generar_variantes(producto_id, imagen_id, url_imagen)
+        
+        self._actualizar_imagen_principal(producto_id)
+    
+    def _generar_variantes(self, producto_id, imagen_id, url_original):
+        """Encola la generación de las variantes de una imagen del producto
+        
+        Al terminar, el registro de imagenes_productos apunta a la variante
+        'detail' y guarda todas las variantes en la columna `variantes`.
+        
+        Args:
+            producto_id (int): ID del producto
+            imagen_id (int): ID de la imagen en imagenes_productos
+            url_original (str): URL del archivo subido
+        """
+        procesar_en_segundo_plano(self.upload_folder, url_original, 'producto',
+                                  producto_id=producto_id, imagen_id=imagen_id)
+    
+    def _registrar_variantes(self, url_original, url_nueva, variantes, producto_id, imagen_id):
+        """Apunta la imagen a su variante 'detail' (trabajo de la cola)
+        
+        Returns:
+            bool: False si la imagen se eliminó mientras se procesaba
+        """
+        execute_query(
+            "UPDATE imagenes_productos SET url_imagen = %s, variantes = %s WHERE id = %s AND url_imagen = %s",
+            (url_nueva, json.dumps(variantes), imagen_id, url_original),
+            commit=True
+        )
+        if not execute_query(
+            "SELECT id FROM imagenes_productos WHERE id = %s AND url_imagen = %s",
+            (imagen_id, url_nueva),
+            fetchone=True
+        ):
+            return False
+        self._actualizar_imagen_principal(producto_id)
+        invalidar_paginas_publicas()
+        return True
+    
+    def _actualizar_imagen_principal(self, producto_id):
+        """Sincroniza productos.imagen_principal_url con imagenes_productos
+        
+        Los listados leen la imagen principal de esta columna en lugar de
+        ejecutar una subconsulta por cada fila.
+        
+        Args:
+            producto_id (int): ID del producto
+        """
+        execute_query(
+            """
+            UPDATE productos p
+            SET p.imagen_principal_url = (
+                SELECT url_imagen FROM imagenes_productos
+                WHERE producto_id = p.id AND es_principal = 1
+                ORDER BY orden_visualizacion, id
+                LIMIT 1
+            )
+            WHERE p.id = %s
+            """,
+            (producto_id,),
+            commit=True
+        )
     
     def eliminar_imagen_producto(self, imagen_id):
         """Elimina una imagen específica de un producto
@@ -501,6 +649,9 @@ class ProductosController:
                 commit=True
             )
             
+            self._actualizar_imagen_principal(imagen.get('producto_id'))
+            invalidar_paginas_publicas()
+            
             return {'success': True, 'message': 'Imagen eliminada correctamente'}
             
         except Exception as e:
@@ -513,17 +664,8 @@ class ProductosController:
                filename.rsplit('.', 1)[1].lower() in self.allowed_extensions
     
     def _eliminar_archivo_imagen(self, url_imagen):
-        """Elimina un archivo de imagen del servidor"""
-        if url_imagen:
-            # Convertir URL a ruta de archivo
-            file_path = url_imagen.replace('/uploads/', '')
-            full_path = os.path.join(self.upload_folder, file_path)
-            
-            if os.path.exists(full_path):
-                try:
-                    os.remove(full_path)
-                except Exception as e:
-                    print(f"Error eliminando archivo: {str(e)}")
+        """Encola el borrado de un archivo de imagen (con sus variantes)"""
+        eliminar_en_segundo_plano(self.upload_folder, url_imagen)
     
     def buscar_productos(self, query):
         """Busca productos por nombre o SKU
@@ -539,8 +681,7 @@ class ProductosController:
         productos = execute_query(
             """
             SELECT p.*, c.nombre as categoria_nombre,
-                   (SELECT url_imagen FROM imagenes_productos 
-                    WHERE producto_id = p.id AND es_principal = 1 LIMIT 1) as imagen_principal
+                   p.imagen_principal_url as imagen_principal
             FROM productos p
             LEFT JOIN categorias c ON p.categoria_id = c.id
             WHERE p.nombre LIKE %s OR p.sku LIKE %s
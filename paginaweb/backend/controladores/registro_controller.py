@@ -7,31 +7,21 @@ import datetime
 import random
 import json
 from backend.configuracion.config import Config
-from backend.DB.db_manager import execute_query, check_database_exists, create_database
+from backend.DB.db_manager import execute_query
+from backend.DB.cache import get_informacion_tienda
+from backend.DB.correo import encolar_correo
+from backend.DB.estadisticas import ajustar_estadistica
 
 class RegistroController:
     """Controlador para el registro de usuarios con verificación por email"""
     
     def __init__(self):
-        self._ensure_db_exists()
-    
-    def _ensure_db_exists(self):
-        """Asegura que la base de datos existe y tiene la estructura necesaria"""
-        # Verificar si la base de datos existe
-        if not check_database_exists():
-            print("La base de datos no existe o está incompleta. Creando...")
-            if create_database():
-                print("Base de datos creada exitosamente")
-            else:
-                print("Error al crear la base de datos")
+        pass
     
     def get_registro_data(self):
         """Obtiene los datos para mostrar en la página de registro"""
         # Obtener información de la tienda
-        tienda_info = execute_query(
-            "SELECT * FROM informacion_tienda LIMIT 1", 
-            fetchone=True
-        ) or {}
+        tienda_info = get_informacion_tienda() or {}
         
         # Datos para mostrar en la página de registro
         data = {
@@ -210,19 +200,22 @@ class RegistroController:
                 VALUES (%s, %s, %s, %s, %s, 1, CURRENT_TIMESTAMP)
                 """,
                 (nombre, apellidos, email, password_hash, telefono),
+                commit=True,
                 return_last_id=True
             )
             
-            if not user_id:
+            if not isinstance(user_id, int) or not user_id:
                 return {
                     'success': False,
                     'message': 'Error al crear el usuario, por favor intenta nuevamente'
                 }
+            ajustar_estadistica('total_usuarios', 1)
             
             # Eliminar usuario temporal
             execute_query(
                 "DELETE FROM temp_users WHERE id = %s",
-                (temp_user_id,)
+                (temp_user_id,),
+                commit=True
             )
             
             # Enviar correo de bienvenida
@@ -373,16 +366,13 @@ class RegistroController:
         return True
     
     def _send_verification_email(self, email, nombre, code):
-        """Envía un correo con el código de verificación
+        """Encola un correo con el código de verificación
         
         Args:
             email (str): Correo electrónico del destinatario
             nombre (str): Nombre del destinatario
             code (str): Código de verificación
         """
-        # En un entorno de producción real, usar una biblioteca como smtplib o un servicio como SendGrid
-        # Por simplicidad, solo simulamos el envío de correo
-        
         subject = "Verifica tu cuenta de Talabartería Rodríguez"
         message = f"""
         Hola {nombre},
@@ -399,18 +389,16 @@ class RegistroController:
         El equipo de Talabartería Rodríguez
         """
         
-        print(f"[SIMULACIÓN DE ENVÍO DE CORREO]\nPara: {email}\nAsunto: {subject}\nCuerpo: {message}")
+        # El envío (SMTP) lo hace la cola de trabajos fuera de la petición
+        encolar_correo(email, subject, message)
     
     def _send_welcome_email(self, email, nombre):
-        """Envía un correo de bienvenida
+        """Encola un correo de bienvenida
         
         Args:
             email (str): Correo electrónico del destinatario
             nombre (str): Nombre del destinatario
         """
-        # En un entorno de producción real, usar una biblioteca como smtplib o un servicio como SendGrid
-        # Por simplicidad, solo simulamos el envío de correo
-        
         subject = "¡Bienvenido a Talabartería Rodríguez!"
         message = f"""
         Hola {nombre},
@@ -425,4 +413,5 @@ class RegistroController:
         El equipo de Talabartería Rodríguez
         """
         
-        print(f"[SIMULACIÓN DE ENVÍO DE CORREO]\nPara: {email}\nAsunto: {subject}\nCuerpo: {message}")
+        # El envío (SMTP) lo hace la cola de trabajos fuera de la petición
+        encolar_correo(email, subject, message)
@@ -4,38 +4,28 @@ import sys
 import math
 from datetime import datetime
 from backend.configuracion.config import Config
-from backend.DB.db_manager import execute_query, check_database_exists, create_database
+from backend.DB.db_manager import execute_query
+from backend.DB.cache import get_informacion_tienda
+from backend.DB.busqueda import buscar_ids
+from backend.DB.contadores import registrar_vista
+from backend.DB.relacionados import get_productos_relacionados
+from backend.DB.paginacion import consultar_pagina, consultar_pagina_cursor, codificar_cursor, decodificar_cursor
 
 class ServiciosController:
     """Controlador para la página de servicios/productos de Talabartería Rodríguez"""
     
     def __init__(self):
-        self._ensure_db_exists()
-    
-    def _ensure_db_exists(self):
-        """Asegura que la base de datos existe y tiene la estructura necesaria"""
-        # Verificar si la base de datos existe
-        if not check_database_exists():
-            print("La base de datos no existe o está incompleta. Creando...")
-            if create_database():
-                print("Base de datos creada exitosamente")
-            else:
-                print("Error al crear la base de datos")
+        pass
     
     def get_servicios_data(self):
         """Obtiene los datos para mostrar en la página de servicios/productos"""
         # Obtener información de la tienda
-        tienda_info = execute_query(
-            "SELECT * FROM informacion_tienda LIMIT 1", 
-            fetchone=True
-        ) or {}
+        tienda_info = get_informacion_tienda() or {}
         
         # Obtener todos los productos activos
         productos = execute_query("""
             SELECT p.*, c.nombre as categoria_nombre, 
-                   (SELECT url_imagen FROM imagenes_productos 
-                    WHERE producto_id = p.id AND es_principal = 1 
-                    LIMIT 1) as imagen_principal
+                   p.imagen_principal_url as imagen_principal
             FROM productos p
             LEFT JOIN categorias c ON p.categoria_id = c.id
             WHERE p.activo = 1
@@ -141,118 +131,205 @@ class ServiciosController:
             WHERE pe.producto_id = %s
         """, (servicio_id,)) or []
         
-        # Obtener reseñas del producto
-        resenas = execute_query("""
-            SELECT r.*, u.nombre as usuario_nombre, u.apellidos as usuario_apellidos
-            FROM resenas r
-            JOIN usuarios u ON r.usuario_id = u.id
-            WHERE r.producto_id = %s AND r.aprobada = 1
-            ORDER BY r.fecha_publicacion DESC
-        """, (servicio_id,)) or []
+        # Primera página de reseñas; el promedio y el total vienen de las
+        # columnas rating_* del producto (mantenidas por triggers)
+        resenas = self.get_resenas_producto(servicio_id)
+        promedio_calificacion = round(float(producto['rating_avg'] or 0), 1)
         
-        # Calcular promedio de calificaciones
-        promedio_calificacion = 0
-        if resenas:
-            suma_calificaciones = sum(r['calificacion'] for r in resenas)
-            promedio_calificacion = round(suma_calificaciones / len(resenas), 1)
-        
-        # Obtener productos relacionados (misma categoría o etiquetas similares)
-        productos_relacionados = execute_query("""
-            SELECT p.*, c.nombre as categoria_nombre, 
-                   (SELECT url_imagen FROM imagenes_productos 
-                    WHERE producto_id = p.id AND es_principal = 1 
-                    LIMIT 1) as imagen_principal
-            FROM productos p
-            LEFT JOIN categorias c ON p.categoria_id = c.id
-            WHERE p.id != %s 
-            AND p.activo = 1
-            AND (p.categoria_id = %s OR p.id IN (
-                SELECT DISTINCT pe1.producto_id
-                FROM productos_etiquetas pe1
-                JOIN productos_etiquetas pe2 ON pe1.etiqueta_id = pe2.etiqueta_id
-                WHERE pe2.producto_id = %s AND pe1.producto_id != %s
-            ))
-            ORDER BY p.destacado DESC, p.contador_ventas DESC
-            LIMIT 4
-        """, (servicio_id, producto['categoria_id'], servicio_id, servicio_id)) or []
+        # Productos relacionados (misma categoría o etiquetas similares): lista
+        # precalculada; mientras no exista se usa la consulta directa
+        productos_relacionados = get_productos_relacionados(producto['id'])
+        if productos_relacionados is None:
+            productos_relacionados = execute_query("""
+                SELECT p.*, c.nombre as categoria_nombre, 
+                       p.imagen_principal_url as imagen_principal
+                FROM productos p
+                LEFT JOIN categorias c ON p.categoria_id = c.id
+                WHERE p.id != %s 
+                AND p.activo = 1
+                AND (p.categoria_id = %s OR p.id IN (
+                    SELECT DISTINCT pe1.producto_id
+                    FROM productos_etiquetas pe1
+                    JOIN productos_etiquetas pe2 ON pe1.etiqueta_id = pe2.etiqueta_id
+                    WHERE pe2.producto_id = %s AND pe1.producto_id != %s
+                ))
+                ORDER BY p.destacado DESC, p.contador_ventas DESC
+                LIMIT 4
+            """, (servicio_id, producto['categoria_id'], servicio_id, servicio_id)) or []
         
-        # Incrementar contador de vistas
-        execute_query("""
-            UPDATE productos 
-            SET contador_vistas = contador_vistas + 1 
-            WHERE id = %s
-        """, (servicio_id,))
+        # Incrementar contador de vistas (se acumula en memoria y se escribe en lote)
+        registrar_vista(producto['id'])
         
         # Datos del producto
         detalle = {
             'producto': producto,
             'imagenes': imagenes,
             'etiquetas': etiquetas,
-            'resenas': resenas,
+            'resenas': resenas['resenas'],
+            'resenas_siguiente_cursor': resenas['siguiente_cursor'],
+            'total_resenas': producto['rating_count'],
             'promedio_calificacion': promedio_calificacion,
             'productos_relacionados': productos_relacionados
         }
         
         return detalle
     
-    def buscar_productos(self, termino, categoria_id=None, precio_max=None, filtros=None, material=None, offset=0, limit=12):
-        """Busca productos según criterios"""
+    def get_resenas_producto(self, producto_id, limit=10, cursor=None):
+        """Obtiene una página de reseñas aprobadas de un producto
+        
+        Args:
+            producto_id (int): ID del producto
+            limit (int): Reseñas por página
+            cursor (str, optional): Cursor devuelto por la página anterior
+            
+        Returns:
+            dict: {'resenas': [...], 'siguiente_cursor': str o None, 'hay_mas': bool}
+            
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        pagina = consultar_pagina_cursor(
+            """
+            SELECT r.*, u.nombre as usuario_nombre, u.apellidos as usuario_apellidos
+            FROM resenas r
+            JOIN usuarios u ON r.usuario_id = u.id
+            """,
+            ['r.producto_id = %s', 'r.aprobada = 1'],
+            [producto_id],
+            [('r.fecha_publicacion', 'fecha_publicacion'), ('r.id', 'id')],
+            limit=limit,
+            cursor=cursor
+        )
+        
+        for resena in pagina['filas']:
+            if resena.get('fecha_publicacion'):
+                resena['fecha_texto'] = resena['fecha_publicacion'].strftime('%d/%m/%Y')
+        
+        return {
+            'resenas': pagina['filas'],
+            'siguiente_cursor': pagina['siguiente_cursor'],
+            'hay_mas': pagina['hay_mas']
+        }
+    
+    def buscar_productos(self, termino, categoria_id=None, precio_max=None, filtros=None, material=None, offset=0, limit=12, cursor=None):
+        """Busca productos según criterios
+        
+        Filtra, ordena por relevancia y pagina con el índice en memoria
+        (backend/DB/busqueda.py); la base de datos sólo lee los productos de
+        la página. Si el índice no está disponible se usa la consulta SQL.
+        
+        Con `cursor` (cadena vacía para la primera página) se pagina por
+        cursor en lugar de offset y la respuesta incluye `siguiente_cursor`.
+        
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        try:
+            categoria = int(categoria_id) if categoria_id and categoria_id != 'todas' else None
+            precio = float(precio_max) if precio_max else None
+        except (TypeError, ValueError):
+            categoria, precio = None, None
+        
+        despues_de = None
+        if cursor:
+            despues_de = decodificar_cursor(cursor)
+        
+        resultado = None
+        # Los cursores del índice llevan 4 valores; los de la consulta SQL, 3
+        if despues_de is None or len(despues_de) == 4:
+            resultado = buscar_ids(termino, categoria, precio, filtros, material, offset, limit, despues_de)
+        if resultado is None:
+            return self._buscar_productos_sql(termino, categoria_id, precio_max, filtros, material, offset, limit, cursor)
+        
+        ids = resultado['ids']
+        total = resultado['total']
+        productos = []
+        if ids:
+            placeholders = ', '.join(['%s'] * len(ids))
+            filas = execute_query(f"""
+                SELECT p.*, c.nombre as categoria_nombre, 
+                       p.imagen_principal_url as imagen_principal
+                FROM productos p
+                LEFT JOIN categorias c ON p.categoria_id = c.id
+                WHERE p.id IN ({placeholders})
+            """, ids) or []
+            # Conservar el orden de relevancia del índice
+            por_id = {p['id']: p for p in filas}
+            productos = [por_id[i] for i in ids if i in por_id]
+        
+        respuesta = {
+            'productos': productos,
+            'total': total,
+            'paginas': math.ceil(total / limit) if limit > 0 else 1
+        }
+        if cursor is not None:
+            respuesta['hay_mas'] = resultado['hay_mas']
+            respuesta['siguiente_cursor'] = codificar_cursor(resultado['ultima_clave']) if resultado['hay_mas'] else None
+        return respuesta
+    
+    def _buscar_productos_sql(self, termino, categoria_id=None, precio_max=None, filtros=None, material=None, offset=0, limit=12, cursor=None):
+        """Búsqueda directa en MySQL (respaldo cuando no hay índice)"""
         # Construir consulta base
         query = """
             SELECT p.*, c.nombre as categoria_nombre, 
-                   (SELECT url_imagen FROM imagenes_productos 
-                    WHERE producto_id = p.id AND es_principal = 1 
-                    LIMIT 1) as imagen_principal
+                   p.imagen_principal_url as imagen_principal
             FROM productos p
             LEFT JOIN categorias c ON p.categoria_id = c.id
-            WHERE p.activo = 1
         """
         
+        where_clauses = ["p.activo = 1"]
         params = []
         
         # Añadir condiciones según parámetros
         if termino:
-            query += " AND (p.nombre LIKE %s OR p.descripcion LIKE %s)"
+            where_clauses.append("(p.nombre LIKE %s OR p.descripcion LIKE %s)")
             params.extend([f"%{termino}%", f"%{termino}%"])
         
         if categoria_id and categoria_id != 'todas':
-            query += " AND p.categoria_id = %s"
+            where_clauses.append("p.categoria_id = %s")
             params.append(categoria_id)
         
         if precio_max:
-            query += " AND (COALESCE(p.precio_descuento, p.precio) <= %s)"
+            where_clauses.append("(COALESCE(p.precio_descuento, p.precio) <= %s)")
             params.append(precio_max)
         
         if filtros:
             if filtros.get('descuento'):
-                query += " AND p.precio_descuento IS NOT NULL"
+                where_clauses.append("p.precio_descuento IS NOT NULL")
             
             if filtros.get('nuevo'):
-                query += " AND p.nuevo = 1"
+                where_clauses.append("p.nuevo = 1")
             
             if filtros.get('destacado'):
-                query += " AND p.destacado = 1"
+                where_clauses.append("p.destacado = 1")
         
         if material:
-            query += " AND p.material = %s"
+            where_clauses.append("p.material = %s")
             params.append(material)
         
-        # Ordenar según criterio
-        query += " ORDER BY p.destacado DESC, p.contador_ventas DESC"
-        
-        # Añadir límite y offset para paginación
-        query += " LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
+        # Modo cursor: continuar después del último producto visto, sin OFFSET
+        if cursor is not None:
+            resultado = consultar_pagina_cursor(
+                query, where_clauses, params,
+                orden=[('p.destacado', 'destacado'), ('p.contador_ventas', 'contador_ventas'), ('p.id', 'id')],
+                limit=limit,
+                cursor=cursor
+            )
+            return {
+                'productos': resultado['filas'],
+                'total': None,
+                'paginas': None,
+                'hay_mas': resultado['hay_mas'],
+                'siguiente_cursor': resultado['siguiente_cursor']
+            }
         
-        # Ejecutar la consulta
-        productos = execute_query(query, params) or []
+        query += " WHERE " + " AND ".join(where_clauses)
         
-        # Obtener total de resultados (sin límite para paginación)
-        count_query = query.split(" ORDER BY ")[0].replace("SELECT p.*, c.nombre", "SELECT COUNT(*)")
-        count_query = count_query.split(" LIMIT ")[0]
+        # Ordenar según criterio
+        query += " ORDER BY p.destacado DESC, p.contador_ventas DESC"
         
-        total_results = execute_query(count_query, params[:-2], fetchone=True)
-        total = 0 if not total_results else total_results.get('COUNT(*)', 0)
+        # Página y total de resultados en una sola consulta
+        productos, total = consultar_pagina(query, params, limit, offset)
         
         return {
             'productos': productos,
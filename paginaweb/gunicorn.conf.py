@@ -0,0 +1,16 @@
+# Configuración de gunicorn para Talabartería Rodríguez
+# Uso: gunicorn app:app (gunicorn lee este archivo automáticamente)
+
+def on_starting(server):
+    """Verifica/crea la base de datos una sola vez en el proceso maestro,
+    antes de crear los workers (que heredan la bandera de disponibilidad)"""
+    from backend.DB.db_manager import ensure_database_ready
+    ensure_database_ready()
+
+def worker_exit(server, worker):
+    """Escribe los contadores en memoria del worker antes de que termine y
+    espera a que la cola de trabajos acabe el trabajo en curso"""
+    from backend.DB.contadores import flush_vistas
+    from backend.DB.trabajos import detener_trabajadores
+    flush_vistas()
+    detener_trabajadores()
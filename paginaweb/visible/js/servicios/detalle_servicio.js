@@ -5,6 +5,7 @@ document.addEventListener('DOMContentLoaded', function() {
     initGaleriaProducto();
     initCantidadSelector();
     initTabs();
+    initVerMasResenas();
     initCompartir();
     initBackToTop();
     initProductosRelacionados();
@@ -160,6 +161,94 @@ function initTabs() {
     });
 }
 
+/**
+ * Carga la siguiente página de reseñas con el cursor de la anterior
+ */
+function initVerMasResenas() {
+    const boton = document.getElementById('btn-ver-mas-resenas');
+    const lista = document.getElementById('reseñas-lista');
+    if (!boton || !lista) return;
+    
+    boton.addEventListener('click', function() {
+        const productoId = this.getAttribute('data-producto-id');
+        const cursor = this.getAttribute('data-cursor');
+        boton.disabled = true;
+        
+        fetch(`/api/servicios/${productoId}/resenas?cursor=${encodeURIComponent(cursor)}`)
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) {
+                    throw new Error(data.message || 'No se pudieron cargar las reseñas');
+                }
+                data.resenas.forEach(resena => lista.appendChild(crearResenaItem(resena)));
+                
+                if (data.hay_mas && data.siguiente_cursor) {
+                    boton.setAttribute('data-cursor', data.siguiente_cursor);
+                    boton.disabled = false;
+                } else {
+                    boton.parentElement.remove();
+                }
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                boton.disabled = false;
+                showNotification('Error', 'No se pudieron cargar más reseñas', 'error');
+            });
+    });
+}
+
+/**
+ * Crea el elemento de una reseña con la misma estructura que la plantilla
+ */
+function crearResenaItem(resena) {
+    const item = document.createElement('div');
+    item.className = 'resena-item';
+    
+    const header = document.createElement('div');
+    header.className = 'resena-header';
+    const usuario = document.createElement('div');
+    usuario.className = 'resena-usuario';
+    const nombre = document.createElement('strong');
+    nombre.textContent = `${resena.usuario_nombre || ''} ${resena.usuario_apellidos || ''}`;
+    usuario.appendChild(nombre);
+    if (resena.es_compra_verificada) {
+        const verificada = document.createElement('span');
+        verificada.className = 'compra-verificada';
+        verificada.innerHTML = '<ion-icon name="checkmark-circle"></ion-icon>';
+        verificada.appendChild(document.createTextNode(' Compra verificada'));
+        usuario.appendChild(verificada);
+    }
+    const fecha = document.createElement('div');
+    fecha.className = 'resena-fecha';
+    fecha.textContent = resena.fecha_texto || '';
+    header.appendChild(usuario);
+    header.appendChild(fecha);
+    item.appendChild(header);
+    
+    const rating = document.createElement('div');
+    rating.className = 'resena-rating';
+    for (let i = 1; i <= 5; i++) {
+        const estrella = document.createElement('ion-icon');
+        estrella.setAttribute('name', i <= resena.calificacion ? 'star' : 'star-outline');
+        rating.appendChild(estrella);
+    }
+    item.appendChild(rating);
+    
+    if (resena.titulo) {
+        const titulo = document.createElement('h4');
+        titulo.className = 'resena-titulo';
+        titulo.textContent = resena.titulo;
+        item.appendChild(titulo);
+    }
+    
+    const comentario = document.createElement('p');
+    comentario.className = 'resena-comentario';
+    comentario.textContent = resena.comentario || '';
+    item.appendChild(comentario);
+    
+    return item;
+}
+
 /**
  * Inicializa funciones de compartir
  */
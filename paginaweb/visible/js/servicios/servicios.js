@@ -102,6 +102,20 @@ function initAnimations() {
     });
 }
 
+/**
+ * Copia data-srcset a srcset en la imagen y en las fuentes de su <picture>
+ */
+function cargarVariantesImagen(image) {
+    if (image.parentElement.tagName === 'PICTURE') {
+        image.parentElement.querySelectorAll('source[data-srcset]').forEach(source => {
+            source.srcset = source.dataset.srcset;
+        });
+    }
+    if (image.dataset.srcset) {
+        image.srcset = image.dataset.srcset;
+    }
+}
+
 /**
  * Inicializa la carga perezosa de imágenes
  */
@@ -115,9 +129,10 @@ function initLazyLoading() {
             entries.forEach(entry => {
                 if (entry.isIntersecting) {
                     const image = entry.target;
-                    const parent = image.parentElement;
+                    const parent = image.closest('.skeleton-loading') || image.parentElement;
                     
-                    // Cargar la imagen
+                    // Cargar la imagen (y sus variantes WebP/JPEG si las tiene)
+                    cargarVariantesImagen(image);
                     image.src = image.dataset.src;
                     
                     // Cuando la imagen se carga, quitar clase de skeleton
@@ -142,9 +157,10 @@ function initLazyLoading() {
     } else {
         // Fallback para navegadores antiguos
         lazyImages.forEach(img => {
+            cargarVariantesImagen(img);
             img.src = img.dataset.src;
             img.classList.add('loaded');
-            const parent = img.parentElement;
+            const parent = img.closest('.skeleton-loading') || img.parentElement;
             if (parent.classList.contains('skeleton-loading')) {
                 parent.classList.remove('skeleton-loading');
             }